@@ -0,0 +1,262 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks.topic_month import TopicMonthSpec, generate_topic_month, generate_teton_export
+from tasks.topic_upload_engine import (
+    TopicUploadEngine, INSERT_UPLOAD_SQL, IMAGE_EXTENSIONS,
+    extract_zip, process_database_files, process_image_files, count_zip_members
+)
+from tasks.teton_content_export import EXPORT_FILES, find_missing_export_files, copy_export_files
+from utils.history_query import HistoryPager, HistoryFilter, UPLOAD_HISTORY_QUERY
+from utils.history_schema import UPLOAD_MIGRATIONS
+from utils.history_stats import UPLOAD_STATS_QUERY, load_monthly_summaries
+from utils.history_store import HistoryStore
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# A benchmark regresses when its median is this much slower than the baseline
+DEFAULT_THRESHOLD = 0.25
+
+# File system bound benchmarks vary more from run to run
+THRESHOLDS = {
+    "extract": 0.5,
+    "repack": 0.5,
+    "server_copy": 0.5,
+    "teton_post_processing": 0.5,
+}
+
+SCALES = {
+    "small": {"xml": 300, "images": 100, "history_rows": 2000, "teton_file_size": 512 * 1024, "repeat": 5},
+    "full": {"xml": 2000, "images": 600, "history_rows": 50000, "teton_file_size": 8 * 1024 * 1024, "repeat": 5},
+}
+
+# Absolute slack on top of the threshold, so scheduler and timer jitter on
+# very short benchmarks cannot count as a regression
+NOISE_FLOOR_SECONDS = 0.005
+
+# Stages that take about a millisecond are timed this many times per round,
+# so each round takes tens of milliseconds
+QUICK_STAGE_LOOPS = 25
+
+REGRESSION_EXIT_CODE = 1
+
+
+class Workspace:
+    """Generated inputs shared by the benchmarks of one run"""
+
+    def __init__(self, root, scale):
+        self.root = root
+        self.scale = scale
+        self.source = os.path.join(root, "source")
+        self.database_zip, self.images_zip = generate_topic_month(
+            self.source, TopicMonthSpec(xml_count=scale["xml"], image_count=scale["images"])
+        )
+
+        # Extracted and repacked once up front for the benchmarks of later stages
+        self.extracted = os.path.join(root, "extracted")
+        extract_zip(self.database_zip, self.extracted)
+        extract_zip(self.images_zip, self.extracted)
+        self.database_output = os.path.join(root, "database.zip")
+        self.images_output = os.path.join(root, "images.zip")
+        process_database_files(self.extracted, self.database_output)
+        process_image_files(self.extracted, self.images_output)
+
+        self.server = os.path.join(root, "server")
+        os.makedirs(self.server)
+
+        self.teton_export_dir = os.path.join(root, "teton_export")
+        generate_teton_export(self.teton_export_dir, EXPORT_FILES, scale["teton_file_size"])
+        self.teton_folder = os.path.join(root, "teton_folder")
+        os.makedirs(self.teton_folder)
+
+        self.store = HistoryStore(os.path.join(root, "history.db"))
+        self.store.migrate(UPLOAD_MIGRATIONS)
+        fill_history(self.store, scale["history_rows"])
+
+    def scratch(self, name):
+        """An empty folder for one benchmark iteration"""
+        path = os.path.join(self.root, "scratch", name)
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        return path
+
+
+def fill_history(store, rows):
+    """Insert upload records spread over the past years with a mix of statuses"""
+    statuses = ("completed", "completed", "completed", "interrupted", "failed")
+    first = date(2015, 1, 1)
+    with store.transaction() as conn:
+        for index in range(rows):
+            day = first + timedelta(days=index * 3650 // max(rows, 1))
+            month_label = day.strftime("%d-%B-%Y")
+            cursor = conn.execute(INSERT_UPLOAD_SQL, (
+                month_label, 2000 + index % 500, 600 + index % 100,
+                f"database-{month_label}.zip", f"{month_label}-images.zip",
+                "C:\\Topics\\EEP Topic Upload Temporary Files", f"{day.isoformat()} 09:00:00"
+            ))
+            conn.execute(
+                "UPDATE uploads SET upload_timestamp = ?, status = ?, finished_at = ? WHERE id = ?",
+                (f"{day.isoformat()} 10:00:00", statuses[index % len(statuses)],
+                 f"{day.isoformat()} 10:00:00", cursor.lastrowid)
+            )
+
+
+def bench_extract(workspace):
+    destination = workspace.scratch("extract")
+    extract_zip(workspace.database_zip, destination)
+    extract_zip(workspace.images_zip, destination)
+
+
+def bench_repack(workspace):
+    destination = workspace.scratch("repack")
+    process_database_files(workspace.extracted, os.path.join(destination, "database.zip"))
+    process_image_files(workspace.extracted, os.path.join(destination, "images.zip"))
+
+
+def bench_manifest_count(workspace):
+    for _ in range(QUICK_STAGE_LOOPS):
+        count_zip_members(workspace.database_zip, ('.xml',))
+        count_zip_members(workspace.images_zip, IMAGE_EXTENSIONS)
+
+
+def bench_server_copy(workspace):
+    engine = TopicUploadEngine(workspace.store, server_location=workspace.server)
+    engine.copy_to_server(workspace.database_output, workspace.images_output)
+
+
+def bench_history_queries(workspace):
+    for _ in range(QUICK_STAGE_LOOPS):
+        for history_filter in (None, HistoryFilter(search="January"), HistoryFilter(status="failed")):
+            HistoryPager(workspace.store, UPLOAD_HISTORY_QUERY, history_filter=history_filter).next_page()
+        load_monthly_summaries([workspace.store], UPLOAD_STATS_QUERY)
+
+
+def bench_teton_post_processing(workspace):
+    find_missing_export_files(workspace.teton_export_dir, EXPORT_FILES)
+    copy_export_files(workspace.teton_export_dir, workspace.teton_folder, EXPORT_FILES)
+
+
+BENCHMARKS = {
+    "extract": bench_extract,
+    "repack": bench_repack,
+    "manifest_count": bench_manifest_count,
+    "server_copy": bench_server_copy,
+    "history_queries": bench_history_queries,
+    "teton_post_processing": bench_teton_post_processing,
+}
+
+
+def time_benchmark(function, workspace, repeat):
+    """Median wall time in seconds over repeat runs, after one warm-up run"""
+    function(workspace)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(workspace)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(path, scale_name, results):
+    baseline = load_baseline(path)
+    baseline[scale_name] = {
+        "machine": platform.node(),
+        "python": platform.python_version(),
+        "recorded": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "results": results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def allowed_slowdown(name, threshold=DEFAULT_THRESHOLD):
+    """Slowdown a benchmark may show against the baseline before it counts as a regression"""
+    return THRESHOLDS.get(name, threshold)
+
+
+def is_regression(name, seconds, baseline_seconds, threshold=DEFAULT_THRESHOLD):
+    """Whether a median is slower than the baseline by more than the threshold plus the noise floor"""
+    return seconds > baseline_seconds * (1 + allowed_slowdown(name, threshold)) + NOISE_FLOOR_SECONDS
+
+
+def load_baseline_results(path, scale_name):
+    """Baseline medians of one scale, by benchmark name"""
+    return load_baseline(path).get(scale_name, {}).get("results", {})
+
+
+def compare(results, baseline_results, threshold):
+    """Print each result against the baseline and return the names that regressed"""
+    regressions = []
+    print(f"{'Benchmark':<26}{'median s':>10}{'baseline':>10}{'change':>9}")
+    for name, seconds in results.items():
+        base = baseline_results.get(name)
+        if base is None:
+            print(f"{name:<26}{seconds:>10.4f}{'-':>10}{'':>9}")
+            continue
+        change = seconds / base - 1 if base else 0.0
+        flag = "  REGRESSION" if is_regression(name, seconds, base, threshold) else ""
+        print(f"{name:<26}{seconds:>10.4f}{base:>10.4f}{change:>+9.0%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    """Command-line entry point: python -m benchmarks.run"""
+    parser = argparse.ArgumentParser(description="Benchmark the upload pipeline against a stored baseline")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small", help="size of the generated inputs")
+    parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--repeat", type=int, help="timed runs per benchmark")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline file")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown before a benchmark counts as a regression (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    scale = SCALES[args.scale]
+    repeat = args.repeat or scale["repeat"]
+    names = args.only or list(BENCHMARKS)
+
+    root = tempfile.mkdtemp(prefix="eep_benchmark_")
+    try:
+        print(f"Generating {args.scale} inputs in {root}")
+        workspace = Workspace(root, scale)
+        results = {}
+        for name in names:
+            results[name] = time_benchmark(BENCHMARKS[name], workspace, repeat)
+        workspace.store.close()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    baseline_results = load_baseline_results(args.baseline, args.scale)
+    regressions = compare(results, baseline_results, args.threshold)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, args.scale, {**baseline_results, **results})
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if regressions:
+        print(f"Regressed: {', '.join(regressions)}")
+        return REGRESSION_EXIT_CODE
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+import argparse
+import os
+import random
+import sys
+import zipfile
+from datetime import date
+
+# Defaults roughly match a real topic month
+DEFAULT_XML_COUNT = 2000
+DEFAULT_IMAGE_COUNT = 600
+
+# Median file size and spread (sigma of the log-normal distribution)
+DEFAULT_XML_SIZE = 12 * 1024
+DEFAULT_IMAGE_SIZE = 80 * 1024
+SIZE_SIGMA = 0.8
+
+# Sub-folders under validate/ and Images/ the files are spread across
+DEFAULT_NESTING = 2
+FOLDERS_PER_LEVEL = 4
+
+XML_WORDS = (
+    "patient", "diagnosis", "treatment", "dose", "clinical", "evidence", "therapy",
+    "symptom", "guideline", "risk", "outcome", "review", "topic", "section",
+)
+
+
+class TopicMonthSpec:
+    """What a generated topic month looks like"""
+
+    def __init__(self, topic_date=None, xml_count=DEFAULT_XML_COUNT, image_count=DEFAULT_IMAGE_COUNT,
+                 xml_size=DEFAULT_XML_SIZE, image_size=DEFAULT_IMAGE_SIZE, size_sigma=SIZE_SIGMA,
+                 nesting=DEFAULT_NESTING, seed=0):
+        self.topic_date = topic_date or date(2025, 1, 1)
+        self.xml_count = xml_count
+        self.image_count = image_count
+        self.xml_size = xml_size  # Median bytes per XML file
+        self.image_size = image_size  # Median bytes per image
+        self.size_sigma = size_sigma
+        self.nesting = nesting  # Folder levels below validate/ and Images/
+        self.seed = seed
+
+    @property
+    def month_label(self):
+        """DD-Month-YYYY, as used in the ZIP file names"""
+        return self.topic_date.strftime("%d-%B-%Y")
+
+
+def sample_size(rng, median, sigma):
+    return max(64, int(rng.lognormvariate(0, sigma) * median))
+
+
+def nested_folder(rng, levels):
+    """A random sub-folder path, levels deep"""
+    return "/".join(f"part{rng.randrange(FOLDERS_PER_LEVEL)}" for _ in range(levels))
+
+
+def xml_document(rng, size, index):
+    """Text that compresses like real topic XML"""
+    parts = [f'<?xml version="1.0" encoding="UTF-8"?>\n<topic id="T{index:06d}">\n']
+    length = len(parts[0])
+    while length < size:
+        words = " ".join(rng.choice(XML_WORDS) for _ in range(12))
+        line = f'  <para id="p{rng.randrange(10 ** 6)}">{words}</para>\n'
+        parts.append(line)
+        length += len(line)
+    parts.append("</topic>\n")
+    return "".join(parts)
+
+
+def generate_topic_month(output_folder, spec=None):
+    """
+    Write a database-DD-Month-YYYY.zip and DD-Month-YYYY-images.zip pair laid
+    out like the real exports (XML under validate/, images under Images/) and
+    return their paths. The same spec always produces the same files.
+    """
+    spec = spec or TopicMonthSpec()
+    rng = random.Random(spec.seed)
+    os.makedirs(output_folder, exist_ok=True)
+
+    database_name = f"database-{spec.month_label}"
+    images_name = f"{spec.month_label}-images"
+    database_zip = os.path.join(output_folder, f"{database_name}.zip")
+    images_zip = os.path.join(output_folder, f"{images_name}.zip")
+
+    with zipfile.ZipFile(database_zip, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for index in range(spec.xml_count):
+            folder = nested_folder(rng, spec.nesting)
+            name = "/".join(filter(None, [database_name, "validate", folder, f"topic_{index:06d}.xml"]))
+            zipf.writestr(name, xml_document(rng, sample_size(rng, spec.xml_size, spec.size_sigma), index))
+        # Real exports also carry files the upload ignores
+        zipf.writestr(f"{database_name}/manifest.txt", f"{spec.xml_count} topics\n")
+
+    extensions = ('.jpg', '.png', '.gif')
+    with zipfile.ZipFile(images_zip, 'w', zipfile.ZIP_STORED) as zipf:
+        for index in range(spec.image_count):
+            folder = nested_folder(rng, spec.nesting)
+            extension = extensions[index % len(extensions)]
+            name = "/".join(filter(None, [images_name, "Images", folder, f"image_{index:06d}{extension}"]))
+            # Images are already compressed, so random bytes are a fair stand-in
+            zipf.writestr(name, rng.randbytes(sample_size(rng, spec.image_size, spec.size_sigma)))
+
+    return database_zip, images_zip
+
+
+def generate_teton_export(export_dir, export_files, file_size=4 * 1024 * 1024, seed=0):
+    """Write stand-ins for the files the Teton export batch file produces"""
+    rng = random.Random(seed)
+    os.makedirs(export_dir, exist_ok=True)
+    for name in export_files:
+        with open(os.path.join(export_dir, name), 'wb') as f:
+            f.write(rng.randbytes(file_size))
+
+
+def main(argv=None):
+    """Command-line entry point: python -m benchmarks.topic_month"""
+    parser = argparse.ArgumentParser(description="Generate a synthetic topic month ZIP pair")
+    parser.add_argument("output", help="folder to write the ZIP files to")
+    parser.add_argument("--date", default="2025-01-01", help="topic month date YYYY-MM-DD")
+    parser.add_argument("--xml", type=int, default=DEFAULT_XML_COUNT, help="number of XML files")
+    parser.add_argument("--images", type=int, default=DEFAULT_IMAGE_COUNT, help="number of images")
+    parser.add_argument("--xml-size", type=int, default=DEFAULT_XML_SIZE, help="median XML file size in bytes")
+    parser.add_argument("--image-size", type=int, default=DEFAULT_IMAGE_SIZE, help="median image size in bytes")
+    parser.add_argument("--sigma", type=float, default=SIZE_SIGMA, help="spread of the file sizes")
+    parser.add_argument("--nesting", type=int, default=DEFAULT_NESTING, help="sub-folder levels")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    try:
+        topic_date = date.fromisoformat(args.date)
+    except ValueError:
+        print("Dates must use the format YYYY-MM-DD", file=sys.stderr)
+        return 2
+
+    spec = TopicMonthSpec(topic_date, args.xml, args.images, args.xml_size, args.image_size,
+                          args.sigma, args.nesting, args.seed)
+    for path in generate_topic_month(args.output, spec):
+        print(f"Wrote {path} ({os.path.getsize(path) / (1024 * 1024):.1f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
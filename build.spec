@@ -1,19 +1,26 @@
 # build.spec
-from PyInstaller.utils.hooks import collect_all
-
-datas, binaries, hiddenimports = collect_all('PIL')
+# PIL is bundled by PyInstaller's own hooks from the modules actually imported
+# (PIL.Image, PIL.ImageTk); collecting the whole package made the one-file
+# executable unpack every PIL plugin on each launch.
 
 a = Analysis(
     ['main.py'],
     pathex=[],
-    binaries=binaries,
-    datas=datas + [('assets', 'assets')],
-    hiddenimports=hiddenimports + [
+    binaries=[],
+    datas=[('assets', 'assets')],
+    hiddenimports=[
         'ui.dialogs',
         'ui.gradient_window',
+        'ui.background',
         'tasks.topic_upload',
-        'tasks.teton_content_export'
-        'utils.file_utils'
+        'tasks.topic_upload_engine',
+        'tasks.upload_queue',
+        'tasks.watch_folder',
+        'tasks.source_catalogue',
+        'tasks.source_preflight',
+        'tasks.teton_content_export',
+        'utils.file_utils',
+        'utils.history_export'
     ],
     hookspath=[],
     runtime_hooks=[],
@@ -1,8 +1,75 @@
 #main.py
+import time
+PROCESS_STARTED = time.perf_counter()
+
+import sys
 import tkinter as tk
-from ui.gradient_window import GradientWindow
+from utils.startup_profile import (
+    StartupProfiler, get_startup_budget_ms, DEFAULT_REPORT_FILE, OVER_BUDGET_EXIT_CODE
+)
+
+
+def get_profile_report_path(args):
+    """Report file for --profile-startup[=PATH], or None when not profiling"""
+    for arg in args:
+        if arg == "--profile-startup":
+            return DEFAULT_REPORT_FILE
+        if arg.startswith("--profile-startup="):
+            return arg.split("=", 1)[1] or DEFAULT_REPORT_FILE
+    return None
+
 
 if __name__ == "__main__":
+    # "main.py upload SOURCE ..." runs the topic upload without the GUI, e.g. from a scheduler
+    if sys.argv[1:2] == ["upload"]:
+        from tasks.topic_upload_engine import main as upload_main
+        sys.exit(upload_main(sys.argv[2:]))
+
+    # "main.py queue work|enqueue|list ..." runs the upload queue; the GUI starts its workers this way
+    if sys.argv[1:2] == ["queue"]:
+        from tasks.upload_queue import main as queue_main
+        sys.exit(queue_main(sys.argv[2:]))
+
+    # "main.py watch FOLDER ..." queues every topic month delivered to the drop folders
+    if sys.argv[1:2] == ["watch"]:
+        from tasks.watch_folder import main as watch_main
+        sys.exit(watch_main(sys.argv[2:]))
+
+    # "main.py catalogue refresh|list ..." maintains the catalogue of source archives
+    if sys.argv[1:2] == ["catalogue"]:
+        from tasks.source_catalogue import main as catalogue_main
+        sys.exit(catalogue_main(sys.argv[2:]))
+
+    report_path = get_profile_report_path(sys.argv[1:])
+    profiler = StartupProfiler(PROCESS_STARTED)
+    exit_code = 0
+
+    # Imported here so the profile shows how long the application modules take to load
+    from ui.gradient_window import GradientWindow
+    profiler.mark("import application modules")
+
     root = tk.Tk()
-    app = GradientWindow(root)
-    root.mainloop()
\ No newline at end of file
+    profiler.mark("create Tk root")
+    app = GradientWindow(root, profiler=profiler)
+
+    if report_path:
+        # Profiling run: report once startup has finished, then exit with the
+        # budget check as the exit code so it can gate a build
+        def finish_profile():
+            global exit_code
+            if not profiler.write_report(report_path, get_startup_budget_ms()):
+                exit_code = OVER_BUDGET_EXIT_CODE
+            root.destroy()
+
+        app.on_startup_complete = finish_profile
+
+    root.mainloop()
+
+    if app.lag_monitor:
+        app.lag_monitor.stop()
+        try:
+            app.lag_monitor.write_report()
+        except OSError as e:
+            print(f"Error writing responsiveness report: {str(e)}")
+
+    sys.exit(exit_code)
@@ -0,0 +1,285 @@
+#source_catalogue
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+import zipfile
+from datetime import datetime
+
+from tasks.topic_upload_engine import UPLOAD_DB_FILE, IMAGE_EXTENSIONS, month_label
+from utils.history_schema import UPLOAD_MIGRATIONS
+from utils.history_store import get_store
+from utils.memory_profile import format_bytes
+from utils.tracing import tracer
+
+# Months offered when choosing what to upload
+MONTH_CHOICES = 50
+
+# Members counted in each kind of archive, as recorded in the upload history
+MEMBER_EXTENSIONS = {"database": ('.xml',), "images": IMAGE_EXTENSIONS}
+
+ARCHIVE_COLUMNS = "path, folder, kind, topic_month, topic_date, size, mtime_ns, members, content_hash, scanned_at"
+
+ARCHIVE_SQL = f"SELECT {ARCHIVE_COLUMNS}, verified_at, bad_member FROM source_archives WHERE path = ?"
+
+FOLDER_SIGNATURES_SQL = "SELECT path, size, mtime_ns FROM source_archives WHERE folder = ?"
+
+SAVE_ARCHIVE_SQL = f'''
+INSERT OR REPLACE INTO source_archives ({ARCHIVE_COLUMNS})
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+DELETE_ARCHIVE_SQL = "DELETE FROM source_archives WHERE path = ?"
+
+# Only recorded if the archive is still the one that was checked; saving a
+# changed archive again clears it
+RECORD_VERIFICATION_SQL = '''
+UPDATE source_archives
+SET verified_at = ?, bad_member = ?
+WHERE path = ? AND size = ? AND mtime_ns = ?
+'''
+
+KNOWN_FOLDERS_SQL = "SELECT DISTINCT folder FROM source_archives"
+
+# Readable database and images archives of the same month in the same folder,
+# with the number of months in that folder (the pipeline needs to be told
+# which one to use when there are several)
+_MONTHS_SQL = '''
+SELECT d.folder, d.topic_month, d.topic_date, d.path, i.path, d.members, i.members, d.size + i.size,
+       (SELECT COUNT(DISTINCT o.topic_month) FROM source_archives o WHERE o.folder = d.folder)
+FROM source_archives d
+JOIN source_archives i ON i.folder = d.folder AND i.topic_month = d.topic_month AND i.kind = 'images'
+WHERE d.kind = 'database' AND d.members IS NOT NULL AND i.members IS NOT NULL {where}
+ORDER BY d.topic_date DESC, d.folder
+LIMIT ?
+'''
+ALL_MONTHS_SQL = _MONTHS_SQL.format(where="")
+FOLDER_MONTHS_SQL = _MONTHS_SQL.format(where="AND d.folder = ?")
+
+
+def parse_topic_date(topic_month):
+    """ISO date of a DD-Month-YYYY topic month, or None if it is not a real date"""
+    try:
+        return datetime.strptime(topic_month, "%d-%B-%Y").strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def read_archive(path, kind):
+    """
+    Return (members, content_hash) for a source ZIP by reading only its
+    central directory. The hash covers every member's name, CRC and size,
+    so it changes whenever the content does without reading the data.
+    """
+    extensions = MEMBER_EXTENSIONS[kind]
+    members = 0
+    content_hash = hashlib.sha256()
+    with zipfile.ZipFile(path, 'r') as zip_ref:
+        for member in zip_ref.infolist():
+            if member.filename.lower().endswith(extensions):
+                members += 1
+            content_hash.update(f"{member.filename}\0{member.CRC}\0{member.file_size}\n".encode('utf-8'))
+    return members, content_hash.hexdigest()
+
+
+def archive_row(path, match, stat, members, content_hash):
+    """source_archives row for an archive; match is its month_label"""
+    kind, topic_month = match
+    return (
+        path, os.path.dirname(path), kind, topic_month, parse_topic_date(topic_month), stat.st_size,
+        stat.st_mtime_ns, members, content_hash, datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    )
+
+
+def scan_row(path, match, stat):
+    """Read an archive found in a folder; one that cannot be read yet is stored without counts"""
+    try:
+        members, content_hash = read_archive(path, match[0])
+    except (OSError, zipfile.BadZipFile) as e:
+        # Most likely still being delivered; scanned again once it changes
+        print(f"Could not read source archive {path}: {str(e)}")
+        members = content_hash = None
+    return archive_row(path, match, stat, members, content_hash)
+
+
+class SourceArchive:
+    """One catalogued database or images ZIP"""
+
+    def __init__(self, row):
+        (self.path, self.folder, self.kind, self.topic_month, self.topic_date, self.size,
+         self.mtime_ns, self.members, self.content_hash, self.scanned_at, self.verified_at, self.bad_member) = row
+
+
+class SourceMonth:
+    """A topic month whose database and images ZIPs sit together in one folder"""
+
+    def __init__(self, row):
+        (self.folder, self.topic_month, self.topic_date, self.database_zip, self.images_zip,
+         self.xml_files, self.images, self.size, self.months_in_folder) = row
+
+    @property
+    def shares_folder(self):
+        """Whether the folder holds other months too, so the upload must name this one"""
+        return self.months_in_folder > 1
+
+
+class SourceCatalogue:
+    """
+    Known source archives with their topic month, size, modification time,
+    member count and content hash, kept in the upload history database.
+    Refreshing a folder only opens archives that are new or whose size or
+    modification time changed, so choosing a month and checking its counts
+    are lookups instead of directory and archive scans.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def refresh(self, folder):
+        """Bring a folder's entries up to date and return its complete months"""
+        folder = os.path.abspath(folder)
+        known = {
+            path: (size, mtime_ns) for path, size, mtime_ns in self.store.fetchall(FOLDER_SIGNATURES_SQL, (folder,))
+        }
+
+        try:
+            entries = list(os.scandir(folder))
+        except OSError as e:
+            if os.path.isdir(folder):
+                print(f"Error reading source folder {folder}: {str(e)}")
+                return self.months(folder)
+            # The folder is gone, and so are its archives
+            entries = []
+
+        rows = []
+        found = set()
+        for entry in entries:
+            match = month_label(entry.name)
+            if not match:
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+            except OSError:
+                continue
+            found.add(entry.path)
+            if known.get(entry.path) == (stat.st_size, stat.st_mtime_ns):
+                continue
+            rows.append(scan_row(entry.path, match, stat))
+
+        vanished = [path for path in known if path not in found]
+        if rows or vanished:
+            with self.store.transaction() as conn:
+                for row in rows:
+                    conn.execute(SAVE_ARCHIVE_SQL, row)
+                for path in vanished:
+                    conn.execute(DELETE_ARCHIVE_SQL, (path,))
+            tracer.log(f"Source catalogue: {len(rows)} archives scanned and {len(vanished)} removed in {folder}")
+        return self.months(folder)
+
+    def known_folders(self):
+        return [row[0] for row in self.store.fetchall(KNOWN_FOLDERS_SQL)]
+
+    def refresh_known_folders(self, roots=()):
+        """
+        Refresh every folder already in the catalogue, plus the sub-folders of
+        roots (e.g. the watched drop folders, which get one folder per month)
+        """
+        folders = set(self.known_folders())
+        for root in roots:
+            try:
+                folders.update(entry.path for entry in os.scandir(os.path.abspath(root)) if entry.is_dir())
+            except OSError as e:
+                print(f"Error reading {root}: {str(e)}")
+        for folder in sorted(folders):
+            self.refresh(folder)
+
+    def months(self, folder=None, limit=MONTH_CHOICES):
+        """Complete months, newest first, in one folder or across the catalogue"""
+        if folder is None:
+            rows = self.store.fetchall(ALL_MONTHS_SQL, (limit,))
+        else:
+            rows = self.store.fetchall(FOLDER_MONTHS_SQL, (os.path.abspath(folder), limit))
+        return [SourceMonth(row) for row in rows]
+
+    def lookup(self, path):
+        """The catalogued entry for an archive, or None if it is unknown or changed since"""
+        row = self.store.fetchone(ARCHIVE_SQL, (os.path.abspath(path),))
+        if row is None:
+            return None
+        archive = SourceArchive(row)
+        stat = os.stat(archive.path)
+        if (stat.st_size, stat.st_mtime_ns) != (archive.size, archive.mtime_ns):
+            return None
+        return archive
+
+    def record_verification(self, archive, bad_member):
+        """Store an integrity check of an archive: the first damaged member, or None if it is sound"""
+        self.store.execute(RECORD_VERIFICATION_SQL, (
+            datetime.now().strftime("%Y-%m-%d %H:%M:%S"), bad_member, archive.path, archive.size, archive.mtime_ns
+        ))
+
+    def member_count(self, path, kind):
+        """
+        Members counted for the upload history. Taken from the catalogue when
+        the archive is unchanged; otherwise it is read now and catalogued.
+        """
+        try:
+            archive = self.lookup(path)
+        except (OSError, sqlite3.Error):
+            archive = None
+        if archive is not None and archive.members is not None:
+            return archive.members
+
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        members, content_hash = read_archive(path, kind)
+        match = month_label(os.path.basename(path))
+        if match and match[0] == kind:
+            try:
+                self.store.execute(SAVE_ARCHIVE_SQL, archive_row(path, match, stat, members, content_hash))
+            except sqlite3.Error as e:
+                print(f"Error cataloguing {path}: {str(e)}")
+        return members
+
+
+def main(argv=None):
+    """Command-line entry point: python -m tasks.source_catalogue (or main.py catalogue)"""
+    parser = argparse.ArgumentParser(prog="catalogue", description="Catalogue the topic months in source folders")
+    parser.add_argument("--db", default=UPLOAD_DB_FILE, help="upload history database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    refresh = commands.add_parser("refresh", help="scan folders for new or changed archives")
+    refresh.add_argument("folders", nargs="*", help="folders to scan (default: every folder already catalogued)")
+
+    listing = commands.add_parser("list", help="show the catalogued months, newest first")
+    listing.add_argument("--folder", help="only months in this folder")
+    listing.add_argument("--limit", type=int, default=MONTH_CHOICES)
+
+    args = parser.parse_args(argv)
+    os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+    store = get_store(os.path.abspath(args.db))
+    store.migrate(UPLOAD_MIGRATIONS)
+    catalogue = SourceCatalogue(store)
+
+    if args.command == "refresh":
+        if args.folders:
+            for folder in args.folders:
+                catalogue.refresh(folder)
+        else:
+            catalogue.refresh_known_folders()
+        return 0
+
+    print(f"{'Topic month':<20}{'XML':>7}{'Images':>8}{'Size':>11}  Folder")
+    for month in catalogue.months(args.folder, args.limit):
+        print(
+            f"{month.topic_month:<20}{month.xml_files:>7}{month.images:>8}"
+            f"{format_bytes(month.size):>11}  {month.folder}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
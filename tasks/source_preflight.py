@@ -0,0 +1,149 @@
+#source_preflight
+import os
+import sqlite3
+import threading
+import time
+import zipfile
+import zlib
+
+from tasks.source_catalogue import SourceCatalogue
+from utils.tracing import tracer
+
+# Bytes read at a time while checking a member, and so how quickly a cancel is noticed
+READ_CHUNK = 1024 * 1024
+
+
+def find_damaged_member(zip_path, cancelled=None):
+    """
+    Read every member of a ZIP, checking its data against its CRC. Returns
+    (finished, name of the first damaged member or None); finished is False
+    when cancelled was set part way through.
+    """
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        for member in zip_ref.infolist():
+            if cancelled is not None and cancelled.is_set():
+                return False, None
+            try:
+                # The CRC is checked when the member has been read to the end
+                with zip_ref.open(member) as data:
+                    while data.read(READ_CHUNK):
+                        if cancelled is not None and cancelled.is_set():
+                            return False, None
+            except (zipfile.BadZipFile, zlib.error, EOFError, NotImplementedError):
+                return True, member.filename
+    return True, None
+
+
+class SourcePreflight:
+    """
+    Checks a source folder in the background from the moment it is picked,
+    while the user is still answering the upload dialogs: the folder is
+    catalogued (central directories, member counts and content hashes) and
+    every member of its archives is read to check it against its CRC.
+
+    Results are recorded in the source catalogue against the archive's size
+    and modification time. When the upload is queued, whatever has been
+    found by then is handed to the pipeline: the log stage takes its counts
+    from the catalogue and the extract stage refuses an archive found
+    damaged. Checks still running are cancelled either way and their partial
+    work discarded; the extract stage reads the archives anyway and checks
+    every member's CRC as it goes, so a second read would only compete with
+    it for the same disk or share.
+    """
+
+    def __init__(self, store, source_folder, topic_month=None):
+        self.catalogue = SourceCatalogue(store)
+        self.source_folder = os.path.abspath(source_folder)
+        self.topic_month = topic_month  # Only this month is checked once it is known
+        self.damaged = {}  # Archive path -> first damaged member, for archives found damaged
+        self._months = []
+        self.months_ready = threading.Event()
+        self.cancelled = threading.Event()
+        self.finished = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+        return self
+
+    def months(self):
+        """The folder's complete months; empty until months_ready is set"""
+        return self._months
+
+    def choose(self, topic_month):
+        """The user picked one of the folder's months; the others are not checked"""
+        self.topic_month = topic_month
+
+    def cancel(self):
+        """The upload is not going ahead"""
+        self.cancelled.set()
+
+    def hand_off(self, database_zip, images_zip):
+        """
+        The upload is going ahead with these archives. Returns an error
+        message if one of them was already found damaged, otherwise None.
+        Checks still running are cancelled, since extraction is about to
+        read the same archives and verifies their CRCs itself.
+        """
+        self.cancel()
+        for zip_path in (database_zip, images_zip):
+            bad_member = self.damaged.get(os.path.abspath(zip_path))
+            if bad_member:
+                return (
+                    f"{os.path.basename(zip_path)} is damaged: {bad_member} does not match its checksum.\n\n"
+                    "Please get a new copy of the file."
+                )
+        return None
+
+    def run(self):
+        started = time.perf_counter()
+        try:
+            self._months = self.catalogue.refresh(self.source_folder)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Source preflight could not catalogue {self.source_folder}: {str(e)}")
+            self.finished.set()
+            return
+        finally:
+            self.months_ready.set()
+
+        checked = 0
+        try:
+            for month in self._months:
+                for zip_path in (month.database_zip, month.images_zip):
+                    if self.cancelled.is_set():
+                        return
+                    if self.topic_month and month.topic_month.lower() != self.topic_month.lower():
+                        continue
+                    checked += self.check(zip_path)
+            tracer.log(
+                f"Source preflight of {self.source_folder}: {checked} archives checked "
+                f"in {time.perf_counter() - started:.1f}s"
+            )
+        finally:
+            self.finished.set()
+
+    def check(self, zip_path):
+        """Check one archive unless it was checked before; returns whether it was read"""
+        try:
+            archive = self.catalogue.lookup(zip_path)
+            if archive is None or archive.members is None:
+                return False  # Unreadable; the upload reports that itself
+            if archive.verified_at:
+                # Checked before and unchanged since
+                if archive.bad_member:
+                    self.damaged[archive.path] = archive.bad_member
+                return False
+
+            with tracer.span("preflight check", zip=os.path.basename(zip_path), bytes=archive.size) as span:
+                finished, bad_member = find_damaged_member(archive.path, self.cancelled)
+                span["finished"] = finished
+            if not finished:
+                return False
+            self.catalogue.record_verification(archive, bad_member)
+        except (OSError, zipfile.BadZipFile, sqlite3.Error) as e:
+            print(f"Source preflight could not check {zip_path}: {str(e)}")
+            return False
+
+        if bad_member:
+            tracer.log(f"Source preflight: {os.path.basename(zip_path)} is damaged at {bad_member}")
+            self.damaged[archive.path] = bad_member
+        return True
@@ -3,10 +3,73 @@ import subprocess
 import shutil
 import sqlite3
 from datetime import datetime
-import tkinter as tk
 from tkinter import messagebox
 import threading
-from ui.dialogs import ProgressDialog, ConfirmationDialog
+import time
+from ui.dialogs import ConfirmationDialog, DeletionProgressDialog
+from utils.deletion import DeletionWorker, tombstone_directory
+from utils.job_events import job_events
+from utils.metrics import STAGE_DURATION, BYTES_PROCESSED, JOB_EXIT_CODES
+from utils.tracing import tracer
+from utils.run_profiler import RunProfiler, profile_request
+from utils.history_store import get_store
+from utils.history_query import HistoryPager, EXPORT_HISTORY_QUERY, warn_on_slow_query_plans
+from utils.history_schema import EXPORT_MIGRATIONS
+
+# Statements are kept as constants so pooled connections reuse their compiled form
+INSERT_EXPORT_SQL = '''
+INSERT INTO exports (
+    export_timestamp, 
+    export_folder,
+    status,
+    export_path,
+    started_at
+) VALUES (NULL, ?, 'pending', ?, ?)
+'''
+
+UPDATE_EXPORT_STATUS_SQL = '''
+UPDATE exports 
+SET status = ?, 
+    finished_at = ? 
+WHERE id = ?
+'''
+
+UPDATE_EXPORT_STATUS_TIMESTAMP_SQL = '''
+UPDATE exports 
+SET export_timestamp = ?, 
+    status = ?, 
+    finished_at = ? 
+WHERE id = ?
+'''
+
+# Where the export batch file leaves its output
+EXPORT_DIR = "C:\\opt\\software\\eeplus\\input\\eeplus\\ThirdPartyExport\\"
+
+EXPORT_FILES = [
+    "checksums.md5",
+    "eep_anatomyimages.zip",
+    "eep_cdr.zip",
+    "eep_cochrane.zip",
+    "eep_dermimages.zip",
+    "eep_eetopics.zip",
+    "eep_hp_diag.zip",
+    "eep_metadata.xls.zip"
+]
+
+
+def find_missing_export_files(export_dir, export_files):
+    """Return the expected export files that are not in export_dir"""
+    return [file for file in export_files if not os.path.exists(os.path.join(export_dir, file))]
+
+
+def copy_export_files(export_dir, export_folder, export_files, on_file=None):
+    """Copy the exported files to the dated folder; on_file(done, total, name) before each copy"""
+    for index, file in enumerate(export_files):
+        if on_file:
+            on_file(index, len(export_files), file)
+        source = os.path.join(export_dir, file)
+        shutil.copy2(source, os.path.join(export_folder, file))
+        BYTES_PROCESSED.inc(os.path.getsize(source), pipeline="export", stage="copy")
 
 
 class TetonContentExportTask:
@@ -17,26 +80,31 @@ class TetonContentExportTask:
         self.export_folder = None
         self.current_export_id = None
         self.export_process = None
-        self.export_files = [
-            "checksums.md5",
-            "eep_anatomyimages.zip",
-            "eep_cdr.zip",
-            "eep_cochrane.zip",
-            "eep_dermimages.zip",
-            "eep_eetopics.zip",
-            "eep_hp_diag.zip",
-            "eep_metadata.xls.zip"
-        ]
+        self.export_job = None  # Job event handle for the dashboard
+        self.export_trace = None  # Trace run of the latest export
+        self.export_files = EXPORT_FILES
 
         # Database file path
         self.db_file = os.path.abspath(os.path.join("Teton Export History", "teton_exports.db"))
+        self.store = get_store(self.db_file)
 
-        # Initialize database
-        self.init_export_db()
+        # The database is initialized off the Tk thread after the window is shown
+        # (see GradientWindow.start_deferred_startup); queries wait for it
+        self.db_ready = threading.Event()
 
     def init_export_db(self):
-        """Initialize SQLite database for export tracking if it doesn't exist"""
-        history_folder = "Teton Export History"
+        """
+        Initialize SQLite database for export tracking if it doesn't exist.
+        Safe to call from a background thread; warnings are shown on the Tk thread.
+        """
+        try:
+            self._init_export_db()
+        finally:
+            # Never leave callers waiting, even if the database could not be set up
+            self.db_ready.set()
+
+    def _init_export_db(self):
+        history_folder = os.path.dirname(self.db_file)
 
         # Create directory if it doesn't exist
         if not os.path.exists(history_folder):
@@ -45,147 +113,90 @@ class TetonContentExportTask:
                 print(f"Created directory: {history_folder}")
             except Exception as e:
                 print(f"Error creating directory {history_folder}: {str(e)}")
-                messagebox.showwarning("Directory Warning",
-                                       f"Could not create {history_folder} directory. History will not be saved.")
+                self.root.after(0, lambda: messagebox.showwarning(
+                    "Directory Warning",
+                    f"Could not create {history_folder} directory. History will not be saved."
+                ))
                 return
 
         try:
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
-
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS exports (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                export_timestamp TEXT,
-                export_folder TEXT NOT NULL,
-                status TEXT DEFAULT 'pending'
-            )
-            ''')
-
-            cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_export_timestamp 
-            ON exports(export_timestamp)
-            ''')
-
-            # Check if status column exists, if not add it (for existing databases)
-            cursor.execute('''
-            PRAGMA table_info(exports)
-            ''')
-            columns = [column[1] for column in cursor.fetchall()]
-            if 'status' not in columns:
-                cursor.execute('''
-                ALTER TABLE exports
-                ADD COLUMN status TEXT DEFAULT 'completed'
-                ''')
-                # Assume all existing records were completed successfully
-                cursor.execute('''
-                UPDATE exports
-                SET status = 'completed'
-                WHERE status IS NULL
-                ''')
-
-            conn.commit()
-            conn.close()
+            # Apply any pending schema migrations once, before the first query
+            self.store.migrate(EXPORT_MIGRATIONS)
             print(f"Successfully initialized database: {self.db_file}")
 
+            # Catch index regressions early: every history query must read an index in order
+            warn_on_slow_query_plans(self.store, EXPORT_HISTORY_QUERY)
+
         except Exception as e:
             print(f"Error initializing export database: {str(e)}")
-            messagebox.showwarning("Database Warning",
-                                   "Could not initialize export tracking database. History will not be saved.")
+            self.root.after(0, lambda: messagebox.showwarning(
+                "Database Warning",
+                "Could not initialize export tracking database. History will not be saved."
+            ))
 
     def log_export_start(self, export_folder):
         """Log the start of an export with pending status"""
-        conn = None
+        self.db_ready.wait()
+
         try:
             folder_name = os.path.basename(export_folder)
 
-            conn = sqlite3.connect(self.db_file, timeout=30)
-            cursor = conn.cursor()
+            cursor = self.store.execute(INSERT_EXPORT_SQL, (
+                folder_name,
+                os.path.abspath(export_folder),
+                datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            ))
 
-            cursor.execute('''
-            INSERT INTO exports (
-                export_timestamp, 
-                export_folder,
-                status
-            ) VALUES (NULL, ?, 'pending')
-            ''', (folder_name,))
-
-            conn.commit()
             export_id = cursor.lastrowid
-            print(f"Successfully logged export start to database with ID: {export_id}")
+            tracer.log(f"Successfully logged export start to database with ID: {export_id}")
             return export_id
 
         except Exception as e:
-            print(f"Error logging export start to database: {str(e)}")
+            tracer.log(f"Error logging export start to database: {str(e)}")
             messagebox.showerror("Database Error", f"Failed to log export to database: {str(e)}")
             return None
-        finally:
-            if conn:
-                conn.close()
 
     def update_export_status(self, export_id, status, add_timestamp=False):
         """Update the export status in the database"""
+        self.db_ready.wait()
+
         if export_id is None:
-            print(f"Cannot update status to '{status}': export_id is None")
+            tracer.log(f"Cannot update status to '{status}': export_id is None")
             return False
 
-        conn = None
         try:
-            print(f"update_export_status called with export_id={export_id}, status={status}")
-
-            if not os.path.exists(os.path.dirname(self.db_file)):
-                os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+            tracer.log(f"update_export_status called with export_id={export_id}, status={status}")
 
-            if not os.path.exists(self.db_file):
-                print(f"Database file does not exist: {self.db_file}")
-                return False
+            # Format timestamp in Excel-friendly format (YYYY-MM-DD HH:MM:SS)
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-            conn = sqlite3.connect(self.db_file, timeout=30)
-            cursor = conn.cursor()
-
-            # First verify the record exists
-            cursor.execute("SELECT id FROM exports WHERE id = ?", (export_id,))
-            if not cursor.fetchone():
-                print(f"Record with ID {export_id} does not exist in database")
-                return False
+            # Any status other than pending ends the run; the monthly statistics
+            # are adjusted by triggers in the same transaction as this update
+            finished_at = None if status == "pending" else timestamp
 
             if add_timestamp:
-                # Format timestamp in Excel-friendly format (YYYY-MM-DD HH:MM:SS)
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                print(f"Updating record {export_id} with timestamp {timestamp} and status {status}")
+                tracer.log(f"Updating record {export_id} with timestamp {timestamp} and status {status}")
 
                 # Update the record with timestamp and status
-                cursor.execute('''
-                UPDATE exports 
-                SET export_timestamp = ?, 
-                    status = ? 
-                WHERE id = ?
-                ''', (timestamp, status, export_id))
+                cursor = self.store.execute(UPDATE_EXPORT_STATUS_TIMESTAMP_SQL, (timestamp, status, finished_at, export_id))
             else:
                 # Just update the status
-                cursor.execute('''
-                UPDATE exports 
-                SET status = ? 
-                WHERE id = ?
-                ''', (status, export_id))
-
-            conn.commit()
-            print(f"Successfully updated record {export_id} status to {status}")
+                cursor = self.store.execute(UPDATE_EXPORT_STATUS_SQL, (status, finished_at, export_id))
+
+            # No matching row means the record does not exist
+            if cursor.rowcount == 0:
+                tracer.log(f"Record with ID {export_id} does not exist in database")
+                return False
+
+            tracer.log(f"Successfully updated record {export_id} status to {status}")
             return True
 
         except sqlite3.Error as e:
-            print(f"SQLite error in update_export_status: {str(e)}")
-            if conn:
-                conn.rollback()
+            tracer.log(f"SQLite error in update_export_status: {str(e)}")
             return False
         except Exception as e:
-            print(f"General error in update_export_status: {str(e)}")
-            if conn:
-                conn.rollback()
+            tracer.log(f"General error in update_export_status: {str(e)}")
             return False
-        finally:
-            if conn:
-                conn.close()
 
     def start_teton_export(self):
         """Start the Teton content export process with confirmation"""
@@ -206,6 +217,8 @@ class TetonContentExportTask:
         try:
             # Create export folder on desktop
             current_date = datetime.now().strftime("%Y-%m-%d")
+            self.export_job = job_events.start_job(f"Teton export {current_date}", "export")
+            self.export_trace = tracer.begin_run(f"Teton export {current_date}", "export")
             desktop_path = os.path.join(os.path.expanduser("~"), "Desktop")
             self.export_folder = os.path.join(desktop_path, f"{current_date}")
 
@@ -227,15 +240,16 @@ class TetonContentExportTask:
             if not os.path.exists(batch_file):
                 raise FileNotFoundError(f"Batch file not found at {batch_file}")
 
-            # Change to the batch file's directory before running it
-            batch_dir = os.path.dirname(batch_file)
-            os.chdir(batch_dir)
-
-            # Run the batch file in a new console window
-            self.export_process = subprocess.Popen(
-                ['cmd', '/c', batch_file],
-                creationflags=subprocess.CREATE_NEW_CONSOLE
-            )
+            # Run the batch file from its own directory in a new console window
+            with tracer.span("launch export batch file", "job", path=batch_file) as span:
+                self.export_process = subprocess.Popen(
+                    ['cmd', '/c', batch_file],
+                    cwd=os.path.dirname(batch_file),
+                    creationflags=subprocess.CREATE_NEW_CONSOLE
+                )
+                span["pid"] = self.export_process.pid
+            self.export_job.stage("Compiling export in console window")
+            self.export_job.log(f"Process {self.export_process.pid}")
 
             # Start a thread to monitor the process
             monitor_thread = threading.Thread(
@@ -248,6 +262,10 @@ class TetonContentExportTask:
             # Mark as failed in the database
             if self.current_export_id:
                 self.update_export_status(self.current_export_id, "failed")
+            if self.export_job:
+                self.export_job.finish("failed", str(e))
+            if self.export_trace:
+                self.export_trace.finish("failed")
 
             messagebox.showerror(
                 "Export Failed",
@@ -256,15 +274,25 @@ class TetonContentExportTask:
 
     def monitor_export_process(self):
         """Monitor the export process and handle completion without progress dialog"""
+        job = self.export_job
+        trace_status = "failed"
+        cpu_profiler = None
         try:
             # Wait for the process to complete
-            return_code = self.export_process.wait()
+            started = time.perf_counter()
+            with tracer.span("wait for export batch file", "job", pid=self.export_process.pid) as span:
+                return_code = self.export_process.wait()
+                span["exit_code"] = return_code
+            JOB_EXIT_CODES.inc(job="export", code=return_code)
+            STAGE_DURATION.observe(time.perf_counter() - started, pipeline="export", stage="compile")
             was_manually_closed = return_code != 0
 
             if was_manually_closed:
                 # Update database to show interrupted
                 if self.current_export_id:
                     self.update_export_status(self.current_export_id, "interrupted")
+                job.finish("interrupted", f"Exit code {return_code}")
+                trace_status = "interrupted"
 
                 # Show warning message
                 self.root.after(0, lambda: messagebox.showwarning(
@@ -273,14 +301,19 @@ class TetonContentExportTask:
                 ))
                 return
 
-            # Process completed normally, continue with verification and file copying
-            export_dir = "C:\\opt\\software\\eeplus\\input\\eeplus\\ThirdPartyExport\\"
+            # Only the post-processing runs in this process, so that is what gets profiled
+            if profile_request.take():
+                cpu_profiler = RunProfiler("export")
+                job.log("Profiling the export post-processing")
+                cpu_profiler.enable()
 
-            # Verify the exported files
-            missing_files = []
-            for file in self.export_files:
-                if not os.path.exists(os.path.join(export_dir, file)):
-                    missing_files.append(file)
+            # Process completed normally, continue with verification and file copying
+            job.stage("Verifying exported files")
+            started = time.perf_counter()
+            with tracer.span("verify exported files", files=len(self.export_files)) as span:
+                missing_files = find_missing_export_files(EXPORT_DIR, self.export_files)
+                span["missing"] = len(missing_files)
+            STAGE_DURATION.observe(time.perf_counter() - started, pipeline="export", stage="verify")
 
             if missing_files:
                 # Update database to show failed
@@ -288,20 +321,30 @@ class TetonContentExportTask:
                     self.update_export_status(self.current_export_id, "failed")
 
                 error_msg = f"Missing exported files: {', '.join(missing_files)}"
+                job.finish("failed", error_msg)
                 self.root.after(0, lambda: messagebox.showerror("Export Failed", error_msg))
                 return
 
             # Copy files to the dated folder
             try:
                 # Copy each file
-                for file in self.export_files:
-                    src = os.path.join(export_dir, file)
-                    dst = os.path.join(self.export_folder, file)
-                    shutil.copy2(src, dst)
+                job.stage("Copying files to export folder")
+
+                def on_file(done, total, name):
+                    job.progress(done, total, "files")
+                    job.log(name)
+
+                started = time.perf_counter()
+                with tracer.span("copy exported files", destination=self.export_folder):
+                    copy_export_files(EXPORT_DIR, self.export_folder, self.export_files, on_file)
+                STAGE_DURATION.observe(time.perf_counter() - started, pipeline="export", stage="copy")
+                job.progress(len(self.export_files), len(self.export_files), "files")
 
                 # Mark export as completed in database
                 if self.current_export_id:
                     self.update_export_status(self.current_export_id, "completed", add_timestamp=True)
+                job.finish("completed", f"Files copied to {self.export_folder}")
+                trace_status = "completed"
 
                 if self.on_export_complete:
                     self.root.after(0, self.on_export_complete)
@@ -317,6 +360,7 @@ class TetonContentExportTask:
                     self.update_export_status(self.current_export_id, "failed")
 
                 error_msg = f"Failed to copy exported files: {str(e)}"
+                job.finish("failed", error_msg)
                 self.root.after(0, lambda: messagebox.showerror("Export Failed", error_msg))
 
         except Exception as e:
@@ -325,54 +369,21 @@ class TetonContentExportTask:
                 self.update_export_status(self.current_export_id, "failed")
 
             error_msg = f"Error monitoring export process: {str(e)}"
+            job.finish("failed", error_msg)
             self.root.after(0, lambda: messagebox.showerror("Export Error", error_msg))
         finally:
+            if cpu_profiler:
+                cpu_profiler.save(os.path.dirname(self.db_file), self.current_export_id)
+            self.export_trace.finish(trace_status)
+
             # Clean up
             self.current_export_id = None
             self.export_process = None
 
-    def get_export_history(self):
-        """Get the export history data from database"""
-        try:
-            # Ensure directory exists
-            os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
-
-            # Ensure the database file exists
-            if not os.path.exists(self.db_file):
-                print(f"Database file does not exist: {self.db_file}")
-                return []
-
-            # Connect with timeout to avoid locking issues
-            conn = sqlite3.connect(self.db_file, timeout=30)
-            cursor = conn.cursor()
-
-            # Check if status column exists
-            cursor.execute("PRAGMA table_info(exports)")
-            columns = [column[1] for column in cursor.fetchall()]
-
-            if 'status' in columns:
-                cursor.execute('''
-                SELECT id, export_timestamp, export_folder, status
-                FROM exports
-                ORDER BY 
-                    CASE WHEN export_timestamp IS NULL THEN 1 ELSE 0 END,
-                    export_timestamp DESC
-                ''')
-            else:
-                # Fallback for databases without status column
-                cursor.execute('''
-                SELECT id, export_timestamp, export_folder
-                FROM exports
-                ORDER BY export_timestamp DESC
-                ''')
-
-            history = cursor.fetchall()
-            print(f"Retrieved {len(history)} export history records")
-            conn.close()
-            return history
-        except Exception as e:
-            print(f"Error fetching export history: {str(e)}")
-            return []
+    def get_export_history_pager(self):
+        """Return a pager that reads the export history a page at a time"""
+        self.db_ready.wait()
+        return HistoryPager(self.store, EXPORT_HISTORY_QUERY)
 
     def open_exported_folder(self):
         """Open the exported files folder in File Explorer"""
@@ -407,18 +418,44 @@ class TetonContentExportTask:
 
         if confirm.result:
             try:
-                shutil.rmtree(self.export_folder)
+                # Rename first so the folder disappears at once, then delete in the background
+                tombstone_path = tombstone_directory(self.export_folder)
                 self.export_folder = None
 
                 if self.on_folder_cleared:
                     self.on_folder_cleared()
 
-                messagebox.showinfo(
-                    "Success",
-                    "Exported files folder has been deleted."
+                worker = DeletionWorker(
+                    tombstone_path,
+                    job=job_events.start_job("Delete exported files", "deletion")
+                )
+                worker.start()
+                DeletionProgressDialog(
+                    self.root,
+                    worker,
+                    title="Deleting Exported Files",
+                    on_finished=self.on_exported_folder_deleted
                 )
             except Exception as e:
                 messagebox.showerror(
                     "Error",
                     f"Failed to delete folder: {str(e)}"
-                )
\ No newline at end of file
+                )
+
+    def on_exported_folder_deleted(self, completed, error):
+        """Report the result of the background deletion"""
+        if error:
+            messagebox.showerror(
+                "Error",
+                f"Failed to delete folder: {str(error)}"
+            )
+        elif completed:
+            messagebox.showinfo(
+                "Success",
+                "Exported files folder has been deleted."
+            )
+        else:
+            messagebox.showinfo(
+                "Deletion Cancelled",
+                "Deletion was cancelled. The remaining files will be removed the next time the tool starts."
+            )
\ No newline at end of file
@@ -0,0 +1,754 @@
+#topic_upload_engine
+import argparse
+import contextlib
+import os
+import re
+import shutil
+import sqlite3
+import subprocess
+import sys
+import time
+import zipfile
+from datetime import datetime
+
+from utils.metrics import STAGE_DURATION, BYTES_PROCESSED, JOB_EXIT_CODES
+from utils.tracing import tracer
+
+UPLOAD_DB_FILE = os.path.join("Topic Upload History", "topic_uploads.db")
+
+WORKING_FOLDER_NAME = "EEP Topic Upload Temporary Files"
+
+SERVER_LOCATION = "C:\\opt\\software\\eeplus\\received-data\\"
+
+FILTER_JOB_PATH = "C:\\opt\\software\\eeplus\\bin\\eeplus-filters-R01B085\\runEETopicsFilterTask.bat"
+
+ELASTIC_INDEX_JOB_PATHS = {
+    "UAT": "C:\\inetpub\\UAT Jobs\\UpdateElasticIndexJob_UAT\\UpdateElasticIndexJob.exe",
+    "Production": "C:\\Jobs\\UpdateElasticIndexjob_UAT\\UpdateElasticIndexJob.exe",
+}
+
+DATABASE_PATTERN = r'database-\d+-\w+-\d+\.zip'
+IMAGES_PATTERN = r'\d+-\w+-\d+-images\.zip'
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp')
+
+# Every stage of an upload, in the order they run
+UPLOAD_STAGES = ("extract", "repack", "copy", "log", "filter", "index")
+
+# Stages that only work on files; the GUI runs these on its worker thread and
+# asks before starting the filter and index jobs
+FILE_STAGES = ("extract", "repack", "copy", "log")
+
+# Share of the overall progress bar taken by each stage
+STAGE_WEIGHTS = {"extract": 0.55, "repack": 0.3, "copy": 0.15}
+
+# Command-line exit codes: 2 is a usage error, 1 an unexpected failure and
+# each stage that can fail has its own code
+EXIT_OK = 0
+EXIT_UNEXPECTED_ERROR = 1
+EXIT_USAGE = 2
+STAGE_EXIT_CODES = {
+    "source": 3,
+    "extract": 4,
+    "repack": 5,
+    "copy": 6,
+    "log": 7,
+    "filter": 8,
+    "index": 9,
+}
+
+# Statements are kept as constants so pooled connections reuse their compiled form
+INSERT_UPLOAD_SQL = '''
+INSERT INTO uploads (
+    upload_timestamp, topic_month, xml_files, images,
+    database_zip, images_zip, status, working_folder, started_at
+) VALUES (NULL, ?, ?, ?, ?, ?, 'pending', ?, ?)
+'''
+
+UPDATE_UPLOAD_STATUS_SQL = '''
+UPDATE uploads
+SET status = ?,
+    finished_at = ?
+WHERE id = ?
+'''
+
+UPDATE_UPLOAD_STATUS_TIMESTAMP_SQL = '''
+UPDATE uploads
+SET upload_timestamp = ?,
+    status = ?,
+    finished_at = ?
+WHERE id = ?
+'''
+
+
+class UploadError(Exception):
+    """An upload stage could not be completed; stage names which one"""
+
+    def __init__(self, stage, message):
+        super().__init__(message)
+        self.stage = stage
+
+
+def month_label(file_name):
+    """
+    ('database' or 'images', DD-Month-YYYY) for a delivered ZIP file name,
+    or None for anything else
+    """
+    if re.fullmatch(DATABASE_PATTERN, file_name, re.IGNORECASE):
+        return "database", file_name[len("database-"):-len(".zip")]
+    if re.fullmatch(IMAGES_PATTERN, file_name, re.IGNORECASE):
+        return "images", file_name[:-len("-images.zip")]
+    return None
+
+
+def find_topic_months(folder_path):
+    """Map each DD-Month-YYYY in a folder to its {'database': path, 'images': path}; either may be missing"""
+    months = {}
+    labels = {}
+    for file in sorted(os.listdir(folder_path)):
+        match = month_label(file)
+        if match:
+            kind, label = match
+            label = labels.setdefault(label.lower(), label)
+            months.setdefault(label, {})[kind] = os.path.join(folder_path, file)
+    return months
+
+
+def find_zip_files(folder_path, topic_month=None):
+    """
+    Find the database and images zip files in the specified folder. When it
+    holds more than one topic month, topic_month picks the one to use.
+    """
+    months = find_topic_months(folder_path)
+    databases = [files["database"] for files in months.values() if "database" in files]
+    images = [files["images"] for files in months.values() if "images" in files]
+
+    if topic_month is None:
+        # A single delivery is paired as-is, even if the days in its file names differ
+        if len(databases) <= 1 and len(images) <= 1:
+            return (databases[0] if databases else None), (images[0] if images else None)
+        complete = sorted(label for label, files in months.items() if len(files) == 2)
+        raise UploadError(
+            "source",
+            f"The folder holds more than one topic month ({', '.join(complete) or 'none complete'}). "
+            "Choose the month to upload."
+        )
+
+    files = next((files for label, files in months.items() if label.lower() == topic_month.lower()), {})
+    return files.get("database"), files.get("images")
+
+
+def extract_zip(zip_path, destination, on_file=None):
+    """
+    Extract a ZIP file and return the extracted folder path.
+    on_file(bytes_done, bytes_total, name) is called after each member.
+    """
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        members = zip_ref.infolist()
+        total = sum(member.file_size for member in members)
+        done = 0
+        for member in members:
+            zip_ref.extract(member, destination)
+            done += member.file_size
+            if on_file:
+                on_file(done, total, member.filename)
+
+    # Get the main folder name from the ZIP file
+    zip_filename = os.path.basename(zip_path)
+    folder_name = os.path.splitext(zip_filename)[0]
+
+    return os.path.join(destination, folder_name)
+
+
+def write_zip(output_zip, file_paths, base_folder, on_file=None):
+    """Write files into a new ZIP with paths relative to base_folder"""
+    total = len(file_paths)
+    with zipfile.ZipFile(output_zip, 'w') as zipf:
+        for index, file_path in enumerate(file_paths, 1):
+            arcname = os.path.relpath(file_path, base_folder)
+            zipf.write(file_path, arcname=arcname)
+            if on_file:
+                on_file(index, total, arcname)
+
+
+def process_database_files(search_root, output_zip, on_file=None):
+    """Search for validate folder recursively and process XML files"""
+    validate_folder = None
+
+    # Recursively search for validate folder
+    for root, dirs, files in os.walk(search_root):
+        if "validate" in dirs:
+            validate_folder = os.path.join(root, "validate")
+            break
+
+    if not validate_folder:
+        raise FileNotFoundError(f"Could not find validate folder in {search_root}")
+
+    xml_files = [
+        os.path.join(root, file)
+        for root, dirs, files in os.walk(validate_folder)
+        for file in files
+        if file.lower().endswith('.xml')
+    ]
+    write_zip(output_zip, xml_files, validate_folder, on_file)
+
+
+def process_image_files(search_root, output_zip, on_file=None):
+    """Search for Images folder recursively and process image files"""
+    images_folder = None
+
+    # Recursively search for Images folder (case insensitive)
+    for root, dirs, files in os.walk(search_root):
+        for dir_name in dirs:
+            if dir_name.lower() == "images":
+                images_folder = os.path.join(root, dir_name)
+                break
+        if images_folder:
+            break
+
+    if not images_folder:
+        raise FileNotFoundError(f"Could not find Images folder in {search_root}")
+
+    image_files = [
+        os.path.join(root, file)
+        for root, dirs, files in os.walk(images_folder)
+        for file in files
+        if file.lower().endswith(IMAGE_EXTENSIONS)
+    ]
+    write_zip(output_zip, image_files, images_folder, on_file)
+
+
+def count_zip_members(zip_path, extensions):
+    """Count the members of a ZIP whose names end with one of the extensions"""
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        # Count while walking the central directory instead of building name lists
+        return sum(1 for member in zip_ref.infolist() if member.filename.lower().endswith(extensions))
+
+
+def parse_topic_month(database_zip, images_zip):
+    """Return the DD-Month-YYYY topic month both ZIP file names refer to"""
+    db_match = re.search(r'database-(\d+)-(\w+)-(\d+)\.zip', database_zip, re.IGNORECASE)
+    img_match = re.search(r'(\d+)-(\w+)-(\d+)-images\.zip', images_zip, re.IGNORECASE)
+
+    if not db_match or not img_match:
+        raise UploadError("log", "Could not extract date information from filenames")
+
+    # Verify month names match
+    db_month = db_match.group(2).lower()
+    img_month = img_match.group(2).lower()
+    if db_month != img_month:
+        raise UploadError(
+            "log",
+            "Month names in ZIP files don't match:\n"
+            f"Database month: {db_month}\n"
+            f"Images month: {img_month}"
+        )
+
+    return f"{db_match.group(1)}-{db_match.group(2)}-{db_match.group(3)}"
+
+
+def new_console_flags(new_console):
+    """Popen creationflags opening the process in its own console window (Windows only)"""
+    return getattr(subprocess, "CREATE_NEW_CONSOLE", 0) if new_console else 0
+
+
+class TopicUploadEngine:
+    """
+    The topic upload pipeline without any UI: extract the source ZIPs, repack
+    them, copy them to the server, record the upload and run the filter and
+    Elasticsearch index jobs. Progress goes to a JsonProgressReporter or
+    QueueProgressReporter and failures are raised as UploadError, so the same
+    engine serves the queue's workers and the command line.
+    """
+
+    def __init__(self, store, server_location=SERVER_LOCATION, new_console=True):
+        self.store = store
+        self.server_location = server_location
+        self.new_console = new_console  # Open the filter and index jobs in their own console
+
+    def locate_source(self, source_folder, topic_month=None):
+        """
+        Return (database_zip, images_zip, working_folder) for a source folder;
+        topic_month picks one month from a folder holding several.
+        """
+        if not os.path.isdir(source_folder):
+            raise UploadError("source", f"Source folder does not exist: {source_folder}")
+
+        # Validate zip files exist
+        try:
+            database_zip, images_zip = find_zip_files(source_folder, topic_month)
+        except OSError as e:
+            raise UploadError("source", f"Failed to read source folder:\n{str(e)}")
+        if not database_zip or not images_zip:
+            raise UploadError(
+                "source",
+                "Required ZIP files not found.\n\nExpected files with format:\n"
+                "- database-DD-Month-YYYY.zip\n- DD-Month-YYYY-images.zip"
+            )
+
+        # Create working directory in the same folder user selected. Months
+        # sharing a folder each get their own next to it, never inside it, so
+        # clearing or reclaiming one working folder cannot touch another
+        working_folder = os.path.join(source_folder, WORKING_FOLDER_NAME)
+        if topic_month:
+            working_folder += f" - {month_label(os.path.basename(database_zip))[1]}"
+        try:
+            os.makedirs(working_folder, exist_ok=True)
+        except OSError as e:
+            raise UploadError("source", f"Failed to create working directory:\n{str(e)}")
+
+        return database_zip, images_zip, working_folder
+
+    def run(self, database_zip, images_zip, working_folder, progress, stages=UPLOAD_STAGES,
+            environment=None, upload_id=None, on_stage=None, memory_profiler=None, started_at=None):
+        """
+        Run the selected stages in order and return the upload ID (None when
+        neither the log stage ran nor an upload_id was given).
+        on_stage(name) is called as each stage starts. With a memory_profiler,
+        each stage's memory use is measured and stored with the upload record.
+        started_at is when the upload began (default: now), recorded by the
+        log stage so the history times the whole upload.
+        """
+        started_at = started_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            return self._run(database_zip, images_zip, working_folder, progress, stages,
+                             environment, upload_id, on_stage, memory_profiler, started_at)
+        finally:
+            if memory_profiler:
+                memory_profiler.stop()
+
+    def _run(self, database_zip, images_zip, working_folder, progress, stages,
+             environment, upload_id, on_stage, memory_profiler, started_at):
+        stages = [stage for stage in UPLOAD_STAGES if stage in stages]
+        if "index" in stages and environment not in ELASTIC_INDEX_JOB_PATHS:
+            raise UploadError("index", f"Unknown server environment: {environment}")
+
+        # Spread the progress bar over the stages that report progress
+        total_weight = sum(STAGE_WEIGHTS.get(stage, 0) for stage in stages) or 1.0
+        start = 0.0
+        ranges = {}
+        for stage in stages:
+            end = start + STAGE_WEIGHTS.get(stage, 0) / total_weight
+            ranges[stage] = (start, end)
+            start = end
+
+        # Filter and index only runs have no source or working folder
+        database_output = os.path.join(working_folder, "database.zip") if working_folder else None
+        images_output = os.path.join(working_folder, "images.zip") if working_folder else None
+
+        for stage in stages:
+            if on_stage:
+                on_stage(stage)
+            start, end = ranges[stage]
+
+            started = time.perf_counter()
+            profile = memory_profiler.stage(stage) if memory_profiler else contextlib.nullcontext()
+            with profile, tracer.span(f"stage: {stage}", "stage"):
+                if stage == "extract":
+                    self.extract(database_zip, images_zip, working_folder, progress, start, end)
+                elif stage == "repack":
+                    self.repack(working_folder, database_output, images_output, progress, start, end)
+                elif stage == "copy":
+                    progress.set_status("Copying files to server...")
+                    self.copy_to_server(database_output, images_output, on_file=progress.stage(start, end))
+                elif stage == "log":
+                    progress.set_status("Recording upload in history...")
+                    upload_id = self.log_upload(database_zip, images_zip, working_folder, started_at)
+                elif stage == "filter":
+                    progress.set_status("Running filter job...")
+                    self.run_filter_job(upload_id)
+                elif stage == "index":
+                    progress.set_status(f"Updating Elasticsearch index ({environment})...")
+                    self.run_index_job(environment)
+            STAGE_DURATION.observe(time.perf_counter() - started, pipeline="upload", stage=stage)
+
+            if memory_profiler and upload_id is not None and stage in ("log", stages[-1]):
+                # Saved once the record exists and again at the end, so a
+                # failure in a later stage still leaves the earlier results
+                self.save_memory_profile(upload_id, memory_profiler)
+
+        return upload_id
+
+    def save_memory_profile(self, upload_id, memory_profiler):
+        tracer.log(f"Memory profile of upload {upload_id}:\n{memory_profiler.summary()}")
+        try:
+            memory_profiler.save(self.store, upload_id)
+        except sqlite3.Error as e:
+            tracer.log(f"Error saving memory profile: {str(e)}")
+
+    def extract(self, database_zip, images_zip, working_folder, progress, start=0.0, end=1.0):
+        """Extract both source ZIPs into the working folder"""
+        self.check_source_integrity(database_zip, images_zip)
+
+        # The database ZIP takes a bit more than half of the extraction time
+        middle = start + (end - start) * 0.55
+        try:
+            progress.set_status("Extracting database ZIP file...")
+            with tracer.span("extract_zip", zip=os.path.basename(database_zip), bytes=os.path.getsize(database_zip)):
+                extract_zip(database_zip, working_folder, on_file=progress.stage(start, middle, "bytes"))
+            BYTES_PROCESSED.inc(os.path.getsize(database_zip), pipeline="upload", stage="extract")
+
+            progress.set_status("Extracting images ZIP file...")
+            with tracer.span("extract_zip", zip=os.path.basename(images_zip), bytes=os.path.getsize(images_zip)):
+                extract_zip(images_zip, working_folder, on_file=progress.stage(middle, end, "bytes"))
+            BYTES_PROCESSED.inc(os.path.getsize(images_zip), pipeline="upload", stage="extract")
+        except (OSError, zipfile.BadZipFile) as e:
+            raise UploadError("extract", f"Failed to extract ZIP files: {str(e)}")
+
+    def check_source_integrity(self, *zip_paths):
+        """Refuse archives the source preflight found damaged, before extracting anything"""
+        # Imported here because the catalogue itself builds on this module
+        from tasks.source_catalogue import SourceCatalogue
+
+        catalogue = SourceCatalogue(self.store)
+        for zip_path in zip_paths:
+            try:
+                archive = catalogue.lookup(zip_path)
+            except (OSError, sqlite3.Error):
+                continue  # Not checked; extraction still verifies each member as it goes
+            if archive is not None and archive.bad_member:
+                raise UploadError(
+                    "extract",
+                    f"{os.path.basename(zip_path)} is damaged: {archive.bad_member} does not match its checksum"
+                )
+
+    def repack(self, working_folder, database_output, images_output, progress, start=0.0, end=1.0):
+        """Repackage the XML and image files into the ZIPs the server expects"""
+        middle = start + (end - start) / 2
+        try:
+            progress.set_status("Processing database XML files...")
+            with tracer.span("repack database files", output=database_output):
+                process_database_files(working_folder, database_output, on_file=progress.stage(start, middle))
+
+            progress.set_status("Processing image files...")
+            with tracer.span("repack image files", output=images_output):
+                process_image_files(working_folder, images_output, on_file=progress.stage(middle, end))
+            BYTES_PROCESSED.inc(
+                os.path.getsize(database_output) + os.path.getsize(images_output), pipeline="upload", stage="repack"
+            )
+        except OSError as e:
+            raise UploadError("repack", str(e))
+
+    def copy_to_server(self, database_zip, images_zip, on_file=None):
+        """Copy the repackaged files to the server location"""
+        # Check if server location exists
+        if not os.path.exists(self.server_location):
+            raise UploadError("copy", f"Server location does not exist: {self.server_location}")
+
+        try:
+            copies = [(database_zip, "database.zip"), (images_zip, "images.zip")]
+            for index, (source, name) in enumerate(copies):
+                if on_file:
+                    on_file(index, len(copies), name)
+                size = os.path.getsize(source)
+                with tracer.span("copy to server", file=name, bytes=size):
+                    shutil.copy2(source, os.path.join(self.server_location, name))
+                BYTES_PROCESSED.inc(size, pipeline="upload", stage="copy")
+            if on_file:
+                on_file(len(copies), len(copies), "")
+        except OSError as e:
+            raise UploadError("copy", f"Failed to copy files to server: {str(e)}")
+
+    def log_upload(self, database_zip, images_zip, working_folder, started_at=None):
+        """
+        Log upload metadata to the history database with 'pending' status and
+        no timestamp yet. started_at is when the upload began (default: now).
+        """
+        # Imported here because the catalogue itself builds on this module
+        from tasks.source_catalogue import SourceCatalogue
+
+        topic_month = parse_topic_month(database_zip, images_zip)
+
+        try:
+            # Count files in the original zips
+            with tracer.span("count zip members") as span:
+                # Usually already known from the source catalogue, without opening the archives
+                catalogue = SourceCatalogue(self.store)
+                xml_count = catalogue.member_count(database_zip, "database")
+                image_count = catalogue.member_count(images_zip, "images")
+                span.update(xml_files=xml_count, images=image_count)
+
+            # Insert with NULL timestamp and 'pending' status
+            cursor = self.store.execute(INSERT_UPLOAD_SQL, (
+                topic_month,
+                xml_count,
+                image_count,
+                os.path.basename(database_zip),
+                os.path.basename(images_zip),
+                working_folder,
+                started_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            ))
+        except (OSError, zipfile.BadZipFile, sqlite3.Error) as e:
+            raise UploadError("log", f"Failed to log upload to database: {str(e)}")
+
+        upload_id = cursor.lastrowid
+        tracer.log(f"Successfully logged upload to database with ID: {upload_id}")
+        return upload_id
+
+    def update_upload_status(self, upload_id, status, add_timestamp=False):
+        """Update the upload status in the database and return whether a record was updated"""
+        if upload_id is None:
+            tracer.log(f"Cannot update status to '{status}': upload_id is None")
+            return False
+
+        try:
+            tracer.log(f"update_upload_status called with upload_id={upload_id}, status={status}")
+
+            # Format timestamp in Excel-friendly format (YYYY-MM-DD HH:MM:SS)
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+            # Any status other than pending ends the run; the monthly statistics
+            # are adjusted by triggers in the same transaction as this update
+            finished_at = None if status == "pending" else timestamp
+
+            if add_timestamp:
+                tracer.log(f"Updating record {upload_id} with timestamp {timestamp} and status {status}")
+                cursor = self.store.execute(UPDATE_UPLOAD_STATUS_TIMESTAMP_SQL, (timestamp, status, finished_at, upload_id))
+            else:
+                cursor = self.store.execute(UPDATE_UPLOAD_STATUS_SQL, (status, finished_at, upload_id))
+
+            # No matching row means the record does not exist
+            if cursor.rowcount == 0:
+                tracer.log(f"Record with ID {upload_id} does not exist in database")
+                return False
+
+            tracer.log(f"Successfully updated record {upload_id} status to {status}")
+            return True
+
+        except sqlite3.Error as e:
+            tracer.log(f"SQLite error in update_upload_status: {str(e)}")
+            return False
+
+    def start_filter_job(self):
+        """Start the filter batch file from its own directory and return the process"""
+        if not os.path.exists(FILTER_JOB_PATH):
+            raise UploadError("filter", f"Filter batch file not found: {FILTER_JOB_PATH}")
+
+        try:
+            # The batch file expects to run from its own directory
+            with tracer.span("launch filter job", "job", path=FILTER_JOB_PATH) as span:
+                process = subprocess.Popen(
+                    ['cmd', '/c', FILTER_JOB_PATH],
+                    cwd=os.path.dirname(FILTER_JOB_PATH),
+                    creationflags=new_console_flags(self.new_console)
+                )
+                span["pid"] = process.pid
+            return process
+        except OSError as e:
+            raise UploadError("filter", f"Failed to start filter job: {str(e)}")
+
+    def start_index_job(self, environment):
+        """Start the Elasticsearch index job for an environment and return the process"""
+        index_job_path = ELASTIC_INDEX_JOB_PATHS.get(environment, ELASTIC_INDEX_JOB_PATHS["Production"])
+        if not os.path.exists(index_job_path):
+            raise UploadError("index", f"Elasticsearch index job not found: {index_job_path}")
+
+        try:
+            with tracer.span("launch index job", "job", path=index_job_path, environment=environment) as span:
+                process = subprocess.Popen(
+                    [index_job_path],
+                    cwd=os.path.dirname(index_job_path),
+                    creationflags=new_console_flags(self.new_console)
+                )
+                span["pid"] = process.pid
+            return process
+        except OSError as e:
+            raise UploadError("index", f"Failed to start Elasticsearch update: {str(e)}")
+
+    def run_filter_job(self, upload_id=None):
+        """Run the filter job to completion and record the result against the upload"""
+        process = self.start_filter_job()
+        with tracer.span("wait for filter job", "job", pid=process.pid) as span:
+            return_code = process.wait()
+            span["exit_code"] = return_code
+        JOB_EXIT_CODES.inc(job="filter", code=return_code)
+
+        if return_code != 0:
+            self.update_upload_status(upload_id, "interrupted")
+            raise UploadError("filter", f"The filter job stopped before completion (exit code {return_code})")
+
+        if upload_id is not None and not self.update_upload_status(upload_id, "completed", add_timestamp=True):
+            raise UploadError("filter", "Filter completed but failed to update database record.")
+
+    def run_index_job(self, environment):
+        """Run the Elasticsearch index job to completion"""
+        process = self.start_index_job(environment)
+        with tracer.span("wait for index job", "job", pid=process.pid) as span:
+            return_code = process.wait()
+            span["exit_code"] = return_code
+        JOB_EXIT_CODES.inc(job="index", code=return_code)
+        if return_code != 0:
+            raise UploadError("index", f"The Elasticsearch update stopped before completion (exit code {return_code})")
+
+
+def parse_stages(value):
+    """argparse type for a comma separated list of stages"""
+    stages = [stage.strip().lower() for stage in value.split(",") if stage.strip()]
+    unknown = [stage for stage in stages if stage not in UPLOAD_STAGES]
+    if unknown or not stages:
+        raise argparse.ArgumentTypeError(
+            f"stages must be a comma separated list of: {', '.join(UPLOAD_STAGES)}"
+        )
+    return stages
+
+
+def run_from_args(args, progress, on_stage):
+    """
+    Open the history database and run the stages selected on the command
+    line. The run is registered in the upload queue as a running job, so its
+    stages take the same resource locks as the queue workers' and cannot
+    e.g. replace the received-data files between another job's copy and filter.
+    """
+    # Imported here so the engine itself stays free of database setup
+    from tasks.upload_queue import Heartbeat, UploadWorker, open_queue
+    from utils.memory_profile import MemoryProfiler, memory_profiling_enabled
+    from utils.run_profiler import RunProfiler, profile_request
+
+    queue = open_queue(args.db)
+
+    # The console this runs in is the job's output; no extra windows
+    worker = UploadWorker(queue, server_location=args.server_location, new_console=False)
+    engine = worker.engine
+
+    # Filter and index only runs read nothing from the source folder
+    if any(stage in FILE_STAGES for stage in args.stages):
+        source_folder = os.path.abspath(args.source)
+        database_zip, images_zip, working_folder = engine.locate_source(source_folder, args.topic_month)
+    else:
+        source_folder = database_zip = images_zip = working_folder = None
+
+    cpu_profiler = RunProfiler("upload") if args.profile_cpu or profile_request.take() else None
+    job = queue.job(queue.enqueue(
+        source_folder, args.stages, args.environment, args.upload_id, bool(cpu_profiler), working_folder,
+        args.topic_month, claimed_by=worker.worker_id
+    ))
+    take_locks = worker.lock_stages(job)
+    heartbeat = Heartbeat(queue, job.id)
+    heartbeat.start()
+
+    def on_locked_stage(stage):
+        on_stage(stage)
+        take_locks(stage)
+
+    upload_id = args.upload_id
+    state, message, error_stage = "failed", None, None
+    if cpu_profiler:
+        cpu_profiler.enable()
+    try:
+        upload_id = engine.run(
+            database_zip, images_zip, working_folder, progress,
+            stages=args.stages,
+            environment=args.environment,
+            upload_id=args.upload_id,
+            on_stage=on_locked_stage,
+            memory_profiler=MemoryProfiler() if args.profile_memory or memory_profiling_enabled() else None,
+            started_at=job.started_at
+        )
+        state, message = "completed", f"Finished {', '.join(job.stages)}"
+    except UploadError as e:
+        message, error_stage = str(e), e.stage
+        raise
+    except Exception as e:
+        message = str(e)
+        raise
+    finally:
+        if cpu_profiler:
+            cpu_profiler.save(os.path.dirname(os.path.abspath(args.db)), upload_id)
+        heartbeat.stop()
+        queue.release_all(job.id)
+        queue.finish(job.id, state, upload_id, message, error_stage)
+    return upload_id, working_folder
+
+
+def main(argv=None):
+    """Command-line entry point: python -m tasks.topic_upload_engine (or main.py upload)"""
+    from utils.metrics import start_metrics_exporter
+    from utils.progress import JsonProgressReporter
+
+    parser = argparse.ArgumentParser(
+        prog="upload",
+        description="Run the EEP topic upload without the GUI, reporting progress as JSON lines on stdout"
+    )
+    parser.add_argument("source", nargs="?",
+                        help="folder containing the database and images ZIP files (not needed for filter or index only)")
+    parser.add_argument("--topic-month", help="DD-Month-YYYY to upload when the folder holds several months")
+    parser.add_argument("--environment", choices=sorted(ELASTIC_INDEX_JOB_PATHS),
+                        help="server environment for the index stage")
+    parser.add_argument("--stages", type=parse_stages, default=list(UPLOAD_STAGES),
+                        help=f"stages to run (default: {','.join(UPLOAD_STAGES)})")
+    parser.add_argument("--upload-id", type=int,
+                        help="history record the filter stage updates when the log stage is not run")
+    parser.add_argument("--db", default=UPLOAD_DB_FILE, help="history database file")
+    parser.add_argument("--server-location", default=SERVER_LOCATION, help="folder the repackaged files are copied to")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="measure peak and net memory per stage and store it with the upload record")
+    parser.add_argument("--profile-cpu", action="store_true",
+                        help="run under cProfile and save the statistics in the history folder's profiles/")
+    parser.add_argument("--progress-file",
+                        help="write the JSON progress lines to this file instead of stdout "
+                             "(the packaged tool has no console)")
+    args = parser.parse_args(argv)
+
+    if "index" in args.stages and not args.environment:
+        parser.error("--environment is required to run the index stage")
+    if not args.source and any(stage in FILE_STAGES for stage in args.stages):
+        parser.error("the extract, repack, copy and log stages need a source folder")
+
+    with contextlib.redirect_stdout(sys.stderr):
+        exporter = start_metrics_exporter()
+
+    # Stdout carries only the JSON progress lines; diagnostics go to stderr
+    with contextlib.ExitStack() as stack:
+        if args.progress_file:
+            stream = stack.enter_context(open(args.progress_file, 'a', encoding='utf-8'))
+        else:
+            stream = sys.stdout or stack.enter_context(open(os.devnull, 'w'))
+        try:
+            return run_with_progress(args, JsonProgressReporter(stream=stream))
+        finally:
+            # The process is about to exit, so write the final values now
+            if exporter:
+                with contextlib.redirect_stdout(sys.stderr):
+                    if exporter.file_path:
+                        exporter.write_file()
+                    exporter.stop()
+
+
+def run_with_progress(args, progress):
+    """Run the command line upload, reporting every stage and the result to progress"""
+    current = {"stage": "source"}
+
+    def on_stage(stage):
+        current["stage"] = stage
+        progress.emit("stage", stage=stage)
+
+    name = os.path.basename(os.path.abspath(args.source)) if args.source else ", ".join(args.stages)
+    trace = tracer.begin_run(f"Topic upload {name}", "upload")
+    trace_status = "failed"
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            upload_id, working_folder = run_from_args(args, progress, on_stage)
+        trace_status = "completed"
+    except UploadError as e:
+        exit_code = STAGE_EXIT_CODES.get(e.stage, EXIT_UNEXPECTED_ERROR)
+        progress.emit("failed", stage=e.stage, message=str(e), exit_code=exit_code)
+        return exit_code
+    except Exception as e:
+        progress.emit("failed", stage=current["stage"], message=str(e), exit_code=EXIT_UNEXPECTED_ERROR)
+        return EXIT_UNEXPECTED_ERROR
+    finally:
+        with contextlib.redirect_stdout(sys.stderr):
+            trace.finish(trace_status)
+
+    progress.emit(
+        "completed",
+        upload_id=upload_id,
+        working_folder=working_folder,
+        stages=args.stages,
+        exit_code=EXIT_OK
+    )
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
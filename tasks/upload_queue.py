@@ -0,0 +1,751 @@
+#upload_queue
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+from tasks.topic_upload_engine import (
+    TopicUploadEngine, UploadError, UPLOAD_STAGES, FILE_STAGES, UPLOAD_DB_FILE, SERVER_LOCATION,
+    ELASTIC_INDEX_JOB_PATHS, parse_stages
+)
+from utils.history_schema import UPLOAD_MIGRATIONS
+from utils.history_store import get_store
+from utils.job_events import job_events
+from utils.memory_profile import MemoryProfiler, memory_profiling_enabled
+from utils.metrics import metrics
+from utils.run_profiler import RunProfiler
+from utils.tracing import tracer
+
+# Worker processes the GUI keeps running at most; each runs one job at a time
+DEFAULT_WORKER_COUNT = 2
+
+# Seconds between looks at the queue, and between attempts to take a busy resource
+POLL_INTERVAL = 1.0
+
+# A running job's worker refreshes its heartbeat this often; a job whose
+# heartbeat is older than STALE_AFTER belongs to a worker that died
+HEARTBEAT_INTERVAL = 5.0
+STALE_AFTER = 60.0
+
+# Idle seconds after which a worker exits; the GUI starts new ones when jobs are queued
+WORKER_IDLE_EXIT = 30.0
+
+# Per-item progress is written to the queue at most this often
+PROGRESS_WRITE_INTERVAL = 0.5
+
+# Seconds to wait before starting workers again after one failed
+WORKER_RESTART_DELAY = 60.0
+
+WORKER_LOG_FOLDER = os.path.abspath(os.path.join("Diagnostics", "workers"))
+
+ACTIVE_STATES = ("queued", "running", "waiting")
+FINISHED_STATES = ("completed", "failed", "interrupted")
+
+# The drop folder always receives files named database.zip and images.zip,
+# so an upload holds it from its copy stage until its filter job has read them
+RECEIVED_DATA_RESOURCE = "received-data"
+FILTER_JOB_RESOURCE = "filter-job"
+
+JOB_COLUMNS = '''
+id, source_folder, working_folder, stages, environment, upload_id, profile_cpu, state, worker,
+stage, message, detail, done, total, unit, error_stage, enqueued_at, started_at, finished_at, topic_month
+'''
+
+ENQUEUE_SQL = '''
+INSERT INTO upload_queue (
+    source_folder, working_folder, topic_month, stages, environment, upload_id, profile_cpu, state, message,
+    enqueued_at
+) VALUES (?, ?, ?, ?, ?, ?, ?, 'queued', 'Queued', ?)
+'''
+
+NEXT_QUEUED_SQL = f"SELECT {JOB_COLUMNS} FROM upload_queue WHERE state = 'queued' ORDER BY id LIMIT 1"
+
+CLAIM_SQL = '''
+UPDATE upload_queue
+SET state = 'running', worker = ?, message = 'Starting', started_at = ?, heartbeat_at = ?
+WHERE id = ? AND state = 'queued'
+'''
+
+HEARTBEAT_SQL = "UPDATE upload_queue SET heartbeat_at = ? WHERE id = ?"
+
+SET_STATE_SQL = "UPDATE upload_queue SET state = ?, message = ?, heartbeat_at = ? WHERE id = ?"
+
+PROGRESS_SQL = '''
+UPDATE upload_queue
+SET stage = ?, message = ?, detail = ?, done = ?, total = ?, unit = ?, heartbeat_at = ?
+WHERE id = ?
+'''
+
+FINISH_SQL = '''
+UPDATE upload_queue
+SET state = ?, upload_id = ?, message = ?, error_stage = ?, finished_at = ?
+WHERE id = ?
+'''
+
+STALE_JOBS_SQL = f'''
+SELECT {JOB_COLUMNS} FROM upload_queue
+WHERE state IN ('running', 'waiting') AND heartbeat_at < ?
+'''
+
+# Locks of jobs that finished or whose worker died are free for the taking
+RELEASE_ORPHANED_LOCKS_SQL = '''
+DELETE FROM resource_locks
+WHERE job_id NOT IN (
+    SELECT id FROM upload_queue WHERE state IN ('running', 'waiting') AND heartbeat_at >= ?
+)
+'''
+
+LOCK_HOLDER_SQL = "SELECT job_id FROM resource_locks WHERE resource = ?"
+TAKE_LOCK_SQL = "INSERT OR REPLACE INTO resource_locks (resource, job_id, acquired_at) VALUES (?, ?, ?)"
+RELEASE_LOCK_SQL = "DELETE FROM resource_locks WHERE resource = ? AND job_id = ?"
+RELEASE_JOB_LOCKS_SQL = "DELETE FROM resource_locks WHERE job_id = ?"
+
+JOB_SQL = f"SELECT {JOB_COLUMNS} FROM upload_queue WHERE id = ?"
+JOBS_FROM_SQL = f"SELECT {JOB_COLUMNS} FROM upload_queue WHERE id >= ? ORDER BY id"
+LATEST_JOBS_SQL = f"SELECT {JOB_COLUMNS} FROM upload_queue ORDER BY id DESC LIMIT ?"
+FIRST_ACTIVE_JOB_SQL = "SELECT MIN(id) FROM upload_queue WHERE state IN ('queued', 'running', 'waiting')"
+LAST_JOB_SQL = "SELECT COALESCE(MAX(id), 0) FROM upload_queue"
+QUEUED_COUNT_SQL = "SELECT COUNT(*) FROM upload_queue WHERE state = 'queued'"
+ACTIVE_WORKING_FOLDERS_SQL = '''
+SELECT DISTINCT working_folder FROM upload_queue
+WHERE state IN ('queued', 'running', 'waiting') AND working_folder IS NOT NULL
+'''
+
+SAVE_METRICS_SQL = "INSERT INTO worker_metrics (job_id, samples, recorded_at) VALUES (?, ?, ?)"
+PENDING_METRICS_SQL = "SELECT id, samples FROM worker_metrics ORDER BY id"
+DELETE_METRICS_SQL = "DELETE FROM worker_metrics WHERE id <= ?"
+
+
+def get_worker_count():
+    """Worker processes to run, from EEP_UPLOAD_WORKERS"""
+    try:
+        return max(1, int(os.environ.get("EEP_UPLOAD_WORKERS", DEFAULT_WORKER_COUNT)))
+    except ValueError:
+        return DEFAULT_WORKER_COUNT
+
+
+def now_text():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def stage_resources(stage, working_folder, environment):
+    """Resources a stage needs to itself while it runs"""
+    resources = []
+    if stage in FILE_STAGES and working_folder:
+        # The working folder and the repacked ZIPs in it belong to one job at a time
+        resources.append("working-folder:" + os.path.normcase(os.path.abspath(working_folder)))
+    if stage in ("copy", "filter"):
+        resources.append(RECEIVED_DATA_RESOURCE)
+    if stage == "filter":
+        resources.append(FILTER_JOB_RESOURCE)
+    if stage == "index":
+        resources.append(f"elastic-index:{environment}")
+    return resources
+
+
+def lock_plan(stages, working_folder, environment):
+    """
+    Map each stage to (resources to take, resources to release) before it
+    starts. A resource is held from the first stage that needs it through
+    the last one, so e.g. received-data spans an upload's copy and filter.
+    """
+    last_use = {}
+    for index, stage in enumerate(stages):
+        for resource in stage_resources(stage, working_folder, environment):
+            last_use[resource] = index
+
+    plan = {}
+    held = []
+    for index, stage in enumerate(stages):
+        release = [resource for resource in held if last_use[resource] < index]
+        held = [resource for resource in held if resource not in release]
+        take = [r for r in stage_resources(stage, working_folder, environment) if r not in held]
+        held += take
+        plan[stage] = (take, release)
+    return plan
+
+
+class QueueJob:
+    """One row of the upload queue"""
+
+    def __init__(self, row):
+        (self.id, self.source_folder, self.working_folder, stages, self.environment, self.upload_id,
+         profile_cpu, self.state, self.worker, self.stage, self.message, self.detail, self.done,
+         self.total, self.unit, self.error_stage, self.enqueued_at, self.started_at, self.finished_at,
+         self.topic_month) = row
+        self.stages = stages.split(",")
+        self.profile_cpu = bool(profile_cpu)
+
+    @property
+    def kind(self):
+        """Job kind for the jobs panel and metrics"""
+        if self.source_folder:
+            return "upload"
+        return "filter" if "filter" in self.stages else "index"
+
+    @property
+    def name(self):
+        if self.topic_month:
+            return f"Topic upload {self.topic_month}"
+        if self.source_folder:
+            return f"Topic upload {os.path.basename(os.path.normpath(self.source_folder))}"
+        if "filter" in self.stages:
+            return "Filter job"
+        return f"Elastic index ({self.environment})"
+
+
+class UploadQueue:
+    """
+    The durable queue of upload jobs and the resource locks their stages
+    take, kept in the upload history database so the GUI, the command line
+    and every worker process see the same state.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def enqueue(self, source_folder=None, stages=FILE_STAGES, environment=None, upload_id=None,
+                profile_cpu=False, working_folder=None, topic_month=None, claimed_by=None):
+        """
+        Add a job and return its queue ID; topic_month picks one month from a
+        folder holding several. With claimed_by the job goes straight to that
+        worker as running, so no worker process can take it.
+        """
+        stages = [stage for stage in UPLOAD_STAGES if stage in stages]
+        if not stages:
+            raise UploadError("source", "A queued job needs at least one stage")
+        if any(stage in FILE_STAGES for stage in stages) and not source_folder:
+            raise UploadError("source", "The extract, repack, copy and log stages need a source folder")
+        if "index" in stages and environment not in ELASTIC_INDEX_JOB_PATHS:
+            raise UploadError("index", f"Unknown server environment: {environment}")
+
+        with self.store.transaction() as conn:
+            cursor = conn.execute(ENQUEUE_SQL, (
+                source_folder, working_folder, topic_month, ",".join(stages), environment, upload_id,
+                int(bool(profile_cpu)), now_text()
+            ))
+            if claimed_by:
+                conn.execute(CLAIM_SQL, (claimed_by, now_text(), time.time(), cursor.lastrowid))
+        return cursor.lastrowid
+
+    def claim(self, worker_id):
+        """Take the oldest queued job for a worker, or return None"""
+        with self.store.transaction() as conn:
+            row = conn.execute(NEXT_QUEUED_SQL).fetchone()
+            if row is None:
+                return None
+            started_at = now_text()
+            conn.execute(CLAIM_SQL, (worker_id, started_at, time.time(), row[0]))
+
+        job = QueueJob(row)
+        job.state = "running"
+        job.worker = worker_id
+        job.started_at = started_at
+        return job
+
+    def try_acquire(self, job_id, resources):
+        """
+        Take every resource for a job, or none of them. Returns None on
+        success, otherwise (resource, holding job ID) of one that is busy.
+        """
+        with self.store.transaction() as conn:
+            conn.execute(RELEASE_ORPHANED_LOCKS_SQL, (time.time() - STALE_AFTER,))
+            for resource in resources:
+                row = conn.execute(LOCK_HOLDER_SQL, (resource,)).fetchone()
+                if row and row[0] != job_id:
+                    return resource, row[0]
+            acquired_at = now_text()
+            for resource in resources:
+                conn.execute(TAKE_LOCK_SQL, (resource, job_id, acquired_at))
+        return None
+
+    def release(self, job_id, resources):
+        if not resources:
+            return
+        with self.store.transaction() as conn:
+            for resource in resources:
+                conn.execute(RELEASE_LOCK_SQL, (resource, job_id))
+
+    def release_all(self, job_id):
+        self.store.execute(RELEASE_JOB_LOCKS_SQL, (job_id,))
+
+    def heartbeat(self, job_id):
+        self.store.execute(HEARTBEAT_SQL, (time.time(), job_id))
+
+    def set_state(self, job_id, state, message):
+        self.store.execute(SET_STATE_SQL, (state, message, time.time(), job_id))
+
+    def update_progress(self, job_id, stage, message, detail, done, total, unit):
+        self.store.execute(PROGRESS_SQL, (stage, message, detail, done, total, unit, time.time(), job_id))
+
+    def finish(self, job_id, state, upload_id, message, error_stage=None):
+        self.store.execute(FINISH_SQL, (state, upload_id, message, error_stage, now_text(), job_id))
+
+    def recover_stale(self):
+        """Mark jobs whose worker stopped sending heartbeats as interrupted; returns them"""
+        cutoff = time.time() - STALE_AFTER
+        with self.store.transaction() as conn:
+            rows = conn.execute(STALE_JOBS_SQL, (cutoff,)).fetchall()
+            for row in rows:
+                conn.execute(FINISH_SQL, (
+                    "interrupted", row[5], "The worker running this job stopped", None, now_text(), row[0]
+                ))
+                conn.execute(RELEASE_JOB_LOCKS_SQL, (row[0],))
+        return [QueueJob(row) for row in rows]
+
+    def job(self, job_id):
+        row = self.store.fetchone(JOB_SQL, (job_id,))
+        return QueueJob(row) if row else None
+
+    def jobs_from(self, first_id):
+        return [QueueJob(row) for row in self.store.fetchall(JOBS_FROM_SQL, (first_id,))]
+
+    def latest_jobs(self, limit):
+        return [QueueJob(row) for row in self.store.fetchall(LATEST_JOBS_SQL, (limit,))]
+
+    def first_active_id(self):
+        return self.store.fetchone(FIRST_ACTIVE_JOB_SQL)[0]
+
+    def last_id(self):
+        return self.store.fetchone(LAST_JOB_SQL)[0]
+
+    def queued_count(self):
+        return self.store.fetchone(QUEUED_COUNT_SQL)[0]
+
+    def active_working_folders(self):
+        return [row[0] for row in self.store.fetchall(ACTIVE_WORKING_FOLDERS_SQL)]
+
+    def save_metrics(self, job_id, samples):
+        """Keep a worker's metric samples for the process that exports metrics"""
+        self.store.execute(SAVE_METRICS_SQL, (job_id, json.dumps(samples), now_text()))
+
+    def collect_metrics(self):
+        """Take every saved worker sample (each is only ever handed out once)"""
+        with self.store.transaction() as conn:
+            rows = conn.execute(PENDING_METRICS_SQL).fetchall()
+            if rows:
+                conn.execute(DELETE_METRICS_SQL, (rows[-1][0],))
+        return [json.loads(samples) for _, samples in rows]
+
+
+class QueueProgressReporter:
+    """
+    Same reporting interface as JsonProgressReporter for jobs run by a worker
+    process: reports are written to the job's queue row, where the GUI picks
+    them up. Per-item progress is throttled to one write per min_interval.
+    """
+
+    def __init__(self, queue, job_id, min_interval=PROGRESS_WRITE_INTERVAL):
+        self.queue = queue
+        self.job_id = job_id
+        self.min_interval = min_interval
+        self.job = None
+        self.current_stage = None
+        self._message = None
+        self._detail = None
+        self._last_write = 0.0
+
+    def write(self, done=0, total=0, unit=None):
+        self._last_write = time.monotonic()
+        self.queue.update_progress(
+            self.job_id, self.current_stage, self._message, self._detail, done, total, unit
+        )
+
+    def set_status(self, message):
+        self._message = message
+        self._detail = None
+        self.write()
+
+    def set_detail(self, message):
+        self._detail = message
+
+    def set_progress(self, value):
+        pass
+
+    def stage(self, start, end, unit="files"):
+        """Return an on_item(done, total, name) callback like JsonProgressReporter.stage"""
+        def on_item(done, total, name):
+            self._detail = name
+            # Always report the end of a step; throttle everything in between
+            if done < total and time.monotonic() - self._last_write < self.min_interval:
+                return
+            self.write(done, total, unit)
+        return on_item
+
+
+class Heartbeat:
+    """Keeps a running job's heartbeat fresh, including while it waits for locks or external jobs"""
+
+    def __init__(self, queue, job_id):
+        self.queue = queue
+        self.job_id = job_id
+        self.stopped = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self.beat, daemon=True).start()
+
+    def beat(self):
+        while not self.stopped.wait(HEARTBEAT_INTERVAL):
+            try:
+                self.queue.heartbeat(self.job_id)
+            except sqlite3.Error as e:
+                print(f"Error updating heartbeat of queue job {self.job_id}: {str(e)}")
+
+    def stop(self):
+        self.stopped.set()
+
+
+class UploadWorker:
+    """
+    Claims queued jobs and runs them through the engine one at a time,
+    taking each stage's resource locks before it starts. Several worker
+    processes share one queue; the locks serialize only the stages that
+    would conflict, so different months can extract and repack side by side.
+    """
+
+    def __init__(self, queue, server_location=SERVER_LOCATION, new_console=True):
+        self.queue = queue
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.engine = TopicUploadEngine(queue.store, server_location, new_console)
+
+    def run(self, idle_exit=WORKER_IDLE_EXIT):
+        """Run jobs until the queue has been empty for idle_exit seconds (forever if None)"""
+        tracer.log(f"Upload worker {self.worker_id} started")
+        self.recover_stale()
+        idle_since = last_recovery = time.monotonic()
+        while True:
+            job = self.queue.claim(self.worker_id)
+            if job:
+                self.run_job(job)
+                idle_since = time.monotonic()
+                continue
+
+            now = time.monotonic()
+            if idle_exit is not None and now - idle_since >= idle_exit:
+                tracer.log(f"Upload worker {self.worker_id} idle, exiting")
+                return
+            if now - last_recovery >= STALE_AFTER:
+                self.recover_stale()
+                last_recovery = now
+            time.sleep(POLL_INTERVAL)
+
+    def recover_stale(self):
+        for job in self.queue.recover_stale():
+            tracer.log(f"Queue job {job.id} ({job.name}) was abandoned by worker {job.worker}")
+            if job.upload_id is not None:
+                self.engine.update_upload_status(job.upload_id, "interrupted")
+
+    def wait_for(self, job, resources):
+        """Block until the job holds every resource in resources"""
+        waiting = False
+        while True:
+            busy = self.queue.try_acquire(job.id, resources)
+            if busy is None:
+                break
+            if not waiting:
+                resource, holder = busy
+                tracer.log(f"Queue job {job.id} waiting for {resource} (held by queue job {holder})")
+                self.queue.set_state(job.id, "waiting", f"Waiting for {resource} (queue job {holder})")
+                waiting = True
+            time.sleep(POLL_INTERVAL)
+        if waiting:
+            self.queue.set_state(job.id, "running", "Resources acquired")
+
+    def lock_stages(self, job):
+        """
+        on_stage callback that releases the resources the job no longer needs
+        and waits for those the starting stage takes
+        """
+        plan = lock_plan(job.stages, job.working_folder or job.source_folder, job.environment)
+
+        def on_stage(stage):
+            take, release = plan[stage]
+            self.queue.release(job.id, release)
+            self.wait_for(job, take)
+        return on_stage
+
+    def run_job(self, job):
+        tracer.log(f"Upload worker {self.worker_id} running queue job {job.id}: {job.name}")
+        take_locks = self.lock_stages(job)
+        progress = QueueProgressReporter(self.queue, job.id)
+        heartbeat = Heartbeat(self.queue, job.id)
+        heartbeat.start()
+        trace = tracer.begin_run(job.name, job.kind)
+        cpu_profiler = RunProfiler(job.kind) if job.profile_cpu else None
+
+        def on_stage(stage):
+            progress.current_stage = stage
+            take_locks(stage)
+
+        upload_id = job.upload_id
+        state, message, error_stage = "failed", None, None
+        try:
+            if job.source_folder:
+                database_zip, images_zip, working_folder = self.engine.locate_source(job.source_folder, job.topic_month)
+            else:
+                database_zip = images_zip = working_folder = None
+
+            if cpu_profiler:
+                cpu_profiler.enable()
+            upload_id = self.engine.run(
+                database_zip, images_zip, working_folder, progress,
+                stages=job.stages,
+                environment=job.environment,
+                upload_id=job.upload_id,
+                on_stage=on_stage,
+                memory_profiler=MemoryProfiler() if memory_profiling_enabled() else None,
+                started_at=job.started_at
+            )
+            state, message = "completed", f"Finished {', '.join(job.stages)}"
+        except UploadError as e:
+            message, error_stage = str(e), e.stage
+            tracer.log(f"Queue job {job.id} failed at the {e.stage} stage: {message}")
+        except Exception as e:
+            message, error_stage = str(e), progress.current_stage
+            tracer.log(f"Queue job {job.id} failed: {message}")
+        finally:
+            if cpu_profiler:
+                cpu_profiler.save(os.path.dirname(self.queue.store.db_file), upload_id)
+            heartbeat.stop()
+            self.queue.release_all(job.id)
+            self.queue.finish(job.id, state, upload_id, message, error_stage)
+            trace.finish(state)
+            self.save_metrics(job.id)
+
+    def save_metrics(self, job_id):
+        """
+        Hand the stage, byte, exit code and database metrics recorded while
+        running a job to the queue; workers export nothing themselves
+        """
+        samples = metrics.take()
+        if not samples:
+            return
+        try:
+            self.queue.save_metrics(job_id, samples)
+        except sqlite3.Error as e:
+            print(f"Error saving the metrics of queue job {job_id}: {str(e)}")
+
+
+def collect_worker_metrics(queue):
+    """Add the metrics the worker processes recorded to this process's registry"""
+    for samples in queue.collect_metrics():
+        metrics.merge(samples)
+
+
+def worker_command(db_file):
+    """Command line that starts a worker process, from source or from the packaged executable"""
+    if getattr(sys, 'frozen', False):
+        return [sys.executable, "queue", "--db", db_file, "work"]
+    main_script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+    return [sys.executable, main_script, "queue", "--db", db_file, "work"]
+
+
+class UploadWorkerPool:
+    """Worker processes started by the GUI; each exits by itself once the queue stays empty"""
+
+    def __init__(self, db_file, size=None):
+        self.db_file = db_file
+        self.size = size or get_worker_count()
+        self.processes = []
+        self.started = 0
+        self.paused_until = 0.0
+
+    def ensure_workers(self, queued):
+        """Start workers for queued jobs, up to the pool size"""
+        for process in self.processes:
+            if process.poll():
+                # Do not respawn a worker that keeps crashing every poll
+                print(f"Upload worker {process.pid} exited with code {process.returncode}")
+                self.paused_until = time.monotonic() + WORKER_RESTART_DELAY
+        self.processes = [process for process in self.processes if process.poll() is None]
+        if time.monotonic() < self.paused_until:
+            return
+        for _ in range(min(self.size - len(self.processes), queued)):
+            self.start_worker()
+
+    def start_worker(self):
+        self.started += 1
+        try:
+            os.makedirs(WORKER_LOG_FOLDER, exist_ok=True)
+            log_path = os.path.join(
+                WORKER_LOG_FOLDER, f"worker_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{self.started}.log"
+            )
+            with open(log_path, 'a', encoding='utf-8') as log:
+                process = subprocess.Popen(
+                    worker_command(self.db_file),
+                    stdout=log,
+                    stderr=subprocess.STDOUT,
+                    creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)
+                )
+            self.processes.append(process)
+            print(f"Started upload worker process {process.pid} (log: {log_path})")
+        except OSError as e:
+            print(f"Error starting upload worker: {str(e)}")
+
+
+class UploadQueueMonitor:
+    """
+    Mirrors queue jobs into the job event bus for the jobs panel (they run in
+    worker processes, so their progress comes from the queue table), starts
+    workers while jobs are queued and passes every job that finishes to
+    on_finished(job), on the monitor thread.
+    """
+
+    def __init__(self, queue, pool, on_finished=None):
+        self.queue = queue
+        self.pool = pool
+        self.on_finished = on_finished
+        self.lock = threading.Lock()
+        self.handles = {}  # queue job ID -> job event handle
+        self.seen = {}  # queue job ID -> last mirrored (state, message, detail, done, total)
+        self.next_id = None  # Lowest queue job ID that may still change
+        self.wakeup = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def track(self, job_id, name, kind):
+        """Show a job that was just queued at once, and report its end even if it is quick"""
+        with self.lock:
+            handle = self.handles[job_id] = job_events.start_job(name, kind)
+        handle.set_state("queued")
+        handle.stage("Queued")
+        self.wakeup.set()
+
+    def run(self):
+        while True:
+            try:
+                self.poll()
+            except sqlite3.Error as e:
+                print(f"Error reading the upload queue: {str(e)}")
+            self.wakeup.wait(POLL_INTERVAL)
+            self.wakeup.clear()
+
+    def poll(self):
+        if self.next_id is None:
+            # Pick up jobs left queued or running by an earlier session
+            first_active = self.queue.first_active_id()
+            self.next_id = first_active if first_active is not None else self.queue.last_id() + 1
+
+        jobs = self.queue.jobs_from(self.next_id)
+        for job in jobs:
+            self.mirror(job)
+
+        unfinished = [job.id for job in jobs if job.state in ACTIVE_STATES]
+        if unfinished:
+            self.next_id = min(unfinished)
+        elif jobs:
+            self.next_id = jobs[-1].id + 1
+
+        queued = sum(1 for job in jobs if job.state == "queued")
+        if queued:
+            self.pool.ensure_workers(queued)
+
+        collect_worker_metrics(self.queue)
+
+    def mirror(self, job):
+        with self.lock:
+            handle = self.handles.get(job.id)
+            if handle is None:
+                if job.state in FINISHED_STATES:
+                    return  # Ended before this session saw it
+                handle = self.handles[job.id] = job_events.start_job(job.name, job.kind)
+
+        previous = self.seen.get(job.id)
+        current = (job.state, job.message, job.detail, job.done, job.total)
+        if current == previous:
+            return
+        self.seen[job.id] = current
+
+        if job.state in FINISHED_STATES:
+            handle.finish(job.state, job.message)
+            with self.lock:
+                del self.handles[job.id]
+            del self.seen[job.id]
+            if self.on_finished:
+                self.on_finished(job)
+            return
+
+        if previous is None or previous[1] != job.message:
+            handle.stage(job.message)
+        if previous is None or previous[0] != job.state:
+            handle.set_state(job.state)
+        if job.total:
+            handle.progress(job.done, job.total, job.unit)
+        if job.detail and (previous is None or previous[2] != job.detail):
+            handle.log(job.detail)
+
+
+def open_queue(db_file):
+    os.makedirs(os.path.dirname(os.path.abspath(db_file)), exist_ok=True)
+    store = get_store(os.path.abspath(db_file))
+    store.migrate(UPLOAD_MIGRATIONS)
+    return UploadQueue(store)
+
+
+def main(argv=None):
+    """Command-line entry point: python -m tasks.upload_queue (or main.py queue)"""
+    parser = argparse.ArgumentParser(prog="queue", description="Queue topic uploads and run the worker processes")
+    parser.add_argument("--db", default=UPLOAD_DB_FILE, help="history database file holding the queue")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = commands.add_parser("enqueue", help="add a job to the queue")
+    enqueue.add_argument("source", nargs="?",
+                         help="folder containing the database and images ZIP files (not needed for filter/index jobs)")
+    enqueue.add_argument("--topic-month", help="DD-Month-YYYY to upload when the folder holds several months")
+    enqueue.add_argument("--stages", type=parse_stages, default=list(FILE_STAGES),
+                         help=f"stages to run (default: {','.join(FILE_STAGES)})")
+    enqueue.add_argument("--environment", choices=sorted(ELASTIC_INDEX_JOB_PATHS),
+                         help="server environment for the index stage")
+    enqueue.add_argument("--upload-id", type=int,
+                         help="history record the filter stage updates when the log stage is not queued")
+    enqueue.add_argument("--profile-cpu", action="store_true", help="run the job under cProfile")
+
+    work = commands.add_parser("work", help="run queued jobs in this process")
+    work.add_argument("--server-location", default=SERVER_LOCATION, help="folder the repackaged files are copied to")
+    work.add_argument("--idle-exit", type=float, default=WORKER_IDLE_EXIT,
+                      help="exit after this many seconds without work (0 = keep running)")
+
+    listing = commands.add_parser("list", help="show the latest jobs")
+    listing.add_argument("--limit", type=int, default=20)
+
+    args = parser.parse_args(argv)
+    queue = open_queue(args.db)
+
+    if args.command == "enqueue":
+        working_folder = None
+        try:
+            if args.source:
+                source_folder = os.path.abspath(args.source)
+                _, _, working_folder = TopicUploadEngine(queue.store).locate_source(
+                    source_folder, args.topic_month
+                )
+            else:
+                source_folder = None
+            job_id = queue.enqueue(source_folder, args.stages, args.environment, args.upload_id,
+                                   args.profile_cpu, working_folder, args.topic_month)
+        except UploadError as e:
+            print(str(e), file=sys.stderr)
+            return 2
+        print(f"Queued job {job_id}")
+        return 0
+
+    if args.command == "work":
+        UploadWorker(queue, server_location=args.server_location).run(idle_exit=args.idle_exit or None)
+        return 0
+
+    print(f"{'Job':<6}{'State':<13}{'Stages':<34}{'Upload':>7}  Name / message")
+    for job in queue.latest_jobs(args.limit):
+        upload = "" if job.upload_id is None else job.upload_id
+        print(f"{job.id:<6}{job.state:<13}{','.join(job.stages):<34}{upload:>7}  {job.name}: {job.message or ''}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+#watch_folder
+import argparse
+import ctypes
+import ctypes.util
+import os
+import select
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import zipfile
+
+from tasks.topic_upload_engine import (
+    TopicUploadEngine, UploadError, FILE_STAGES, UPLOAD_DB_FILE, ELASTIC_INDEX_JOB_PATHS, parse_stages, month_label
+)
+from tasks.source_catalogue import SourceCatalogue
+from tasks.upload_queue import UploadWorkerPool, open_queue, get_worker_count, collect_worker_metrics
+from utils.metrics import start_metrics_exporter
+from utils.tracing import tracer
+
+# Seconds a delivered ZIP's size and modification time must stay unchanged
+# before it counts as fully written
+STABLE_SECONDS = 30.0
+
+# Seconds between scans of the drop folders; with inotify this is only a
+# safety net for events that were missed (e.g. on network mounts)
+POLL_SECONDS = 15.0
+
+# inotify_init1 flags and the events that can mean a delivery finished (linux/inotify.h)
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+WATCH_EVENTS = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+# struct inotify_event: int wd; uint32_t mask, cookie, len; char name[len]
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+def get_watch_folders():
+    """Drop folders from EEP_WATCH_FOLDERS, separated like PATH"""
+    value = os.environ.get("EEP_WATCH_FOLDERS", "")
+    return [folder.strip() for folder in value.split(os.pathsep) if folder.strip()]
+
+
+def default_watch_stages(environment=None):
+    """Everything up to a live index: the index stage runs when an environment is configured"""
+    stages = list(FILE_STAGES) + ["filter"]
+    if environment:
+        stages.append("index")
+    return stages
+
+
+class InotifyWatcher:
+    """Wakes up as soon as a file is written to or moved into a drop folder (Linux only)"""
+
+    def __init__(self, folders):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        for folder in folders:
+            if libc.inotify_add_watch(self.fd, os.fsencode(folder), WATCH_EVENTS) < 0:
+                error = ctypes.get_errno()
+                os.close(self.fd)
+                raise OSError(error, f"Cannot watch {folder}: {os.strerror(error)}")
+
+    def wait(self, timeout):
+        """Block until a ZIP file event arrives or timeout seconds pass; returns whether one arrived"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+
+        zip_event = False
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        offset = 0
+        while offset + INOTIFY_EVENT.size <= len(data):
+            _, _, _, name_length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset:offset + name_length].rstrip(b"\0")
+            offset += name_length
+            zip_event = zip_event or name.lower().endswith(b".zip")
+        return zip_event
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Fallback where inotify is not available: every wait simply times out"""
+
+    def __init__(self, stopped):
+        self.stopped = stopped
+
+    def wait(self, timeout):
+        self.stopped.wait(timeout)
+        return False
+
+    def close(self):
+        pass
+
+
+class DropFolderWatcher:
+    """
+    Watches drop folders for topic months. Once both ZIP files of a month
+    have stopped changing and read as complete archives, they are moved into
+    a folder of their own under the drop folder (the pipeline works on one
+    month per folder) and the upload is queued.
+    """
+
+    def __init__(self, queue, folders, stages, environment=None, on_enqueued=None,
+                 stable_seconds=STABLE_SECONDS, poll_seconds=POLL_SECONDS):
+        self.queue = queue
+        self.folders = [os.path.abspath(folder) for folder in folders]
+        self.stages = stages
+        self.environment = environment
+        self.on_enqueued = on_enqueued  # Called with the queue job ID, on the watcher thread
+        self.stable_seconds = stable_seconds
+        self.poll_seconds = poll_seconds
+        self.engine = TopicUploadEngine(queue.store)
+        self.catalogue = SourceCatalogue(queue.store)
+        self.settling = {}  # path -> ((size, mtime), monotonic time it was first seen like that)
+        self.stopped = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def create_watcher(self):
+        if sys.platform.startswith("linux"):
+            try:
+                return InotifyWatcher(self.folders)
+            except (OSError, AttributeError) as e:
+                print(f"inotify is not available ({str(e)}); polling the drop folders instead")
+        return PollingWatcher(self.stopped)
+
+    def run(self):
+        tracer.log(f"Watching for topic months in: {', '.join(self.folders)}")
+        watcher = self.create_watcher()
+        try:
+            while not self.stopped.is_set():
+                for folder in self.folders:
+                    self.scan(folder)
+                # While files are settling, look again soon after they could be stable
+                timeout = self.poll_seconds
+                if self.settling:
+                    timeout = min(timeout, self.stable_seconds / 2)
+                watcher.wait(timeout)
+        finally:
+            watcher.close()
+
+    def scan(self, folder):
+        """Queue every complete month delivered to folder"""
+        try:
+            names = os.listdir(folder)
+        except OSError as e:
+            print(f"Error reading drop folder {folder}: {str(e)}")
+            return
+
+        pairs = {}
+        for name in names:
+            match = month_label(name)
+            if match:
+                kind, label = match
+                pairs.setdefault(label.lower(), {})[kind] = name
+
+        now = time.monotonic()
+        seen = set()
+        for label, files in pairs.items():
+            paths = [os.path.join(folder, files[kind]) for kind in ("database", "images") if kind in files]
+            seen.update(paths)
+            # Check both files every time, so each settles on its own clock
+            stable = [self.is_stable(path, now) for path in paths]
+            if len(paths) == 2 and all(stable):
+                self.ingest(folder, month_label(files["database"])[1], paths)
+
+        # Forget files that were moved away or deleted
+        for path in [path for path in self.settling if os.path.dirname(path) == folder and path not in seen]:
+            del self.settling[path]
+
+    def is_stable(self, path, now):
+        """Whether a file has stopped changing and its central directory can be read"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+
+        signature = (stat.st_size, stat.st_mtime_ns)
+        previous = self.settling.get(path)
+        if previous is None or previous[0] != signature:
+            self.settling[path] = (signature, now)
+            return False
+        if now - previous[1] < self.stable_seconds:
+            return False
+
+        # A ZIP still being written has no end of central directory yet
+        return zipfile.is_zipfile(path)
+
+    def ingest(self, folder, label, paths):
+        """Move a month's ZIP pair into its own folder and queue the upload"""
+        target = os.path.join(folder, label)
+        suffix = 2
+        while os.path.exists(target):
+            target = os.path.join(folder, f"{label} ({suffix})")
+            suffix += 1
+
+        moved = []
+        try:
+            os.makedirs(target)
+            for path in paths:
+                destination = os.path.join(target, os.path.basename(path))
+                os.replace(path, destination)
+                moved.append((path, destination))
+        except OSError as e:
+            # Most likely still locked by whoever delivers it; put things back and retry on the next scan
+            print(f"Error moving {label} into {target}: {str(e)}")
+            for path, destination in moved:
+                try:
+                    os.replace(destination, path)
+                except OSError:
+                    pass
+            return
+
+        for path in paths:
+            self.settling.pop(path, None)
+
+        try:
+            # Catalogued now, so the log stage finds the counts ready
+            self.catalogue.refresh(target)
+            _, _, working_folder = self.engine.locate_source(target)
+            job_id = self.queue.enqueue(target, self.stages, self.environment, working_folder=working_folder)
+        except (UploadError, sqlite3.Error) as e:
+            tracer.log(f"Could not queue the upload of {target}: {str(e)}")
+            return
+
+        tracer.log(f"Queued job {job_id} for topic month {label} delivered to {folder}")
+        if self.on_enqueued:
+            self.on_enqueued(job_id)
+
+
+def main(argv=None):
+    """Command-line entry point: python -m tasks.watch_folder (or main.py watch)"""
+    parser = argparse.ArgumentParser(
+        prog="watch",
+        description="Watch drop folders and queue an upload for every topic month delivered to them"
+    )
+    parser.add_argument("folders", nargs="*", help="drop folders (default: EEP_WATCH_FOLDERS)")
+    parser.add_argument("--db", default=UPLOAD_DB_FILE, help="history database file holding the queue")
+    parser.add_argument("--environment", choices=sorted(ELASTIC_INDEX_JOB_PATHS),
+                        default=os.environ.get("EEP_WATCH_ENVIRONMENT") or None,
+                        help="server environment to index (default: EEP_WATCH_ENVIRONMENT; no index stage if unset)")
+    parser.add_argument("--stages", type=parse_stages,
+                        help="stages to queue (default: extract to filter, plus index with an environment)")
+    parser.add_argument("--workers", type=int, default=get_worker_count(),
+                        help="worker processes to start for queued jobs (0 when workers run separately)")
+    parser.add_argument("--stable-seconds", type=float, default=STABLE_SECONDS,
+                        help="seconds a ZIP must stay unchanged before it is picked up")
+    parser.add_argument("--poll-seconds", type=float, default=POLL_SECONDS,
+                        help="seconds between scans of the drop folders")
+    args = parser.parse_args(argv)
+
+    folders = args.folders or get_watch_folders()
+    if not folders:
+        parser.error("no drop folders given and EEP_WATCH_FOLDERS is not set")
+    missing = [folder for folder in folders if not os.path.isdir(folder)]
+    if missing:
+        parser.error(f"drop folder does not exist: {missing[0]}")
+
+    stages = args.stages or default_watch_stages(args.environment)
+    if "index" in stages and not args.environment:
+        parser.error("--environment is required to queue the index stage")
+
+    queue = open_queue(args.db)
+    pool = UploadWorkerPool(queue.store.db_file, size=args.workers) if args.workers > 0 else None
+
+    def on_enqueued(job_id):
+        if pool:
+            pool.ensure_workers(queue.queued_count())
+
+    watcher = DropFolderWatcher(queue, folders, stages, args.environment, on_enqueued,
+                                args.stable_seconds, args.poll_seconds)
+
+    # The workers' stage and byte metrics are exported from here (EEP_METRICS_FILE / EEP_METRICS_PORT)
+    exporter = start_metrics_exporter()
+    if exporter:
+        threading.Thread(target=collect_metrics_loop, args=(queue, watcher), daemon=True).start()
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if exporter:
+            exporter.stop()
+    return 0
+
+
+def collect_metrics_loop(queue, watcher):
+    """Merge the metrics of finished queue jobs into this process's registry (background thread)"""
+    while not watcher.stopped.wait(watcher.poll_seconds):
+        try:
+            collect_worker_metrics(queue)
+        except sqlite3.Error as e:
+            print(f"Error collecting worker metrics: {str(e)}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
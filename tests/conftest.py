@@ -0,0 +1,25 @@
+#conftest
+import os
+import sys
+
+import pytest
+
+# The tool runs from the repository root, so its packages import from there
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--benchmarks", action="store_true",
+        help="also time the pipeline stages against benchmarks/baseline.json (needs pytest-benchmark)"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    # Timings only mean something on the machine that recorded the baseline
+    if config.getoption("--benchmarks"):
+        return
+    skip = pytest.mark.skip(reason="pipeline benchmarks run with --benchmarks")
+    for item in items:
+        if "benchmark" in getattr(item, "fixturenames", ()):
+            item.add_marker(skip)
@@ -0,0 +1,37 @@
+#test_benchmarks
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from benchmarks.run import (
+    BASELINE_FILE, BENCHMARKS, NOISE_FLOOR_SECONDS, SCALES, Workspace, allowed_slowdown, is_regression,
+    load_baseline_results
+)
+
+# The committed baseline covers the small scale, which runs in a few seconds
+SCALE = "small"
+
+
+@pytest.fixture(scope="module")
+def workspace(tmp_path_factory):
+    workspace = Workspace(str(tmp_path_factory.mktemp("benchmark")), SCALES[SCALE])
+    yield workspace
+    workspace.store.close()
+
+
+@pytest.mark.parametrize("name", list(BENCHMARKS))
+def test_no_regression(benchmark, workspace, name):
+    """Each pipeline stage stays within its threshold of the stored baseline median"""
+    benchmark.group = SCALE
+    benchmark.pedantic(BENCHMARKS[name], args=(workspace,), rounds=SCALES[SCALE]["repeat"], warmup_rounds=1)
+    if benchmark.disabled:
+        return  # --benchmark-disable runs each stage once, as a smoke test
+
+    baseline = load_baseline_results(BASELINE_FILE, SCALE).get(name)
+    if baseline is None:
+        pytest.skip(f"no {SCALE} baseline for {name}; record one with python -m benchmarks.run --save-baseline")
+    median = benchmark.stats.stats.median
+    assert not is_regression(name, median, baseline), (
+        f"{name} median {median:.4f}s is more than {allowed_slowdown(name):.0%} "
+        f"(+{NOISE_FLOOR_SECONDS * 1000:.0f} ms) slower than the baseline {baseline:.4f}s"
+    )
@@ -0,0 +1,20 @@
+#test_history_query_plans
+import pytest
+
+from utils.history_query import EXPORT_HISTORY_QUERY, UPLOAD_HISTORY_QUERY, check_query_plans
+from utils.history_schema import EXPORT_MIGRATIONS, UPLOAD_MIGRATIONS
+from utils.history_store import HistoryStore
+
+
+@pytest.mark.parametrize("migrations, query", [
+    (UPLOAD_MIGRATIONS, UPLOAD_HISTORY_QUERY),
+    (EXPORT_MIGRATIONS, EXPORT_HISTORY_QUERY),
+], ids=["upload", "export"])
+def test_history_pages_read_an_index(tmp_path, migrations, query):
+    """Every history statement reads an index in order on a freshly migrated database"""
+    store = HistoryStore(str(tmp_path / "history.db"))
+    try:
+        store.migrate(migrations)
+        assert check_query_plans(store, query) == []
+    finally:
+        store.close()
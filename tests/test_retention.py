@@ -0,0 +1,144 @@
+#test_retention
+from datetime import datetime, timedelta
+
+import pytest
+
+from tasks.upload_queue import UploadQueue
+from utils import deletion, retention
+from utils.history_schema import EXPORT_MIGRATIONS, UPLOAD_MIGRATIONS
+from utils.history_store import get_store
+from utils.retention import RetentionManager
+
+EXPORT_FILES = ["checksums.md5", "eep_cdr.zip"]
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    """Migrated upload and export databases, with deletions kept inside tmp_path"""
+    monkeypatch.setattr(retention, "DELETE_PAUSE_SECONDS", 0)
+    monkeypatch.setattr(deletion, "TOMBSTONE_REGISTRY", str(tmp_path / "pending_deletions.json"))
+    upload_db = str(tmp_path / "uploads.db")
+    export_db = str(tmp_path / "exports.db")
+    get_store(upload_db).migrate(UPLOAD_MIGRATIONS)
+    get_store(export_db).migrate(EXPORT_MIGRATIONS)
+    return upload_db, export_db
+
+
+def days_ago(days):
+    return (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def make_folder(path, size):
+    path.mkdir(parents=True)
+    (path / "data.bin").write_bytes(b"x" * size)
+    return str(path)
+
+
+def add_upload(upload_db, folder, age_days):
+    get_store(upload_db).execute('''
+    INSERT INTO uploads (upload_timestamp, topic_month, xml_files, images, database_zip, images_zip,
+                         status, working_folder, started_at)
+    VALUES (?, '01-January-2025', 1, 1, 'database.zip', 'images.zip', 'completed', ?, ?)
+    ''', (days_ago(age_days), folder, days_ago(age_days)))
+
+
+def add_export(export_db, folder, age_days):
+    get_store(export_db).execute('''
+    INSERT INTO exports (export_timestamp, export_folder, status, export_path, started_at)
+    VALUES (?, 'export', 'completed', ?, ?)
+    ''', (days_ago(age_days), folder, days_ago(age_days)))
+
+
+def make_export(path, size):
+    path.mkdir(parents=True)
+    for name in EXPORT_FILES:
+        (path / name).write_bytes(b"x" * size)
+    return str(path)
+
+
+def manager(history, **options):
+    upload_db, export_db = history
+    options.setdefault("max_age_days", 30)
+    options.setdefault("disk_budget_bytes", 10 ** 9)
+    return RetentionManager(upload_db, export_db, export_files=EXPORT_FILES, **options)
+
+
+def selected(manager):
+    return [(candidate.path, reason) for candidate, reason in manager.select_for_deletion(manager.find_candidates())]
+
+
+def test_max_age(tmp_path, history):
+    old = make_folder(tmp_path / "old", 10)
+    recent = make_folder(tmp_path / "recent", 10)
+    add_upload(history[0], old, 40)
+    add_upload(history[0], recent, 5)
+
+    assert selected(manager(history)) == [(old, "max_age")]
+
+
+def test_disk_budget_deletes_oldest_first(tmp_path, history):
+    folders = [make_folder(tmp_path / f"month{age}", 100) for age in (3, 2, 1)]
+    for folder, age in zip(folders, (3, 2, 1)):
+        add_upload(history[0], folder, age)
+
+    # 300 bytes against a 150 byte budget: the two oldest go
+    assert selected(manager(history, disk_budget_bytes=150)) == [
+        (folders[0], "disk_budget"), (folders[1], "disk_budget")
+    ]
+
+
+def test_newest_export_is_kept(tmp_path, history):
+    older = make_export(tmp_path / "2025-01-01", 10)
+    newest = make_export(tmp_path / "2025-02-01", 10)
+    add_export(history[1], older, 60)
+    add_export(history[1], newest, 50)
+
+    assert selected(manager(history)) == [(older, "max_age")]
+
+
+def test_protected_and_active_queue_folders_are_kept(tmp_path, history):
+    upload_db = history[0]
+    protected = make_folder(tmp_path / "protected", 10)
+    active = make_folder(tmp_path / "active", 10)
+    failed = make_folder(tmp_path / "failed", 10)
+    add_upload(upload_db, protected, 40)
+
+    queue = UploadQueue(get_store(upload_db))
+    queue.enqueue(str(tmp_path), working_folder=active)
+    queue.claim("worker")
+    failed_job = queue.enqueue(str(tmp_path), working_folder=failed)
+    queue.claim("worker")
+    queue.finish(failed_job, "failed", None, "Extract failed", "extract")
+    get_store(upload_db).execute("UPDATE upload_queue SET finished_at = ? WHERE id = ?", (days_ago(40), failed_job))
+
+    retention_manager = manager(history, get_protected_folders=lambda: [protected])
+    assert selected(retention_manager) == [(failed, "max_age")]
+
+
+def test_run_once_deletes_and_records(tmp_path, history):
+    upload_db, export_db = history
+    working = make_folder(tmp_path / "working", 100)
+    add_upload(upload_db, working, 40)
+
+    # The operator's own file in the dated folder survives, and so does the folder
+    shared = make_export(tmp_path / "2025-01-01", 10)
+    (tmp_path / "2025-01-01" / "notes.txt").write_text("mine")
+    emptied = make_export(tmp_path / "2025-02-01", 10)
+    newest = make_export(tmp_path / "2025-03-01", 10)
+    for folder, age in ((shared, 60), (emptied, 50), (newest, 40)):
+        add_export(export_db, folder, age)
+
+    reclaimed = manager(history).run_once()
+
+    assert reclaimed == 100 + 2 * 2 * 10
+    assert not (tmp_path / "working").exists()
+    assert sorted(path.name for path in (tmp_path / "2025-01-01").iterdir()) == ["notes.txt"]
+    assert not (tmp_path / "2025-02-01").exists()
+    assert sorted(path.name for path in (tmp_path / "2025-03-01").iterdir()) == sorted(EXPORT_FILES)
+
+    assert get_store(upload_db).fetchall(
+        "SELECT folder_path, folder_kind, bytes_reclaimed, reason FROM cleanup_history"
+    ) == [(working, "working", 100, "max_age")]
+    assert sorted(get_store(export_db).fetchall(
+        "SELECT folder_path, folder_kind, bytes_reclaimed, reason FROM cleanup_history"
+    )) == [(shared, "export", 20, "max_age"), (emptied, "export", 20, "max_age")]
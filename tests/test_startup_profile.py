@@ -0,0 +1,108 @@
+#test_startup_profile
+import os
+import shutil
+import subprocess
+import sys
+import tkinter as tk
+
+import pytest
+
+from utils import startup_profile
+from utils.startup_profile import OVER_BUDGET_EXIT_CODE, StartupProfiler, get_startup_budget_ms
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Time allowed for the whole profiling run, deferred database init included
+PROFILE_RUN_TIMEOUT_S = 120
+
+
+def can_open_window():
+    """The window uses Windows-only attributes, so it needs Windows and a desktop"""
+    if sys.platform != "win32":
+        return False
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return False
+    root.destroy()
+    return True
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, ms):
+        self.now += ms / 1000
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(startup_profile.time, "perf_counter", clock)
+    return clock
+
+
+def profile_startup(clock, interactive_after_ms):
+    profiler = StartupProfiler()
+    clock.advance(interactive_after_ms / 2)
+    profiler.mark("create widgets")
+    clock.advance(interactive_after_ms / 2)
+    profiler.mark_interactive()
+    clock.advance(500)
+    profiler.mark("deferred database init (background)")
+    return profiler
+
+
+def test_report_within_budget(tmp_path, clock):
+    profiler = profile_startup(clock, 1200)
+    report = tmp_path / "startup_profile.txt"
+
+    assert profiler.write_report(str(report), 1500)
+    assert profiler.interactive_ms == pytest.approx(1200)
+    text = report.read_text(encoding="utf-8")
+    assert "create widgets" in text
+    assert "Time to interactive: 1200.0 ms" in text
+    assert "Budget: 1500 ms (OK)" in text
+
+
+def test_report_over_budget(tmp_path, clock):
+    # Deferred work after the first paint does not count against the budget
+    profiler = profile_startup(clock, 1600)
+
+    assert not profiler.write_report(str(tmp_path / "startup_profile.txt"), 1500)
+
+
+def test_report_never_interactive(tmp_path, clock):
+    profiler = StartupProfiler()
+    profiler.mark("create widgets")
+
+    assert not profiler.write_report(str(tmp_path / "startup_profile.txt"), 1500)
+    assert "not reached" in (tmp_path / "startup_profile.txt").read_text(encoding="utf-8")
+
+
+def test_budget_from_environment(monkeypatch):
+    monkeypatch.setenv("EEP_STARTUP_BUDGET_MS", "900")
+    assert get_startup_budget_ms() == 900
+    monkeypatch.setenv("EEP_STARTUP_BUDGET_MS", "soon")
+    assert get_startup_budget_ms() == startup_profile.DEFAULT_STARTUP_BUDGET_MS
+
+
+@pytest.mark.skipif(not can_open_window(), reason="needs a Windows desktop to open the window")
+def test_window_interactive_within_budget(tmp_path):
+    """Start the real window with --profile-startup and hold it to the budget"""
+    # History, diagnostics and worker logs are created in the working folder
+    shutil.copytree(os.path.join(REPO_ROOT, "assets"), tmp_path / "assets")
+    report = tmp_path / "startup_profile.txt"
+
+    result = subprocess.run(
+        [sys.executable, os.path.join(REPO_ROOT, "main.py"), f"--profile-startup={report}"],
+        cwd=tmp_path, capture_output=True, text=True, timeout=PROFILE_RUN_TIMEOUT_S
+    )
+
+    assert report.exists(), result.stdout + result.stderr
+    assert result.returncode != OVER_BUDGET_EXIT_CODE, report.read_text(encoding="utf-8")
+    assert result.returncode == 0, result.stdout + result.stderr
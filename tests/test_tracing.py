@@ -0,0 +1,28 @@
+#test_tracing
+import os
+
+from utils.tracing import Tracer, prune_traces
+
+
+def test_prune_keeps_the_newest_traces(tmp_path):
+    for index in range(5):
+        path = tmp_path / f"upload_{index}.json"
+        path.write_text("{}")
+        os.utime(path, (1000 + index, 1000 + index))
+    (tmp_path / "notes.txt").write_text("not a trace")
+
+    assert prune_traces(str(tmp_path), 2) == 3
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["notes.txt", "upload_3.json", "upload_4.json"]
+
+
+def test_finished_runs_leave_at_most_the_kept_number_of_files(tmp_path, monkeypatch):
+    monkeypatch.setenv("EEP_TRACE", "1")
+    monkeypatch.setenv("EEP_TRACE_KEEP", "3")
+    tracer = Tracer()
+    for index in range(6):
+        run = tracer.begin_run(f"Topic upload {index}", "upload")
+        with tracer.span("extract"):
+            pass
+        assert run.finish(folder=str(tmp_path))
+
+    assert len(list(tmp_path.iterdir())) == 3
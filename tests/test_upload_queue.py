@@ -0,0 +1,96 @@
+#test_upload_queue
+import os
+import time
+
+import pytest
+
+from tasks.upload_queue import (
+    FILTER_JOB_RESOURCE, RECEIVED_DATA_RESOURCE, STALE_AFTER, UploadQueue, lock_plan
+)
+from utils.history_schema import UPLOAD_MIGRATIONS
+from utils.history_store import HistoryStore
+
+WORKING_FOLDER = os.path.abspath("working")
+WORKING_RESOURCE = "working-folder:" + os.path.normcase(WORKING_FOLDER)
+
+
+@pytest.fixture
+def queue(tmp_path):
+    store = HistoryStore(str(tmp_path / "uploads.db"))
+    store.migrate(UPLOAD_MIGRATIONS)
+    yield UploadQueue(store)
+    store.close()
+
+
+def lock_holders(queue):
+    return dict(queue.store.fetchall("SELECT resource, job_id FROM resource_locks"))
+
+
+def test_received_data_is_held_from_copy_through_filter():
+    plan = lock_plan(["extract", "repack", "copy", "log", "filter"], WORKING_FOLDER, None)
+
+    assert plan["extract"] == ([WORKING_RESOURCE], [])
+    assert plan["repack"] == ([], [])
+    assert plan["copy"] == ([RECEIVED_DATA_RESOURCE], [])
+    # The working folder is done with after the log stage; received-data stays held
+    assert plan["log"] == ([], [])
+    assert plan["filter"] == ([FILTER_JOB_RESOURCE], [WORKING_RESOURCE])
+
+
+def test_received_data_is_released_after_copy_without_filter():
+    plan = lock_plan(["extract", "repack", "copy", "log"], WORKING_FOLDER, None)
+
+    assert plan["log"] == ([], [RECEIVED_DATA_RESOURCE])
+
+
+def test_index_locks_its_environment():
+    assert lock_plan(["index"], None, "UAT") == {"index": (["elastic-index:UAT"], [])}
+
+
+def test_acquisition_is_all_or_nothing(queue):
+    first = queue.enqueue(os.getcwd(), ["copy", "log"], claimed_by="worker-1")
+    second = queue.enqueue(os.getcwd(), ["copy", "log", "filter"], claimed_by="worker-2")
+
+    assert queue.try_acquire(first, [RECEIVED_DATA_RESOURCE]) is None
+    assert queue.try_acquire(second, [FILTER_JOB_RESOURCE, RECEIVED_DATA_RESOURCE]) == (RECEIVED_DATA_RESOURCE, first)
+    # The free filter-job resource was not taken either
+    assert lock_holders(queue) == {RECEIVED_DATA_RESOURCE: first}
+
+    queue.release(first, [RECEIVED_DATA_RESOURCE])
+    assert queue.try_acquire(second, [FILTER_JOB_RESOURCE, RECEIVED_DATA_RESOURCE]) is None
+    assert lock_holders(queue) == {RECEIVED_DATA_RESOURCE: second, FILTER_JOB_RESOURCE: second}
+
+
+def test_claim_takes_the_oldest_queued_job(queue):
+    first = queue.enqueue(os.getcwd(), ["extract"])
+    queue.enqueue(os.getcwd(), ["extract"])
+    queue.enqueue(os.getcwd(), ["extract"], claimed_by="cli")
+
+    job = queue.claim("worker-1")
+    assert (job.id, job.state, job.worker) == (first, "running", "worker-1")
+    assert job.started_at is not None
+    assert queue.claim("worker-2").id == first + 1
+    assert queue.claim("worker-3") is None
+
+
+def test_stale_job_is_interrupted_and_its_locks_released(queue):
+    stale = queue.enqueue(os.getcwd(), ["copy", "log"], claimed_by="worker-1")
+    live = queue.enqueue(None, ["index"], environment="UAT", claimed_by="worker-2")
+    assert queue.try_acquire(stale, [RECEIVED_DATA_RESOURCE]) is None
+    assert queue.try_acquire(live, ["elastic-index:UAT"]) is None
+    queue.store.execute("UPDATE upload_queue SET heartbeat_at = ? WHERE id = ?", (time.time() - STALE_AFTER - 1, stale))
+
+    assert [job.id for job in queue.recover_stale()] == [stale]
+    assert queue.job(stale).state == "interrupted"
+    assert queue.job(live).state == "running"
+    assert lock_holders(queue) == {"elastic-index:UAT": live}
+
+
+def test_locks_of_a_dead_worker_are_taken_over(queue):
+    stale = queue.enqueue(os.getcwd(), ["copy"], claimed_by="worker-1")
+    waiting = queue.enqueue(os.getcwd(), ["copy"], claimed_by="worker-2")
+    assert queue.try_acquire(stale, [RECEIVED_DATA_RESOURCE]) is None
+    assert queue.try_acquire(waiting, [RECEIVED_DATA_RESOURCE]) == (RECEIVED_DATA_RESOURCE, stale)
+
+    queue.store.execute("UPDATE upload_queue SET heartbeat_at = ? WHERE id = ?", (time.time() - STALE_AFTER - 1, stale))
+    assert queue.try_acquire(waiting, [RECEIVED_DATA_RESOURCE]) is None
@@ -0,0 +1,93 @@
+#background
+import hashlib
+import os
+import sys
+
+# Bump whenever the composition below changes so stale cached images are ignored
+BACKGROUND_VERSION = 1
+
+# Opacity of the black overlay at the top edge, fading to nothing at the bottom
+GRADIENT_TOP_ALPHA = 200
+
+FALLBACK_COLOR = (50, 50, 50)
+
+
+def get_cache_folder():
+    """Per-user folder for generated images (survives PyInstaller's temp extraction)"""
+    if sys.platform == "win32" and os.environ.get("LOCALAPPDATA"):
+        base = os.environ["LOCALAPPDATA"]
+    else:
+        base = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "EEP Topic Upload Tool")
+
+
+def get_source_hash(source_path):
+    """Hash of the source image, or of nothing if it is missing"""
+    digest = hashlib.sha256()
+    try:
+        with open(source_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    except OSError:
+        pass
+    return digest.hexdigest()[:16]
+
+
+def get_cached_background_path(source_path, width, height):
+    """Cache file for a source image composited at a window size"""
+    key = f"{get_source_hash(source_path)}_{width}x{height}_v{BACKGROUND_VERSION}"
+    return os.path.join(get_cache_folder(), f"background_{key}.png")
+
+
+def compose_background(source_path, width, height):
+    """Resize the source image and darken it with a top-to-bottom gradient"""
+    from PIL import Image
+
+    try:
+        background = Image.open(source_path).convert('RGB')
+        # Resize image to window size
+        background = background.resize((width, height), Image.LANCZOS)
+        print(f"Loaded background image from: {source_path}")
+    except Exception as e:
+        # Fallback if image not found
+        print(f"Error loading background image: {e}")
+        background = Image.new('RGB', (width, height), FALLBACK_COLOR)
+
+    # Build the alpha ramp as a single one pixel wide column and stretch it
+    # across the window, instead of pasting one overlay per row
+    column = bytes(int(GRADIENT_TOP_ALPHA * (1 - y / height)) for y in range(height))
+    alpha = Image.frombytes('L', (1, height), column).resize((width, height), Image.NEAREST)
+
+    # A black overlay with that alpha, blended over the background
+    black = Image.new('RGB', (width, height), (0, 0, 0))
+    return Image.composite(black, background, alpha)
+
+
+def load_background(source_path, width, height):
+    """
+    Return a Tk PhotoImage of the composited background.
+    The result is cached on disk keyed by the source image hash, window size and
+    BACKGROUND_VERSION, so later launches load the PNG directly without PIL.
+    """
+    import tkinter as tk
+
+    cache_path = get_cached_background_path(source_path, width, height)
+    if os.path.exists(cache_path):
+        try:
+            return tk.PhotoImage(file=cache_path)
+        except tk.TclError as e:
+            print(f"Error loading cached background {cache_path}: {e}")
+
+    image = compose_background(source_path, width, height)
+
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        # Write to a temporary file first so a crash never leaves a broken cache entry
+        temp_path = cache_path + ".tmp"
+        image.save(temp_path, "PNG")
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        print(f"Error caching background image: {e}")
+
+    from PIL import ImageTk
+    return ImageTk.PhotoImage(image)
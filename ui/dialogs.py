@@ -1,11 +1,18 @@
-import csv
+import queue
+import threading
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import os
 import sys
 from datetime import datetime
 
 from utils.file_utils import ensure_directory_exists
+from utils.history_query import HistoryFilter, parse_filter_date
+from utils.history_archive import open_history_pager, get_archive_store
+from utils.memory_profile import format_bytes
+from utils.history_stats import (
+    load_monthly_summaries, format_duration, UPLOAD_STATS_QUERY, EXPORT_STATS_QUERY
+)
 
 
 def resource_path(relative_path):
@@ -108,13 +115,22 @@ class ServerEnvironmentDialog:
         self.dialog.destroy()
 
 
-class ProgressDialog:
-    def __init__(self, parent, title="Progress"):
-        # Create dialog window
+# SourceMonthDialog result when the user wants to pick a folder instead
+BROWSE_FOLDER = "browse"
+
+
+class SourceMonthDialog:
+    """Choose a catalogued topic month to upload, newest first"""
+
+    def __init__(self, parent, months, allow_browse=True):
+        self.result = None
+        self.months = months
+
+        # Create a dialog window
         self.dialog = tk.Toplevel(parent)
-        self.dialog.title(title)
-        self.dialog.geometry("500x200")
-        self.dialog.resizable(False, False)
+        self.dialog.title("Select Topic Month")
+        self.dialog.geometry("760x380")
+        self.dialog.resizable(True, True)
         self.dialog.transient(parent)
         self.dialog.grab_set()
 
@@ -129,62 +145,188 @@ class ProgressDialog:
             print(f"Error loading icon for dialog: {e}")
 
         # Center the dialog on parent
-        x = parent.winfo_rootx() + (parent.winfo_width() // 2) - (500 // 2)
-        y = parent.winfo_rooty() + (parent.winfo_height() // 2) - (200 // 2)
+        x = parent.winfo_rootx() + (parent.winfo_width() // 2) - (760 // 2)
+        y = parent.winfo_rooty() + (parent.winfo_height() // 2) - (380 // 2)
         self.dialog.geometry(f"+{x}+{y}")
 
-        # Prevent closing the dialog
-        self.dialog.protocol("WM_DELETE_WINDOW", lambda: None)
+        # Configure styles
+        style = ttk.Style()
+        style.configure("Accent.TButton", font=("Arial", 11, "bold"))
+        style.configure("SourceMonth.TFrame", background='white')
+
+        # Create content
+        frame = ttk.Frame(self.dialog, padding=10, style="SourceMonth.TFrame")
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        ttk.Label(
+            frame,
+            text="Select the topic month to upload:",
+            font=("Arial", 12, "bold"),
+            background='white'
+        ).pack(anchor=tk.W, pady=(0, 10))
+
+        tree_frame = ttk.Frame(frame, style="SourceMonth.TFrame")
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+
+        y_scroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL)
+        y_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+
+        # (column id, heading, width, anchor)
+        column_defs = [
+            ("month", "Topic Month", 130, "center"),
+            ("xml_files", "XML Files", 80, "center"),
+            ("images", "Images", 80, "center"),
+            ("size", "Size", 90, "center"),
+            ("folder", "Folder", 360, "w"),
+        ]
+        self.tree = ttk.Treeview(
+            tree_frame,
+            columns=[col_id for col_id, _, _, _ in column_defs],
+            yscrollcommand=y_scroll.set,
+            selectmode="browse",
+            show="headings"
+        )
+        y_scroll.config(command=self.tree.yview)
+
+        for col_id, heading, width, anchor in column_defs:
+            self.tree.heading(col_id, text=heading, anchor="center")
+            self.tree.column(col_id, width=width, minwidth=60, anchor=anchor)
+
+        for index, month in enumerate(months):
+            self.tree.insert("", tk.END, iid=str(index), values=(
+                month.topic_month,
+                f"{month.xml_files:,}",
+                f"{month.images:,}",
+                format_bytes(month.size),
+                month.folder
+            ))
+        if months:
+            self.tree.selection_set("0")
+            self.tree.focus("0")
+        self.tree.bind("<Double-1>", lambda event: self.on_continue())
+        self.tree.pack(fill=tk.BOTH, expand=True)
+
+        # Create buttons
+        button_frame = ttk.Frame(frame, style="SourceMonth.TFrame")
+        button_frame.pack(fill=tk.X, pady=(10, 0))
+
+        if allow_browse:
+            ttk.Button(
+                button_frame,
+                text="Browse...",
+                command=self.on_browse
+            ).pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(
+            button_frame,
+            text="Cancel",
+            command=self.dialog.destroy
+        ).pack(side=tk.RIGHT, padx=5)
+
+        ttk.Button(
+            button_frame,
+            text="Continue",
+            command=self.on_continue,
+            style="Accent.TButton"
+        ).pack(side=tk.RIGHT, padx=5)
+
+        # Wait for dialog to close
+        parent.wait_window(self.dialog)
+
+    def on_continue(self):
+        selection = self.tree.selection()
+        if not selection:
+            return
+        self.result = self.months[int(selection[0])]
+        self.dialog.destroy()
+
+    def on_browse(self):
+        self.result = BROWSE_FOLDER
+        self.dialog.destroy()
+
+
+class DeletionProgressDialog:
+    """Non-modal window showing a background DeletionWorker's progress"""
+
+    def __init__(self, parent, worker, title="Deleting Files", on_finished=None):
+        self.worker = worker
+        self.on_finished = on_finished  # Called on the Tk thread with (completed, error)
+
+        # Create dialog window without grabbing input so the main window stays usable
+        self.dialog = tk.Toplevel(parent)
+        self.dialog.title(title)
+        self.dialog.geometry("450x160")
+        self.dialog.resizable(False, False)
+        self.dialog.transient(parent)
+
+        # Set background color to white for the dialog
+        self.dialog.configure(bg='white')
+
+        # Set EEP icon for dialog
+        try:
+            icon_path = resource_path(os.path.join("assets", "EEP_512_512.ico"))
+            self.dialog.iconbitmap(icon_path)
+        except Exception as e:
+            print(f"Error loading icon for dialog: {e}")
+
+        # Closing the window cancels the deletion
+        self.dialog.protocol("WM_DELETE_WINDOW", self.on_cancel)
 
         # Configure styles
         style = ttk.Style()
-        style.configure("Progress.TFrame", background='white')
-        style.configure("Progress.TLabel", background='white')
+        style.configure("Deletion.TFrame", background='white')
 
         # Create content
-        frame = ttk.Frame(self.dialog, padding=20, style="Progress.TFrame")
+        frame = ttk.Frame(self.dialog, padding=20, style="Deletion.TFrame")
         frame.pack(fill=tk.BOTH, expand=True)
 
         self.status_label = ttk.Label(
             frame,
-            text="Processing...",
-            font=("Arial", 12),
-            wraplength=460,  # Allow wrapping for long status messages
+            text="Deleting files in the background...",
+            font=("Arial", 11),
+            wraplength=410,
             background='white'
         )
-        self.status_label.pack(pady=(0, 20))
+        self.status_label.pack(pady=(0, 10))
 
         self.progress = ttk.Progressbar(
             frame,
             orient="horizontal",
-            length=460,
+            length=410,
             mode="determinate"
         )
-        self.progress.pack(fill=tk.X, pady=10)
+        self.progress.pack(fill=tk.X, pady=5)
 
-        # Add a please wait message
-        self.wait_label = ttk.Label(
+        self.cancel_button = ttk.Button(
             frame,
-            text="Please wait while the process completes...",
-            font=("Arial", 10),
-            foreground="#666666",
-            background='white'
+            text="Cancel",
+            command=self.on_cancel
         )
-        self.wait_label.pack(pady=10)
-
-    def set_status(self, message):
-        """Update the status message"""
-        self.status_label.config(text=message)
-        self.dialog.update()
+        self.cancel_button.pack(side=tk.RIGHT, pady=(10, 0))
+
+        self.poll()
+
+    def poll(self):
+        """Refresh progress from the worker until it finishes"""
+        if self.worker.finished:
+            self.dialog.destroy()
+            if self.on_finished:
+                self.on_finished(self.worker.completed, self.worker.error)
+            return
+
+        if self.worker.total:
+            self.progress["value"] = self.worker.progress * 100
+            self.status_label.config(
+                text=f"Deleted {self.worker.deleted:,} of {self.worker.total:,} files..."
+            )
 
-    def set_progress(self, value):
-        """Update the progress bar (0.0 to 1.0)"""
-        self.progress["value"] = value * 100
-        self.dialog.update()
+        self.dialog.after(100, self.poll)
 
-    def destroy(self):
-        """Close the dialog"""
-        self.dialog.destroy()
+    def on_cancel(self):
+        """Stop the deletion; the remaining files are removed on the next start"""
+        self.worker.cancel()
+        self.cancel_button.config(state=tk.DISABLED)
+        self.status_label.config(text="Cancelling...")
 
 
 class ConfirmationDialog:
@@ -287,8 +429,349 @@ class ConfirmationDialog:
         self.dialog.destroy()
 
 
+def format_history_timestamp(timestamp, empty_text):
+    """Format a stored timestamp for display in the history dialogs"""
+    if timestamp is None or timestamp == "None" or timestamp == "":
+        return empty_text
+
+    # Try to format the timestamp nicely
+    try:
+        dt = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
+        return dt.strftime("%Y-%m-%d %I:%M %p")
+    except (ValueError, TypeError):
+        return timestamp
+
+
+class HistoryTreeLoader:
+    """
+    Fills a Treeview from a HistoryPager a page at a time.
+    Pages are fetched and formatted on a worker thread and handed to the Tk
+    thread through a queue; the next page is requested when the user scrolls
+    near the bottom.
+    """
+
+    def __init__(self, dialog, tree, y_scroll, pager, format_row):
+        self.dialog = dialog
+        self.tree = tree
+        self.y_scroll = y_scroll
+        self.pager = pager
+        self.format_row = format_row
+        self.results = queue.Queue()
+        self.loading = False
+        self.generation = 0  # Bumped on reset so pages from an old pager are dropped
+
+        self.tree.configure(yscrollcommand=self.on_scroll)
+        self.request_page()
+        self.poll()
+
+    def reset(self, pager):
+        """Clear the tree and start loading from a new pager (e.g. after filtering)"""
+        self.generation += 1
+        self.pager = pager
+        self.loading = False
+        self.tree.delete(*self.tree.get_children())
+        self.request_page()
+
+    def on_scroll(self, first, last):
+        """Forward to the scrollbar and load more rows near the bottom"""
+        self.y_scroll.set(first, last)
+        if float(last) > 0.9:
+            self.request_page()
+
+    def request_page(self):
+        if self.loading or self.pager.exhausted:
+            return
+
+        self.loading = True
+        thread = threading.Thread(
+            target=self._load_page,
+            args=(self.pager, self.generation),
+            daemon=True
+        )
+        thread.start()
+
+    def _load_page(self, pager, generation):
+        try:
+            rows = [self.format_row(record) for record in pager.next_page()]
+            self.results.put((generation, "rows", rows))
+        except Exception as e:
+            self.results.put((generation, "error", e))
+
+    def poll(self):
+        """Insert any loaded pages into the tree (runs on the Tk thread)"""
+        try:
+            if not self.dialog.winfo_exists():
+                return
+        except tk.TclError:
+            return
+
+        while True:
+            try:
+                generation, kind, payload = self.results.get_nowait()
+            except queue.Empty:
+                break
+
+            if generation != self.generation:
+                continue  # Page from before the last reset
+
+            self.loading = False
+            if kind == "error":
+                print(f"Error loading history page: {payload}")
+                continue
+
+            # A page is larger than the visible area, so further pages are only
+            # requested from on_scroll
+            for values in payload:
+                self.tree.insert("", tk.END, values=values)
+
+        self.dialog.after(50, self.poll)
+
+
+class HistoryFilterBar:
+    """Search box, status and date range filters shown above a history tree"""
+
+    STATUSES = ("All", "completed", "pending", "interrupted", "failed")
+
+    def __init__(self, parent, style_name, on_apply):
+        self.on_apply = on_apply  # Called with a HistoryFilter
+
+        self.frame = ttk.Frame(parent, style=style_name)
+        self.frame.pack(fill=tk.X, pady=(0, 10))
+
+        ttk.Label(self.frame, text="Search:", background='white').pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(self.frame, textvariable=self.search_var, width=28)
+        search_entry.pack(side=tk.LEFT, padx=(5, 10))
+        search_entry.bind("<Return>", lambda event: self.apply())
+
+        ttk.Label(self.frame, text="Status:", background='white').pack(side=tk.LEFT)
+        self.status_var = tk.StringVar(value="All")
+        ttk.Combobox(
+            self.frame,
+            textvariable=self.status_var,
+            values=self.STATUSES,
+            state="readonly",
+            width=11
+        ).pack(side=tk.LEFT, padx=(5, 10))
+
+        ttk.Label(self.frame, text="From:", background='white').pack(side=tk.LEFT)
+        self.from_var = tk.StringVar()
+        from_entry = ttk.Entry(self.frame, textvariable=self.from_var, width=11)
+        from_entry.pack(side=tk.LEFT, padx=(5, 10))
+        from_entry.bind("<Return>", lambda event: self.apply())
+
+        ttk.Label(self.frame, text="To:", background='white').pack(side=tk.LEFT)
+        self.to_var = tk.StringVar()
+        to_entry = ttk.Entry(self.frame, textvariable=self.to_var, width=11)
+        to_entry.pack(side=tk.LEFT, padx=(5, 10))
+        to_entry.bind("<Return>", lambda event: self.apply())
+
+        # Archived rows live in a separate database and are only read on request
+        self.archived_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            self.frame,
+            text="Include archived",
+            variable=self.archived_var,
+            command=self.apply
+        ).pack(side=tk.LEFT, padx=(0, 10))
+
+        ttk.Button(self.frame, text="Clear", command=self.clear).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(self.frame, text="Apply", command=self.apply).pack(side=tk.RIGHT, padx=5)
+
+    def apply(self):
+        """Validate the inputs and pass the filter on"""
+        try:
+            date_from = parse_filter_date(self.from_var.get())
+            date_to = parse_filter_date(self.to_var.get())
+        except ValueError:
+            messagebox.showwarning("Invalid Date", "Please enter dates in the format YYYY-MM-DD.")
+            return
+
+        status = self.status_var.get()
+        self.on_apply(HistoryFilter(
+            search=self.search_var.get(),
+            status=None if status == "All" else status,
+            date_from=date_from,
+            date_to=date_to,
+            include_archived=self.archived_var.get()
+        ))
+
+    def clear(self):
+        self.search_var.set("")
+        self.status_var.set("All")
+        self.from_var.set("")
+        self.to_var.set("")
+        self.archived_var.set(False)
+        self.apply()
+
+
+def export_history_to_file(dialog, parent, store, history, history_filter, history_folder, file_prefix):
+    """
+    Ask for an output file and stream the history into it on a worker thread.
+    The format follows the chosen file extension.
+    """
+    ensure_directory_exists(history_folder)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_path = filedialog.asksaveasfilename(
+        parent=dialog,
+        title="Export History",
+        initialdir=history_folder,
+        initialfile=f"{file_prefix}_{timestamp}.csv",
+        defaultextension=".csv",
+        filetypes=[
+            ("CSV (Excel)", "*.csv"),
+            ("JSON Lines", "*.jsonl"),
+            ("Parquet", "*.parquet")
+        ]
+    )
+    if not output_path:
+        return  # User cancelled
+
+    result = {}
+
+    # Imported on first use to keep it out of application startup
+    from utils.history_export import export_history
+
+    def run_export():
+        try:
+            result["count"] = export_history(store, history, output_path, history_filter=history_filter)
+        except Exception as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=run_export, daemon=True)
+    thread.start()
+
+    def check_finished():
+        # Poll from the main window so this keeps working if the dialog is closed
+        if thread.is_alive():
+            parent.after(100, check_finished)
+            return
+
+        if "error" in result:
+            messagebox.showerror("Error", f"Failed to export data:\n{str(result['error'])}")
+            return
+
+        if result["count"] == 0:
+            messagebox.showwarning("Warning", "No data to export")
+            return
+
+        messagebox.showinfo("Success", f"Exported {result['count']:,} rows to:\n{output_path}")
+
+        # Open the file location in Explorer
+        try:
+            os.startfile(os.path.dirname(output_path))
+        except Exception as e:
+            print(f"Error opening file location: {e}")
+
+    check_finished()
+
+
+class HistoryStatsDialog:
+    """Monthly totals read from a history database's summary table"""
+
+    def __init__(self, parent, store, stats_query, title, count_heading, total_headings=()):
+        # Create dialog window
+        self.dialog = tk.Toplevel(parent)
+        self.dialog.title(title)
+        self.dialog.geometry("850x400")
+        self.dialog.resizable(True, True)
+        self.dialog.transient(parent)
+        self.dialog.grab_set()
+
+        # Set background color to white for the dialog
+        self.dialog.configure(bg='white')
+
+        # Set EEP icon for dialog
+        try:
+            icon_path = resource_path(os.path.join("assets", "EEP_512_512.ico"))
+            self.dialog.iconbitmap(icon_path)
+        except Exception as e:
+            print(f"Error loading icon for dialog: {e}")
+
+        # Configure styles
+        style = ttk.Style()
+        style.configure("HistoryStats.TFrame", background='white')
+
+        # Create content
+        frame = ttk.Frame(self.dialog, padding=10, style="HistoryStats.TFrame")
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        tree_frame = ttk.Frame(frame, style="HistoryStats.TFrame")
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+
+        y_scroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL)
+        y_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+
+        # (column id, heading, width)
+        column_defs = [
+            ("month", "Month", 140),
+            ("runs", count_heading, 90),
+            ("completed", "Completed", 90),
+            ("failed", "Failed", 80),
+            ("success_rate", "Success Rate", 100),
+        ]
+        column_defs += [(f"total_{i}", heading, 110) for i, heading in enumerate(total_headings)]
+        column_defs.append(("average_duration", "Avg Duration", 110))
+
+        self.tree = ttk.Treeview(
+            tree_frame,
+            columns=[col_id for col_id, _, _ in column_defs],
+            yscrollcommand=y_scroll.set,
+            selectmode="browse",
+            show="headings"
+        )
+        y_scroll.config(command=self.tree.yview)
+
+        for col_id, heading, width in column_defs:
+            self.tree.heading(col_id, text=heading, anchor="center")
+            self.tree.column(col_id, width=width, minwidth=60, anchor="center")
+
+        self.tree.pack(fill=tk.BOTH, expand=True)
+
+        # The summary table holds one row per month and status, so this stays
+        # fast however many uploads or exports have been recorded
+        try:
+            stores = [store]
+            archive_store = get_archive_store(store)
+            if archive_store is not None:
+                stores.append(archive_store)
+
+            for summary in load_monthly_summaries(stores, stats_query):
+                success_rate = summary.success_rate
+                values = [
+                    summary.label,
+                    summary.runs,
+                    summary.completed,
+                    summary.failed,
+                    f"{success_rate:.0%}" if success_rate is not None else "-",
+                ]
+                values += [f"{total:,}" for total in summary.totals.values()]
+                values.append(format_duration(summary.average_duration))
+                self.tree.insert("", tk.END, values=values)
+        except Exception as e:
+            print(f"Error loading history statistics: {str(e)}")
+            messagebox.showerror("Error", f"Failed to load statistics:\n{str(e)}", parent=self.dialog)
+
+        ttk.Label(
+            frame,
+            text="Totals and durations count completed runs; months are grouped by start date.",
+            font=("Arial", 9),
+            background='white'
+        ).pack(anchor=tk.W, pady=(8, 0))
+
+        ttk.Button(
+            frame,
+            text="Close",
+            command=self.dialog.destroy,
+            style="Accent.TButton"
+        ).pack(side=tk.RIGHT, pady=(10, 0))
+
+        # Wait for dialog to close
+        parent.wait_window(self.dialog)
+
+
 class UploadHistoryDialog:
-    def __init__(self, parent, history_data, db_file):
+    def __init__(self, parent, pager, db_file):
         # Create dialog window
         self.dialog = tk.Toplevel(parent)
         self.dialog.title("Topic Upload History")
@@ -330,6 +813,9 @@ class UploadHistoryDialog:
         frame = ttk.Frame(self.dialog, padding=10, style="UploadHistory.TFrame")
         frame.pack(fill=tk.BOTH, expand=True)
 
+        # Search and filter controls
+        self.filter_bar = HistoryFilterBar(frame, "UploadHistory.TFrame", self.apply_filter)
+
         # Create treeview with scrollbars
         tree_frame = ttk.Frame(frame, style="UploadHistory.TFrame")
         tree_frame.pack(fill=tk.BOTH, expand=True)
@@ -378,39 +864,27 @@ class UploadHistoryDialog:
 
         self.tree.pack(fill=tk.BOTH, expand=True)
 
-        # Modify the values insertion to remove status
-        for record in history_data:
-            # Handle formatting of timestamp
-            timestamp = record[1]
-            if timestamp is None or timestamp == "None" or timestamp == "":
-                timestamp_display = "Pending"
-            else:
-                # Try to format the timestamp nicely
-                try:
-                    dt = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
-                    timestamp_display = dt.strftime("%Y-%m-%d %I:%M %p")
-                except (ValueError, TypeError):
-                    timestamp_display = timestamp
-
-            values = (
-                timestamp_display,  # upload_time
-                record[2],  # topic_month
-                record[3],  # xml_files
-                record[4],  # images
-                record[5],  # database_zip
-                record[6]  # images_zip
-            )
-            self.tree.insert("", tk.END, values=values)
+        # Rows are loaded page by page as the user scrolls
+        self.pager = pager
+        self.loader = HistoryTreeLoader(self.dialog, self.tree, y_scroll, pager, self.format_record)
 
         # Add button frame
         button_frame = ttk.Frame(frame, style="UploadHistory.TFrame")
         button_frame.pack(fill=tk.X, pady=(10, 0))
 
-        # Export to CSV button
+        # Export button
+        ttk.Button(
+            button_frame,
+            text="Export...",
+            command=self.export_history,
+            style="Accent.TButton"
+        ).pack(side=tk.LEFT, padx=5)
+
+        # Monthly statistics button
         ttk.Button(
             button_frame,
-            text="Export to CSV",
-            command=self.export_to_csv,
+            text="Statistics",
+            command=self.show_statistics,
             style="Accent.TButton"
         ).pack(side=tk.LEFT, padx=5)
 
@@ -428,54 +902,48 @@ class UploadHistoryDialog:
         # Wait for dialog to close
         parent.wait_window(self.dialog)
 
-    def export_to_csv(self):
-        """Export the history data to a CSV file with Excel-friendly formatting"""
-        try:
-            # Get all data from the treeview
-            data = []
-            headers = [
-                "Uploaded Date & Time",
-                "Topic Month",
-                "No of XML Files",
-                "No of Images",
-                "Database ZIP",
-                "Images ZIP",
-                "Status"
-            ]
-            data.append(headers)  # Add headers first
-
-            for item in self.tree.get_children():
-                values = list(self.tree.item(item, 'values'))
-                data.append(values)
-
-            if len(data) <= 1:  # Only headers exist
-                messagebox.showwarning("Warning", "No data to export")
-                return
-
-            # Create CSV file path - use the same folder as the database
-            history_folder = os.path.dirname(self.db_file)  # Use self.db_file instead of self.parent.db_file
-            ensure_directory_exists(history_folder)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            csv_file = os.path.join(history_folder, f"topic_upload_history_{timestamp}.csv")
-
-            # Write to CSV with Excel-compatible formatting
-            with open(csv_file, 'w', newline='', encoding='utf-8-sig') as f:  # utf-8-sig for Excel
-                writer = csv.writer(f)
-                writer.writerows(data)
-
-            messagebox.showinfo("Success", f"Data exported to:\n{csv_file}")
+    @staticmethod
+    def format_record(record):
+        """Convert a history row into the values shown in the tree"""
+        return (
+            format_history_timestamp(record[1], "Pending"),  # upload_time
+            record[2],  # topic_month
+            record[3],  # xml_files
+            record[4],  # images
+            record[5],  # database_zip
+            record[6]  # images_zip
+        )
 
-            # Open the file location in Explorer
-            try:
-                os.startfile(os.path.dirname(csv_file))
-            except Exception as e:
-                print(f"Error opening file location: {e}")
+    def apply_filter(self, history_filter):
+        """Reload the tree with only the rows matching the filter"""
+        pager = open_history_pager(self.pager.store, self.pager.query, history_filter)
+        self.loader.reset(pager)
+
+    def export_history(self):
+        """Export the matching history rows to CSV, JSON Lines or Parquet"""
+        export_history_to_file(
+            self.dialog,
+            self.parent,
+            self.pager.store,
+            "uploads",
+            self.loader.pager.history_filter,
+            os.path.dirname(self.db_file),
+            "topic_upload_history"
+        )
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to export data:\n{str(e)}")
+    def show_statistics(self):
+        """Show monthly upload totals"""
+        HistoryStatsDialog(
+            self.dialog,
+            self.pager.store,
+            UPLOAD_STATS_QUERY,
+            "Topic Upload Statistics",
+            "Uploads",
+            ("XML Files", "Images")
+        )
 
 class TetonHistoryDialog:
-    def __init__(self, parent, history_data, db_file):
+    def __init__(self, parent, pager, db_file):
         # Create dialog window
         self.dialog = tk.Toplevel(parent)
         self.dialog.title("Teton Export History")
@@ -516,6 +984,9 @@ class TetonHistoryDialog:
         frame = ttk.Frame(self.dialog, padding=10, style="TetonHistory.TFrame")
         frame.pack(fill=tk.BOTH, expand=True)
 
+        # Search and filter controls
+        self.filter_bar = HistoryFilterBar(frame, "TetonHistory.TFrame", self.apply_filter)
+
         # Create treeview with scrollbars
         tree_frame = ttk.Frame(frame, style="TetonHistory.TFrame")
         tree_frame.pack(fill=tk.BOTH, expand=True)
@@ -547,32 +1018,27 @@ class TetonHistoryDialog:
 
         self.tree.pack(fill=tk.BOTH, expand=True)
 
-        # Add data to the treeview
-        for record in history_data:
-            # Handle formatting of timestamp
-            timestamp = record[1]  # Second item is the export timestamp
-            if timestamp is None or timestamp == "None" or timestamp == "":
-                timestamp_display = "Unknown"
-            else:
-                # Try to format the timestamp nicely
-                try:
-                    dt = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
-                    timestamp_display = dt.strftime("%Y-%m-%d %I:%M %p")
-                except (ValueError, TypeError):
-                    timestamp_display = timestamp
-
-            folder_name = record[2]  # Third item is the folder name
-            self.tree.insert("", tk.END, values=(timestamp_display, folder_name))
+        # Rows are loaded page by page as the user scrolls
+        self.pager = pager
+        self.loader = HistoryTreeLoader(self.dialog, self.tree, y_scroll, pager, self.format_record)
 
         # Add button frame
         button_frame = ttk.Frame(frame, style="TetonHistory.TFrame")
         button_frame.pack(fill=tk.X, pady=(10, 0))
 
-        # Export to CSV button
+        # Export button
+        ttk.Button(
+            button_frame,
+            text="Export...",
+            command=self.export_history,
+            style="Accent.TButton"
+        ).pack(side=tk.LEFT, padx=5)
+
+        # Monthly statistics button
         ttk.Button(
             button_frame,
-            text="Export to CSV",
-            command=self.export_to_csv,
+            text="Statistics",
+            command=self.show_statistics,
             style="Accent.TButton"
         ).pack(side=tk.LEFT, padx=5)
 
@@ -590,44 +1056,37 @@ class TetonHistoryDialog:
         # Wait for dialog to close
         parent.wait_window(self.dialog)
 
-    def export_to_csv(self):
-        """Export the Teton export history data to a CSV file"""
-        try:
-            # Get all data from the treeview
-            data = []
-            headers = [
-                "Export Date & Time",
-                "Export Folder Name",
-                "Status"
-            ]
-            data.append(headers)  # Add headers first
-
-            for item in self.tree.get_children():
-                values = list(self.tree.item(item, 'values'))
-                data.append(values)
-
-            if len(data) <= 1:  # Only headers exist
-                messagebox.showwarning("Warning", "No data to export")
-                return
-
-            # Create CSV file path - use the same folder as the database
-            history_folder = os.path.dirname(self.db_file)  # Use self.db_file that was passed to constructor
-            ensure_directory_exists(history_folder)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            csv_file = os.path.join(history_folder, f"teton_export_history_{timestamp}.csv")
-
-            # Write to CSV with Excel-compatible formatting
-            with open(csv_file, 'w', newline='', encoding='utf-8-sig') as f:  # utf-8-sig for Excel
-                writer = csv.writer(f)
-                writer.writerows(data)
-
-            messagebox.showinfo("Success", f"Data exported to:\n{csv_file}")
+    @staticmethod
+    def format_record(record):
+        """Convert a history row into the values shown in the tree"""
+        return (
+            format_history_timestamp(record[1], "Unknown"),  # Second item is the export timestamp
+            record[2]  # Third item is the folder name
+        )
 
-            # Open the file location in Explorer
-            try:
-                os.startfile(os.path.dirname(csv_file))
-            except Exception as e:
-                print(f"Error opening file location: {e}")
+    def apply_filter(self, history_filter):
+        """Reload the tree with only the rows matching the filter"""
+        pager = open_history_pager(self.pager.store, self.pager.query, history_filter)
+        self.loader.reset(pager)
+
+    def export_history(self):
+        """Export the matching history rows to CSV, JSON Lines or Parquet"""
+        export_history_to_file(
+            self.dialog,
+            self.parent,
+            self.pager.store,
+            "exports",
+            self.loader.pager.history_filter,
+            os.path.dirname(self.db_file),
+            "teton_export_history"
+        )
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to export data:\n{str(e)}")
\ No newline at end of file
+    def show_statistics(self):
+        """Show monthly export totals"""
+        HistoryStatsDialog(
+            self.dialog,
+            self.pager.store,
+            EXPORT_STATS_QUERY,
+            "Teton Export Statistics",
+            "Exports"
+        )
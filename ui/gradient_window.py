@@ -1,13 +1,31 @@
 #gradient_window
 import tkinter as tk
 from tkinter import ttk, messagebox
-from PIL import Image, ImageTk, ImageFilter
 import os
 import sys
+import importlib
+import threading
 from tkinter.font import Font
 from tasks.topic_upload import TopicUploadTask
 from ui.dialogs import UploadHistoryDialog, TetonHistoryDialog
+from ui.background import load_background
+from ui.job_dashboard import JobDashboard
 from tasks.teton_content_export import TetonContentExportTask
+from utils.retention import RetentionManager
+from utils.history_archive import HistoryMaintenance, get_archive_store
+from utils.deletion import start_tombstone_cleanup
+from utils.startup_profile import StartupProfiler
+from utils.lag_monitor import LagMonitor, lag_monitor_enabled
+from utils.metrics import start_metrics_exporter
+from utils.run_profiler import profile_request
+
+# Delay before the first retention pass and interval between passes
+RETENTION_START_DELAY_MS = 10 * 1000
+RETENTION_INTERVAL_MS = 6 * 60 * 60 * 1000
+
+# Delay before the first history archival/compaction pass and interval between passes
+MAINTENANCE_START_DELAY_MS = 2 * 60 * 1000
+MAINTENANCE_INTERVAL_MS = 24 * 60 * 60 * 1000
 
 
 def resource_path(relative_path):
@@ -21,9 +39,16 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 
+# Modules only needed once the user opens a dialog, imported in the background after startup
+DEFERRED_IMPORTS = ("utils.history_export",)
+
+
 class GradientWindow:
-    def __init__(self, root):
+    def __init__(self, root, profiler=None):
         self.root = root
+        self.profiler = profiler or StartupProfiler()
+        self.on_startup_complete = None  # Called on the Tk thread once deferred startup work is done
+        self.lag_monitor = LagMonitor(root) if lag_monitor_enabled() else None
         self.root.title("EEP Topic Upload Tool")
 
         # This is crucial for PyInstaller compatibility
@@ -44,7 +69,9 @@ class GradientWindow:
         except Exception as e:
             print(f"Error loading icon: {e}")
 
-        # Task handlers
+        self.profiler.mark("window setup")
+
+        # Task handlers (their databases are initialized after the first paint)
         self.topic_upload_task = TopicUploadTask(
             self.root,
             on_upload_complete=self.enable_buttons_after_upload,
@@ -57,38 +84,34 @@ class GradientWindow:
             on_folder_cleared=self.disable_teton_clear_button
         )
 
-        # Background image (with proper path handling)
-        try:
-            bg_path = resource_path(os.path.join("assets", "Background.png"))
-            self.bg_image = Image.open(bg_path)
-            # Resize image to window size
-            self.bg_image = self.bg_image.resize((window_width, window_height), Image.LANCZOS)
-            print(f"Loaded background image from: {bg_path}")
-        except Exception as e:
-            # Fallback if image not found
-            print(f"Error loading background image: {e}")
-            self.bg_image = Image.new('RGB', (window_width, window_height), (50, 50, 50))
-
-        # Create gradient overlay
-        self.gradient = Image.new('RGBA', (window_width, window_height), (0, 0, 0, 0))
-        for y in range(window_height):
-            alpha = int(200 * (1 - y / window_height))
-            overlay = Image.new('RGBA', (window_width, 1), (0, 0, 0, alpha))
-            self.gradient.paste(overlay, (0, y))
-
-        # Apply gradient to the image
-        try:
-            self.image_with_gradient = Image.alpha_composite(
-                self.bg_image.convert('RGBA'),
-                self.gradient
-            )
-        except Exception as e:
-            print(f"Error applying gradient: {e}")
-            # Fallback in case of error
-            self.image_with_gradient = self.bg_image.convert('RGBA')
+        self.profiler.mark("create tasks")
+
+        # Finish deleting folders left over from a cancelled or interrupted deletion
+        start_tombstone_cleanup()
+
+        # Disk retention for old export and temporary folders
+        self.retention_manager = RetentionManager(
+            self.topic_upload_task.db_file,
+            self.teton_export_task.db_file,
+            get_protected_folders=self.get_active_folders,
+            ready_events=(self.topic_upload_task.db_ready, self.teton_export_task.db_ready),
+            export_files=self.teton_export_task.export_files
+        )
+        self.root.after(RETENTION_START_DELAY_MS, self.run_retention)
+
+        # Archive old history rows and compact the history databases
+        self.history_maintenance = HistoryMaintenance(
+            self.topic_upload_task.db_file,
+            self.teton_export_task.db_file,
+            ready_events=(self.topic_upload_task.db_ready, self.teton_export_task.db_ready)
+        )
+        self.root.after(MAINTENANCE_START_DELAY_MS, self.run_history_maintenance)
 
-        # Create background
-        self.bg_photo = ImageTk.PhotoImage(self.image_with_gradient.convert('RGB'))
+        # Background image darkened by a gradient, composited once and then
+        # loaded from the on-disk cache on later launches
+        bg_path = resource_path(os.path.join("assets", "Background.png"))
+        self.bg_photo = load_background(bg_path, window_width, window_height)
+        self.profiler.mark("load background")
         self.background = tk.Label(root, image=self.bg_photo)
         self.background.place(x=0, y=0, relwidth=1, relheight=1)
 
@@ -144,15 +167,102 @@ class GradientWindow:
         self.create_topic_upload_buttons()
         self.create_teton_export_buttons()
 
+        # Live view of running uploads, exports and their child jobs; appears
+        # once the first job starts
+        self.job_dashboard = JobDashboard(self.root)
+        self.job_dashboard.place(x=345, y=245, width=450, height=150)
+
         # Bind tab change event
         self.tab_control.bind("<<NotebookTabChanged>>", self.on_tab_changed)
 
+        self.create_menu()
+
         # Window settings
         self.root.resizable(False, False)
 
         # Force window to update and show properly
         self.root.update_idletasks()
         self.root.deiconify()
+        self.profiler.mark("create widgets")
+
+        # Once the window has been drawn, finish startup in the background
+        self.root.after_idle(self.on_first_paint)
+
+    def on_first_paint(self):
+        """The window is visible and responsive; start the deferred startup work"""
+        self.profiler.mark_interactive()
+        if self.lag_monitor:
+            self.lag_monitor.start()
+        threading.Thread(target=self.run_deferred_startup, daemon=True).start()
+
+    def run_deferred_startup(self):
+        """Initialize the history databases and warm up lazy imports (background thread)"""
+        # Optional metrics file/endpoint for monitoring (EEP_METRICS_FILE / EEP_METRICS_PORT)
+        self.metrics_exporter = start_metrics_exporter()
+
+        self.topic_upload_task.init_upload_db()
+        self.teton_export_task.init_export_db()
+
+        for module_name in DEFERRED_IMPORTS:
+            try:
+                importlib.import_module(module_name)
+            except Exception as e:
+                print(f"Error importing {module_name}: {str(e)}")
+
+        self.root.after(0, self.on_deferred_startup_done)
+
+    def on_deferred_startup_done(self):
+        self.profiler.mark("deferred database init (background)")
+        self.enable_database_buttons()
+        if self.on_startup_complete:
+            self.on_startup_complete()
+
+    def enable_database_buttons(self):
+        """
+        Enable the buttons that read or write the history databases. They stay
+        disabled until the databases are initialized, so an early click cannot
+        block the window while it waits for them.
+        """
+        for button in (
+            self.topic_upload_btn, self.run_filter_btn, self.elastic_index_btn, self.history_btn,
+            self.teton_export_btn, self.teton_history_btn
+        ):
+            button.config(state=tk.NORMAL)
+
+    def create_menu(self):
+        """Menu bar with the diagnostics switches"""
+        menu_bar = tk.Menu(self.root)
+        self.profile_next_run = tk.BooleanVar(value=profile_request.armed)
+        # A run clears the request from a worker thread; show its current state when opened
+        diagnostics_menu = tk.Menu(
+            menu_bar, tearoff=0,
+            postcommand=lambda: self.profile_next_run.set(profile_request.armed)
+        )
+        diagnostics_menu.add_checkbutton(
+            label="Profile Next Run",
+            variable=self.profile_next_run,
+            command=lambda: profile_request.arm(self.profile_next_run.get())
+        )
+        menu_bar.add_cascade(label="Diagnostics", menu=diagnostics_menu)
+        self.root.config(menu=menu_bar)
+
+    def get_active_folders(self):
+        """Folders that are currently in use and must not be reclaimed"""
+        return [
+            self.topic_upload_task.working_folder,
+            *self.topic_upload_task.active_working_folders(),
+            self.teton_export_task.export_folder
+        ]
+
+    def run_retention(self):
+        """Start a background retention pass and schedule the next one"""
+        self.retention_manager.start()
+        self.root.after(RETENTION_INTERVAL_MS, self.run_retention)
+
+    def run_history_maintenance(self):
+        """Start a background history maintenance pass and schedule the next one"""
+        self.history_maintenance.start()
+        self.root.after(MAINTENANCE_INTERVAL_MS, self.run_history_maintenance)
 
     def on_tab_changed(self, event):
         """Handle tab change event"""
@@ -230,6 +340,7 @@ class GradientWindow:
             bd=0,
             highlightthickness=0,
             command=self.topic_upload_task.start_topic_upload,
+            state=tk.DISABLED,  # Until the history databases are ready
             width=button_width,
             height=button_height
         )
@@ -248,6 +359,7 @@ class GradientWindow:
             bd=0,
             highlightthickness=0,
             command=self.topic_upload_task.run_filter_job,
+            state=tk.DISABLED,  # Until the history databases are ready
             width=button_width,
             height=button_height
         )
@@ -265,6 +377,7 @@ class GradientWindow:
             bd=0,
             highlightthickness=0,
             command=self.topic_upload_task.run_elastic_index_job,
+            state=tk.DISABLED,  # Until the history databases are ready
             width=button_width,
             height=button_height
         )
@@ -282,6 +395,7 @@ class GradientWindow:
             bd=0,
             highlightthickness=0,
             command=self.show_upload_history,
+            state=tk.DISABLED,  # Until the history databases are ready
             width=button_width,
             height=button_height
         )
@@ -351,6 +465,7 @@ class GradientWindow:
             bd=0,
             highlightthickness=0,
             command=self.start_teton_export,
+            state=tk.DISABLED,  # Until the history databases are ready
             width=button_width,
             height=button_height
         )
@@ -368,6 +483,7 @@ class GradientWindow:
             bd=0,
             highlightthickness=0,
             command=self.show_teton_history,
+            state=tk.DISABLED,  # Until the history databases are ready
             width=button_width,
             height=button_height
         )
@@ -438,11 +554,22 @@ class GradientWindow:
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to open folder: {str(e)}")
 
+    def has_history(self, pager):
+        """Constant-time check whether a history table or its archive has any rows"""
+        try:
+            if pager.has_rows():
+                return True
+            archive_store = get_archive_store(pager.store)
+            return archive_store is not None and archive_store.fetchone(pager.query.any_row_sql) is not None
+        except Exception as e:
+            print(f"Error checking history: {str(e)}")
+            return False
+
     def show_upload_history(self):
         """Show the upload history dialog"""
-        history = self.topic_upload_task.get_upload_history()
-        if history:
-            UploadHistoryDialog(self.root, history, self.topic_upload_task.db_file)  # Pass db_file here
+        pager = self.topic_upload_task.get_upload_history_pager()
+        if self.has_history(pager):
+            UploadHistoryDialog(self.root, pager, self.topic_upload_task.db_file)  # Pass db_file here
         else:
             messagebox.showinfo(
                 "No History",
@@ -455,9 +582,9 @@ class GradientWindow:
 
     def show_teton_history(self):
         """Show Teton export history"""
-        history = self.teton_export_task.get_export_history()
-        if history:
-            TetonHistoryDialog(self.root, history, self.teton_export_task.db_file)
+        pager = self.teton_export_task.get_export_history_pager()
+        if self.has_history(pager):
+            TetonHistoryDialog(self.root, pager, self.teton_export_task.db_file)
         else:
             messagebox.showinfo(
                 "No History",
@@ -0,0 +1,142 @@
+#job_dashboard
+import tkinter as tk
+from tkinter import ttk
+
+from utils.history_stats import format_duration
+from utils.job_events import job_events
+
+# How often the panel refreshes from the job event bus
+DASHBOARD_REFRESH_MS = 250
+
+
+def format_throughput(job):
+    throughput = job.throughput
+    if throughput is None:
+        return ""
+    if job.unit == "bytes":
+        return f"{throughput / (1024 * 1024):.1f} MB/s"
+    return f"{throughput:.1f} {job.unit or 'items'}/s"
+
+
+def format_progress(job):
+    """Percentage of the current step and the rate it is going at"""
+    if not job.total:
+        return format_throughput(job)
+    return f"{job.done / job.total:.0%} {format_throughput(job)}".strip()
+
+
+def format_message(job):
+    if job.is_finished or not job.stage:
+        return job.last_log
+    if job.last_log:
+        return f"{job.stage} - {job.last_log}"
+    return job.stage
+
+
+class JobDashboard:
+    """
+    Non-modal panel listing running and recently finished jobs, with child jobs
+    (e.g. the filter job of an upload) nested under the job that started them.
+    """
+
+    def __init__(self, parent, bus=job_events):
+        self.parent = parent
+        self.bus = bus
+        self.version = None
+        self.items = {}  # job id -> tree item
+
+        style = ttk.Style()
+        style.configure("Dashboard.Treeview", rowheight=20, font=("Arial", 9))
+        style.configure("Dashboard.Treeview.Heading", font=("Arial", 9, "bold"))
+
+        self.frame = tk.Frame(parent, bg='black')
+
+        tk.Label(
+            self.frame,
+            text="Jobs",
+            font=("Arial", 10, "bold"),
+            fg='white',
+            bg='black'
+        ).pack(anchor=tk.W, padx=4, pady=(2, 2))
+
+        columns = ("state", "elapsed", "progress", "message")
+        self.tree = ttk.Treeview(
+            self.frame,
+            columns=columns,
+            style="Dashboard.Treeview",
+            selectmode="none",
+            show="tree headings",
+            height=5
+        )
+        self.tree.heading("#0", text="Job", anchor=tk.W)
+        self.tree.column("#0", width=120, stretch=False)
+
+        column_defs = [
+            ("state", "State", 70),
+            ("elapsed", "Elapsed", 55),
+            ("progress", "Progress", 95),
+            ("message", "Last Message", 110),
+        ]
+        for col_id, heading, width in column_defs:
+            self.tree.heading(col_id, text=heading, anchor=tk.W)
+            self.tree.column(col_id, width=width, minwidth=40, stretch=col_id == "message")
+
+        self.tree.pack(fill=tk.BOTH, expand=True)
+
+        self.visible = False
+        self.place_options = {}
+
+    def place(self, **options):
+        """Where to show the panel; it stays hidden until the first job starts"""
+        self.place_options = options
+        self.refresh()
+
+    def refresh(self):
+        """Redraw from the bus if anything changed or a job is still running (Tk thread)"""
+        version, jobs = self.bus.snapshot()
+        running = any(not job.is_finished for job in jobs)
+
+        # Elapsed time keeps moving while jobs run, so redraw then even without events
+        if version != self.version or running:
+            self.version = version
+            self.update_tree(jobs)
+
+        if jobs and not self.visible:
+            self.frame.place(**self.place_options)
+            self.visible = True
+        elif not jobs and self.visible:
+            self.frame.place_forget()
+            self.visible = False
+
+        self.parent.after(DASHBOARD_REFRESH_MS, self.refresh)
+
+    def update_tree(self, jobs):
+        current = set()
+        for job in jobs:
+            current.add(job.job_id)
+            values = (
+                job.state,
+                format_duration(job.elapsed),
+                format_progress(job),
+                format_message(job)
+            )
+
+            item = self.items.get(job.job_id)
+            # A child's item disappears with its parent once the parent is pruned
+            if item is None or not self.tree.exists(item):
+                parent_item = self.items.get(job.parent_id, "")
+                if parent_item and not self.tree.exists(parent_item):
+                    parent_item = ""
+                # Newest top-level jobs first, child jobs in start order under their parent
+                index = tk.END if parent_item else 0
+                item = self.tree.insert(parent_item, index, text=job.name, values=values, open=True)
+                self.items[job.job_id] = item
+            else:
+                self.tree.item(item, values=values)
+
+        # Drop jobs the bus no longer keeps
+        for job_id in list(self.items):
+            if job_id not in current:
+                if self.tree.exists(self.items[job_id]):
+                    self.tree.delete(self.items[job_id])
+                del self.items[job_id]
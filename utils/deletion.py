@@ -0,0 +1,190 @@
+import json
+import os
+import stat
+import threading
+from datetime import datetime
+
+# Folders renamed for deletion get this marker so leftovers can be recognised
+TOMBSTONE_MARKER = ".eep-deleting-"
+
+# Registry of tombstones that have not been fully removed yet
+TOMBSTONE_REGISTRY = os.path.abspath(os.path.join("Topic Upload History", "pending_deletions.json"))
+
+_registry_lock = threading.Lock()
+
+
+def _read_registry():
+    try:
+        with open(TOMBSTONE_REGISTRY, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def _write_registry(entries):
+    try:
+        os.makedirs(os.path.dirname(TOMBSTONE_REGISTRY), exist_ok=True)
+        temp_file = TOMBSTONE_REGISTRY + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=2)
+        os.replace(temp_file, TOMBSTONE_REGISTRY)
+    except OSError as e:
+        print(f"Error writing tombstone registry: {str(e)}")
+
+
+def register_tombstone(path):
+    """Remember a tombstone so it can be cleaned up after a restart"""
+    with _registry_lock:
+        entries = _read_registry()
+        if path not in entries:
+            entries.append(path)
+            _write_registry(entries)
+
+
+def unregister_tombstone(path):
+    """Forget a tombstone once it has been removed"""
+    with _registry_lock:
+        entries = [entry for entry in _read_registry() if entry != path]
+        _write_registry(entries)
+
+
+def tombstone_directory(directory_path):
+    """
+    Atomically rename a directory to a tombstone next to it and return the new path.
+    The rename stays on the same volume, so it is instant regardless of folder size.
+    """
+    directory_path = os.path.abspath(directory_path)
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
+    tombstone_path = f"{directory_path}{TOMBSTONE_MARKER}{timestamp}"
+
+    os.rename(directory_path, tombstone_path)
+    register_tombstone(tombstone_path)
+    return tombstone_path
+
+
+def _remove_readonly(func, path):
+    """Clear the read-only flag (common on Windows) and retry"""
+    os.chmod(path, stat.S_IWRITE)
+    func(path)
+
+
+def delete_tree(directory_path, cancel_event=None, on_progress=None):
+    """
+    Delete a directory tree file by file.
+    Returns True if the tree was fully removed, False if it was cancelled.
+    on_progress(deleted, total) is called as files are removed.
+    """
+    # Count first so progress can be reported as a fraction
+    total = 0
+    for _, _, files in os.walk(directory_path):
+        total += len(files)
+
+    deleted = 0
+    for root, dirs, files in os.walk(directory_path, topdown=False):
+        for name in files:
+            if cancel_event is not None and cancel_event.is_set():
+                return False
+
+            file_path = os.path.join(root, name)
+            try:
+                os.remove(file_path)
+            except PermissionError:
+                _remove_readonly(os.remove, file_path)
+            except FileNotFoundError:
+                pass
+
+            deleted += 1
+            if on_progress and (deleted % 200 == 0 or deleted == total):
+                on_progress(deleted, total)
+
+        for name in dirs:
+            dir_path = os.path.join(root, name)
+            try:
+                if os.path.islink(dir_path):
+                    os.remove(dir_path)
+                else:
+                    os.rmdir(dir_path)
+            except FileNotFoundError:
+                pass
+
+    os.rmdir(directory_path)
+    if on_progress:
+        on_progress(total, total)
+    return True
+
+
+class DeletionWorker:
+    """Removes a tombstoned directory on a background thread"""
+
+    def __init__(self, tombstone_path, on_done=None, job=None):
+        self.tombstone_path = tombstone_path
+        self.on_done = on_done  # Called from the worker thread with (completed, error)
+        self.job = job  # Optional job event handle for the dashboard
+        self.cancel_event = threading.Event()
+        self.deleted = 0
+        self.total = 0
+        self.finished = False
+        self.completed = False
+        self.error = None
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def cancel(self):
+        """Stop deleting; the tombstone will be removed on the next start"""
+        self.cancel_event.set()
+
+    @property
+    def progress(self):
+        """Fraction of files removed so far (0.0 to 1.0)"""
+        if not self.total:
+            return 0.0
+        return self.deleted / self.total
+
+    def _on_progress(self, deleted, total):
+        self.deleted = deleted
+        self.total = total
+        if self.job:
+            self.job.progress(deleted, total, "files")
+
+    def _run(self):
+        try:
+            self.completed = delete_tree(self.tombstone_path, self.cancel_event, self._on_progress)
+            if self.completed:
+                unregister_tombstone(self.tombstone_path)
+        except Exception as e:
+            print(f"Error deleting {self.tombstone_path}: {str(e)}")
+            self.error = e
+        finally:
+            self.finished = True
+            if self.job:
+                if self.error:
+                    self.job.finish("failed", str(self.error))
+                else:
+                    self.job.finish("completed" if self.completed else "cancelled")
+            if self.on_done:
+                self.on_done(self.completed, self.error)
+
+
+def purge_leftover_tombstones():
+    """Remove tombstones left behind by a cancelled or interrupted deletion"""
+    for tombstone_path in _read_registry():
+        if not os.path.exists(tombstone_path):
+            unregister_tombstone(tombstone_path)
+            continue
+
+        try:
+            if delete_tree(tombstone_path):
+                unregister_tombstone(tombstone_path)
+                print(f"Removed leftover tombstone: {tombstone_path}")
+        except Exception as e:
+            print(f"Error removing leftover tombstone {tombstone_path}: {str(e)}")
+
+
+def start_tombstone_cleanup():
+    """Clean up leftover tombstones on a background thread"""
+    thread = threading.Thread(target=purge_leftover_tombstones, daemon=True)
+    thread.start()
+    return thread
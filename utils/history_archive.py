@@ -0,0 +1,256 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from utils.history_query import HistoryPager, ChainedHistoryPager
+from utils.history_schema import UPLOAD_MIGRATIONS, EXPORT_MIGRATIONS
+from utils.history_store import get_store
+from utils.retention import lower_current_thread_priority
+
+# Rows older than this move to the archive database; override with an
+# environment variable on the upload box
+DEFAULT_ARCHIVE_AFTER_DAYS = 365
+
+# Rows moved per transaction, so the live database is never locked for long
+ARCHIVE_BATCH_SIZE = 5000
+
+# VACUUM once this share of the database file is free pages
+VACUUM_FREE_RATIO = 0.1
+
+
+def get_archive_after_days():
+    """Read the archive horizon, falling back to the default"""
+    try:
+        return float(os.environ.get("EEP_HISTORY_ARCHIVE_DAYS", DEFAULT_ARCHIVE_AFTER_DAYS))
+    except ValueError:
+        return DEFAULT_ARCHIVE_AFTER_DAYS
+
+
+def archive_db_file(db_file):
+    """Archive database kept next to a history database"""
+    root, extension = os.path.splitext(db_file)
+    return f"{root}_archive{extension}"
+
+
+def get_archive_store(store):
+    """Store for a history database's archive, or None if nothing was archived yet"""
+    archive_file = archive_db_file(store.db_file)
+    if not os.path.exists(archive_file):
+        return None
+    return get_store(archive_file)
+
+
+def open_history_pager(store, query, history_filter=None, page_size=None):
+    """HistoryPager over a history database, followed by its archive if the filter asks for it"""
+    kwargs = {"history_filter": history_filter}
+    if page_size is not None:
+        kwargs["page_size"] = page_size
+
+    pager = HistoryPager(store, query, **kwargs)
+    if not pager.history_filter.include_archived:
+        return pager
+
+    archive_store = get_archive_store(store)
+    if archive_store is None:
+        return pager
+    return ChainedHistoryPager([pager, HistoryPager(archive_store, query, **kwargs)])
+
+
+def get_database_size(db_file):
+    """Size in bytes of a database file and its write-ahead log"""
+    total = 0
+    for path in (db_file, db_file + "-wal"):
+        try:
+            total += os.path.getsize(path)
+        except OSError:
+            pass
+    return total
+
+
+class ArchiveTarget:
+    """A history table and the migrations shared by its live and archive databases"""
+
+    def __init__(self, db_file, table, timestamp_column, migrations):
+        self.db_file = db_file
+        self.table = table
+        self.timestamp_column = timestamp_column
+        self.migrations = migrations
+
+
+class HistoryMaintenance:
+    """
+    Moves old history rows into archive databases and compacts both, on a
+    low-priority background thread.
+    """
+
+    def __init__(self, upload_db_file, export_db_file, archive_after_days=None, ready_events=()):
+        self.targets = [
+            ArchiveTarget(upload_db_file, "uploads", "upload_timestamp", UPLOAD_MIGRATIONS),
+            ArchiveTarget(export_db_file, "exports", "export_timestamp", EXPORT_MIGRATIONS),
+        ]
+        self.archive_after_days = get_archive_after_days() if archive_after_days is None else archive_after_days
+        # Set once the history databases are migrated; a pass waits for them
+        self.ready_events = ready_events
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    def start(self):
+        """Run a maintenance pass on a low-priority background thread"""
+        if self.thread and self.thread.is_alive():
+            return False
+
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        """Ask a running maintenance pass to stop after the current step"""
+        self.stop_event.set()
+
+    def _run(self):
+        lower_current_thread_priority()
+        for event in self.ready_events:
+            event.wait()
+        for target in self.targets:
+            if self.stop_event.is_set():
+                break
+            try:
+                self.run_once(target)
+            except Exception as e:
+                print(f"Error during history maintenance of {target.db_file}: {str(e)}")
+
+    def run_once(self, target):
+        """Archive old rows of one history table, then compact both databases"""
+        if not os.path.exists(target.db_file):
+            return 0
+
+        store = get_store(target.db_file)
+        archive_file = archive_db_file(store.db_file)
+        cutoff = (datetime.now() - timedelta(days=self.archive_after_days)).strftime("%Y-%m-%d %H:%M:%S")
+
+        archived = 0
+        if self._has_rows_to_archive(store, target, cutoff):
+            # The archive uses the same schema, summaries and search index as the live database
+            get_store(archive_file).migrate(target.migrations)
+            archived = self.archive_rows(store, target, archive_file, cutoff)
+
+        self.compact(store, archived)
+        if os.path.exists(archive_file):
+            self.compact(get_store(archive_file), archived, log_store=store)
+        return archived
+
+    def _age_expression(self, target):
+        # Pending and failed rows never get a timestamp, so fall back to when they started
+        return f"COALESCE({target.timestamp_column}, started_at)"
+
+    def _has_rows_to_archive(self, store, target, cutoff):
+        row = store.fetchone(
+            f"SELECT 1 FROM {target.table} WHERE {self._age_expression(target)} < ? LIMIT 1", (cutoff,)
+        )
+        return row is not None
+
+    def archive_rows(self, store, target, archive_file, cutoff):
+        """Move rows older than the cutoff into the archive database, returning how many moved"""
+        table = target.table
+        age = self._age_expression(target)
+        moved = 0
+
+        with store.connection() as conn:
+            columns = ", ".join(row[1] for row in conn.execute(f"PRAGMA main.table_info({table})"))
+
+            # ATTACH cannot run inside a transaction
+            conn.execute("ATTACH DATABASE ? AS archive", (archive_file,))
+            try:
+                # Columns carried over from early databases are not in the archive's layout yet
+                archive_columns = [row[1] for row in conn.execute(f"PRAGMA archive.table_info({table})")]
+                for _, name, declared_type, _, _, _ in conn.execute(f"PRAGMA main.table_info({table})").fetchall():
+                    if name not in archive_columns:
+                        conn.execute(f'ALTER TABLE archive.{table} ADD COLUMN "{name}" {declared_type}')
+                while not self.stop_event.is_set():
+                    # Each batch is copied and deleted in one transaction, so a row
+                    # is always in exactly one of the two databases
+                    conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        last_id = conn.execute(f'''
+                        SELECT MAX(id) FROM (
+                            SELECT id FROM main.{table} WHERE {age} < ? ORDER BY id LIMIT ?
+                        )
+                        ''', (cutoff, ARCHIVE_BATCH_SIZE)).fetchone()[0]
+
+                        if last_id is None:
+                            conn.execute("COMMIT")
+                            break
+
+                        conn.execute(f'''
+                        INSERT INTO archive.{table} ({columns})
+                        SELECT {columns} FROM main.{table} WHERE id <= ? AND {age} < ?
+                        ''', (last_id, cutoff))
+                        cursor = conn.execute(
+                            f"DELETE FROM main.{table} WHERE id <= ? AND {age} < ?", (last_id, cutoff)
+                        )
+                        conn.execute("COMMIT")
+                    except BaseException:
+                        conn.execute("ROLLBACK")
+                        raise
+
+                    moved += cursor.rowcount
+            finally:
+                conn.execute("DETACH DATABASE archive")
+
+        print(f"Archived {moved} {table} rows older than {cutoff} to {archive_file}")
+        return moved
+
+    def compact(self, store, rows_archived, log_store=None):
+        """Refresh planner statistics and reclaim free space, logging size and timing"""
+        size_before = get_database_size(store.db_file)
+        started = time.perf_counter()
+        steps = []
+
+        def timed(name, sql):
+            step_start = time.perf_counter()
+            with store.connection() as conn:
+                conn.execute(sql).fetchall()
+            steps.append(f"{name} {time.perf_counter() - step_start:.2f}s")
+
+        timed("ANALYZE", "ANALYZE")
+        timed("optimize", "PRAGMA optimize")
+
+        # VACUUM rewrites the whole file, so only do it when there is space to win
+        with store.connection() as conn:
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if rows_archived or (page_count and free_pages / page_count >= VACUUM_FREE_RATIO):
+            if not self.stop_event.is_set():
+                timed("VACUUM", "VACUUM")
+
+        timed("checkpoint", "PRAGMA wal_checkpoint(TRUNCATE)")
+
+        seconds = time.perf_counter() - started
+        size_after = get_database_size(store.db_file)
+        print(
+            f"Maintenance of {store.db_file}: {size_before} -> {size_after} bytes "
+            f"in {seconds:.2f}s ({', '.join(steps)})"
+        )
+        self.record_maintenance(log_store or store, store.db_file, rows_archived,
+                                size_before, size_after, seconds, steps)
+
+    def record_maintenance(self, log_store, db_file, rows_archived, size_before, size_after, seconds, steps):
+        """Store a maintenance run in the live history database"""
+        try:
+            log_store.execute('''
+            INSERT INTO maintenance_history (
+                ran_at, database_file, rows_archived, size_before, size_after, seconds, steps
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                db_file,
+                rows_archived,
+                size_before,
+                size_after,
+                seconds,
+                ", ".join(steps)
+            ))
+        except Exception as e:
+            print(f"Error recording maintenance of {db_file}: {str(e)}")
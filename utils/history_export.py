@@ -0,0 +1,187 @@
+import argparse
+import csv
+import json
+import os
+import sys
+
+from utils.history_archive import open_history_pager
+from utils.history_query import HistoryFilter, UPLOAD_HISTORY_QUERY, EXPORT_HISTORY_QUERY, parse_filter_date
+from utils.history_schema import UPLOAD_MIGRATIONS, EXPORT_MIGRATIONS
+from utils.history_store import get_store
+
+# Rows held in memory at once while exporting
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+
+# Column name and spreadsheet heading for every exported column
+HISTORY_EXPORTS = {
+    "uploads": {
+        "query": UPLOAD_HISTORY_QUERY,
+        "db_file": os.path.join("Topic Upload History", "topic_uploads.db"),
+        "migrations": UPLOAD_MIGRATIONS,
+        "columns": [
+            ("upload_timestamp", "Uploaded Date & Time"),
+            ("topic_month", "Topic Month"),
+            ("xml_files", "No of XML Files"),
+            ("images", "No of Images"),
+            ("database_zip", "Database ZIP"),
+            ("images_zip", "Images ZIP"),
+            ("status", "Status"),
+        ],
+    },
+    "exports": {
+        "query": EXPORT_HISTORY_QUERY,
+        "db_file": os.path.join("Teton Export History", "teton_exports.db"),
+        "migrations": EXPORT_MIGRATIONS,
+        "columns": [
+            ("export_timestamp", "Export Date & Time"),
+            ("export_folder", "Export Folder Name"),
+            ("status", "Status"),
+        ],
+    },
+}
+
+
+def format_from_path(path):
+    """Pick the export format from a file extension, defaulting to CSV"""
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    if extension in ("jsonl", "ndjson"):
+        return "jsonl"
+    if extension == "parquet":
+        return "parquet"
+    return "csv"
+
+
+def _iter_batches(store, query, columns, history_filter, batch_size):
+    """Yield lists of row tuples containing only the exported columns"""
+    positions = [query.columns.index(name) for name, _ in columns]
+    pager = open_history_pager(store, query, history_filter, page_size=batch_size)
+    while True:
+        page = pager.next_page()
+        if not page:
+            return
+        yield [tuple(row[i] for i in positions) for row in page]
+
+
+def _write_csv(batches, columns, output_path):
+    count = 0
+    with open(output_path, 'w', newline='', encoding='utf-8-sig') as f:  # utf-8-sig for Excel
+        writer = csv.writer(f)
+        writer.writerow([heading for _, heading in columns])
+        for batch in batches:
+            writer.writerows(batch)
+            count += len(batch)
+    return count
+
+
+def _write_jsonl(batches, columns, output_path):
+    names = [name for name, _ in columns]
+    count = 0
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for batch in batches:
+            f.writelines(json.dumps(dict(zip(names, row))) + "\n" for row in batch)
+            count += len(batch)
+    return count
+
+
+def _write_parquet(batches, columns, output_path):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export requires the pyarrow package (pip install pyarrow)")
+
+    names = [name for name, _ in columns]
+    schema = pa.schema([
+        (name, pa.int64() if name in ("xml_files", "images") else pa.string()) for name in names
+    ])
+
+    count = 0
+    # Each batch becomes its own row group, so memory stays bounded by the batch size
+    with pq.ParquetWriter(output_path, schema, compression="zstd") as writer:
+        for batch in batches:
+            arrays = [pa.array([row[i] for row in batch], type=schema.field(i).type) for i in range(len(names))]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            count += len(batch)
+    return count
+
+
+WRITERS = {
+    "csv": _write_csv,
+    "jsonl": _write_jsonl,
+    "parquet": _write_parquet,
+}
+
+
+def export_history(store, history, output_path, export_format=None, history_filter=None,
+                   batch_size=EXPORT_BATCH_SIZE):
+    """
+    Stream a history table to a file in batches and return the number of rows written.
+    history is 'uploads' or 'exports'.
+    """
+    definition = HISTORY_EXPORTS[history]
+    export_format = export_format or format_from_path(output_path)
+    if export_format not in WRITERS:
+        raise ValueError(f"Unsupported export format: {export_format}")
+
+    batches = _iter_batches(store, definition["query"], definition["columns"], history_filter, batch_size)
+
+    # Write to a temporary file so a failed export never leaves a truncated file behind
+    temp_path = output_path + ".partial"
+    try:
+        count = WRITERS[export_format](batches, definition["columns"], temp_path)
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return count
+
+
+def main(argv=None):
+    """Command-line entry point: python -m utils.history_export"""
+    parser = argparse.ArgumentParser(description="Export topic upload or Teton export history")
+    parser.add_argument("history", choices=sorted(HISTORY_EXPORTS), help="which history to export")
+    parser.add_argument("output", help="output file")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, help="defaults to the output file extension")
+    parser.add_argument("--db", help="history database file (defaults to the tool's history folder)")
+    parser.add_argument("--search", help="full-text search")
+    parser.add_argument("--status", help="only rows with this status")
+    parser.add_argument("--from", dest="date_from", help="first date YYYY-MM-DD")
+    parser.add_argument("--to", dest="date_to", help="last date YYYY-MM-DD")
+    parser.add_argument("--include-archived", action="store_true", help="also export archived rows")
+    args = parser.parse_args(argv)
+
+    definition = HISTORY_EXPORTS[args.history]
+    db_file = args.db or definition["db_file"]
+    if not os.path.exists(db_file):
+        print(f"Database file does not exist: {db_file}", file=sys.stderr)
+        return 1
+
+    try:
+        history_filter = HistoryFilter(
+            search=args.search,
+            status=args.status,
+            date_from=parse_filter_date(args.date_from),
+            date_to=parse_filter_date(args.date_to),
+            include_archived=args.include_archived
+        )
+    except ValueError:
+        print("Dates must use the format YYYY-MM-DD", file=sys.stderr)
+        return 2
+
+    store = get_store(db_file)
+    store.migrate(definition["migrations"])
+
+    try:
+        count = export_history(store, args.history, args.output, args.format, history_filter)
+    except Exception as e:
+        print(f"Export failed: {str(e)}", file=sys.stderr)
+        return 1
+
+    print(f"Exported {count} rows to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+import re
+import threading
+from datetime import datetime, timedelta
+
+# Rows fetched per page by the history dialogs
+DEFAULT_PAGE_SIZE = 100
+
+
+class HistoryFilter:
+    """Optional search text, status and date range applied to a history query"""
+
+    def __init__(self, search=None, status=None, date_from=None, date_to=None, include_archived=False):
+        self.search = (search or "").strip() or None
+        self.status = status or None
+        self.date_from = date_from  # datetime.date, inclusive
+        self.date_to = date_to  # datetime.date, inclusive
+        self.include_archived = include_archived  # Also read the archive database
+
+    @property
+    def has_date_range(self):
+        return self.date_from is not None or self.date_to is not None
+
+    def date_bounds(self):
+        """Timestamp bounds as strings comparable with the stored timestamps"""
+        start = self.date_from.strftime("%Y-%m-%d") if self.date_from else "0000-00-00"
+        end = (self.date_to + timedelta(days=1)).strftime("%Y-%m-%d") if self.date_to else "9999-99-99"
+        return start, end
+
+
+def parse_filter_date(text):
+    """Parse a YYYY-MM-DD filter date, returning None for empty text"""
+    text = (text or "").strip()
+    if not text:
+        return None
+    return datetime.strptime(text, "%Y-%m-%d").date()
+
+
+def build_fts_query(text):
+    """
+    Turn free text into an FTS5 query.
+    Each whitespace separated term becomes a phrase of its word tokens, so
+    "database-12-March-2024.zip" matches that exact file name; the last token of
+    every phrase is a prefix match so partial names work too.
+    """
+    phrases = []
+    for term in text.split():
+        tokens = re.findall(r"\w+", term)
+        if tokens:
+            phrases.append('"' + " ".join(tokens) + '" *')
+    return " ".join(phrases)
+
+
+class HistoryStatements:
+    """The four keyset statements used to page through one filter combination"""
+
+    def __init__(self, query, conditions, include_pending):
+        select = f"SELECT {', '.join(query.columns)} FROM {query.table}"
+        ts = query.timestamp_column
+        extra = "".join(f"\n        AND {condition}" for condition in conditions)
+
+        # Keyset pagination: each page continues after the last (timestamp, id) seen,
+        # so every page costs the same regardless of how deep the user has scrolled
+        self.first_timestamped_sql = f'''
+        {select}
+        WHERE {ts} IS NOT NULL{extra}
+        ORDER BY {ts} DESC, id DESC
+        LIMIT ?
+        '''
+        self.next_timestamped_sql = f'''
+        {select}
+        WHERE {ts} IS NOT NULL AND ({ts}, id) < (?, ?){extra}
+        ORDER BY {ts} DESC, id DESC
+        LIMIT ?
+        '''
+
+        # Pending rows have no timestamp, so a date range excludes them
+        self.include_pending = include_pending
+        self.first_pending_sql = f'''
+        {select}
+        WHERE {ts} IS NULL{extra}
+        ORDER BY id DESC
+        LIMIT ?
+        '''
+        self.next_pending_sql = f'''
+        {select}
+        WHERE {ts} IS NULL AND id < ?{extra}
+        ORDER BY id DESC
+        LIMIT ?
+        '''
+
+    @property
+    def all(self):
+        statements = [self.first_timestamped_sql, self.next_timestamped_sql]
+        if self.include_pending:
+            statements += [self.first_pending_sql, self.next_pending_sql]
+        return statements
+
+
+class HistoryQuery:
+    """
+    Describes a history table ordered newest first, with rows that have no
+    timestamp yet (pending) listed after all timestamped rows.
+    """
+
+    def __init__(self, table, timestamp_column, columns, search_columns, fts_table):
+        self.table = table
+        self.timestamp_column = timestamp_column
+        self.columns = columns
+        self.search_columns = search_columns
+        self.fts_table = fts_table
+        self.any_row_sql = f"SELECT 1 FROM {table} LIMIT 1"
+
+        # Position of the id and timestamp columns in each returned row
+        self.id_index = columns.index("id")
+        self.timestamp_index = columns.index(timestamp_column)
+
+        # Statement text is built once per filter combination and reused, so the
+        # connection statement cache keeps hitting
+        self._statements = {}
+        self._lock = threading.Lock()
+
+    def statements(self, status=False, date_range=False, search=None):
+        """
+        Statements for a filter combination. search is None, 'fts' (full-text
+        index) or 'like' (fallback when SQLite was built without FTS5).
+        """
+        key = (status, date_range, search)
+        with self._lock:
+            statements = self._statements.get(key)
+            if statements is None:
+                statements = HistoryStatements(self, self._conditions(*key), include_pending=not date_range)
+                self._statements[key] = statements
+            return statements
+
+    def _conditions(self, status, date_range, search):
+        ts = self.timestamp_column
+        conditions = []
+        if status:
+            conditions.append("status = ?")
+        if date_range:
+            conditions.append(f"{ts} >= ? AND {ts} < ?")
+        if search == "fts":
+            conditions.append(f"id IN (SELECT rowid FROM {self.fts_table} WHERE {self.fts_table} MATCH ?)")
+        elif search == "like":
+            likes = " OR ".join(f"{column} LIKE ? ESCAPE '\\'" for column in self.search_columns)
+            conditions.append(f"({likes})")
+        return conditions
+
+    @property
+    def plan_checked_statements(self):
+        """Statements checked by check_query_plans (full-text lookups excluded)"""
+        statements = []
+        for status in (False, True):
+            for date_range in (False, True):
+                statements += self.statements(status, date_range).all
+        return statements
+
+
+UPLOAD_HISTORY_QUERY = HistoryQuery(
+    "uploads",
+    "upload_timestamp",
+    ["id", "upload_timestamp", "topic_month", "xml_files", "images",
+     "database_zip", "images_zip", "status"],
+    search_columns=["topic_month", "database_zip", "images_zip", "status"],
+    fts_table="uploads_fts"
+)
+
+EXPORT_HISTORY_QUERY = HistoryQuery(
+    "exports",
+    "export_timestamp",
+    ["id", "export_timestamp", "export_folder", "status"],
+    search_columns=["export_folder", "status"],
+    fts_table="exports_fts"
+)
+
+
+class HistoryPager:
+    """Walks a HistoryQuery one page at a time using keyset pagination"""
+
+    def __init__(self, store, query, page_size=DEFAULT_PAGE_SIZE, history_filter=None):
+        self.store = store
+        self.query = query
+        self.page_size = page_size
+        self.history_filter = history_filter or HistoryFilter()
+        self.exhausted = False
+        self._in_pending = False  # True once all timestamped rows have been returned
+        self._last_row = None
+        self._lock = threading.Lock()
+        self._statements = None
+        self._filter_params = None
+
+    def has_rows(self):
+        """Cheap check whether the table has any rows at all"""
+        return self.store.fetchone(self.query.any_row_sql) is not None
+
+    def _prepare(self):
+        """Pick the statements and parameters for the filter on first use"""
+        history_filter = self.history_filter
+        params = []
+
+        if history_filter.status:
+            params.append(history_filter.status)
+
+        if history_filter.has_date_range:
+            params.extend(history_filter.date_bounds())
+
+        search = None
+        if history_filter.search:
+            if self.store.table_exists(self.query.fts_table):
+                fts_query = build_fts_query(history_filter.search)
+                if fts_query:
+                    search = "fts"
+                    params.append(fts_query)
+            else:
+                search = "like"
+                escaped = re.sub(r"([\\%_])", r"\\\1", history_filter.search)
+                params.extend([f"%{escaped}%"] * len(self.query.search_columns))
+
+        self._statements = self.query.statements(
+            bool(history_filter.status), history_filter.has_date_range, search
+        )
+        self._filter_params = tuple(params)
+
+    def next_page(self):
+        """Return the next page of rows, or an empty list once exhausted"""
+        with self._lock:
+            if self._statements is None:
+                self._prepare()
+
+            rows = []
+            while not self.exhausted and len(rows) < self.page_size:
+                wanted = self.page_size - len(rows)
+                batch = self._fetch(wanted)
+                rows.extend(batch)
+
+                if len(batch) < wanted:
+                    # This phase ran out of rows
+                    if self._in_pending or not self._statements.include_pending:
+                        self.exhausted = True
+                    else:
+                        self._in_pending = True
+                        self._last_row = None
+
+            return rows
+
+    def _fetch(self, limit):
+        q = self.query
+        statements = self._statements
+        filter_params = self._filter_params
+        last = self._last_row
+
+        if not self._in_pending:
+            if last is None:
+                batch = self.store.fetchall(statements.first_timestamped_sql, filter_params + (limit,))
+            else:
+                keyset = (last[q.timestamp_index], last[q.id_index])
+                batch = self.store.fetchall(statements.next_timestamped_sql, keyset + filter_params + (limit,))
+        else:
+            if last is None:
+                batch = self.store.fetchall(statements.first_pending_sql, filter_params + (limit,))
+            else:
+                keyset = (last[q.id_index],)
+                batch = self.store.fetchall(statements.next_pending_sql, keyset + filter_params + (limit,))
+
+        if batch:
+            self._last_row = batch[-1]
+        return batch
+
+    def iter_rows(self):
+        """Yield every remaining row, one page in memory at a time"""
+        while True:
+            page = self.next_page()
+            if not page:
+                return
+            yield from page
+
+
+class ChainedHistoryPager:
+    """
+    Pages through several HistoryPagers one after the other, e.g. the live
+    history followed by its archive, whose rows are all older.
+    """
+
+    def __init__(self, pagers):
+        self.pagers = pagers
+        self.history_filter = pagers[0].history_filter
+        self._lock = threading.Lock()
+
+    @property
+    def exhausted(self):
+        return all(pager.exhausted for pager in self.pagers)
+
+    def has_rows(self):
+        return any(pager.has_rows() for pager in self.pagers)
+
+    def next_page(self):
+        """Return the next page of the first pager that still has rows"""
+        with self._lock:
+            for pager in self.pagers:
+                if pager.exhausted:
+                    continue
+                rows = pager.next_page()
+                if rows:
+                    return rows
+            return []
+
+    def iter_rows(self):
+        """Yield every remaining row, one page in memory at a time"""
+        while True:
+            page = self.next_page()
+            if not page:
+                return
+            yield from page
+
+
+def explain_query_plan(store, sql):
+    """Return the EXPLAIN QUERY PLAN detail lines for a statement"""
+    params = (None,) * sql.count("?")
+    return [row[3] for row in store.fetchall(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def check_query_plans(store, query):
+    """
+    Return (sql, plan) pairs for history statements that would scan the whole
+    table or sort it in a temporary B-tree instead of reading an index in order.
+    """
+    full_scan = re.compile(rf"^SCAN (TABLE )?{query.table}\b")
+    problems = []
+
+    for sql in query.plan_checked_statements:
+        plan = explain_query_plan(store, sql)
+        sorts = any("USE TEMP B-TREE" in detail for detail in plan)
+        scans = any(full_scan.match(detail) and "INDEX" not in detail for detail in plan)
+        if sorts or scans:
+            problems.append((sql, plan))
+
+    return problems
+
+
+def warn_on_slow_query_plans(store, query):
+    """Print a warning for every history statement that is not index-driven"""
+    try:
+        for sql, plan in check_query_plans(store, query):
+            print(f"Warning: history query on {query.table} is not index-driven: {plan}\n{sql}")
+    except Exception as e:
+        print(f"Error checking query plans for {query.table}: {str(e)}")
@@ -0,0 +1,515 @@
+# Schema migrations for the upload and export history databases.
+#
+# Each list is applied in order by HistoryStore.migrate; the position in the
+# list (starting at 1) is the schema version stored in PRAGMA user_version.
+# Only ever append new migrations, never edit released ones.
+
+import sqlite3
+
+
+def _table_columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+
+
+def _table_exists(conn, table):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone()
+    return row is not None
+
+
+def _add_extra_columns(conn, source, target):
+    """
+    Add the columns of source that target does not have to target, so a
+    rebuilt table keeps data the current layout does not know about (e.g.
+    filter_timestamp, environment and notes in early upload databases).
+    Returns the names of the added columns.
+    """
+    target_columns = _table_columns(conn, target)
+    extra = []
+    for _, name, declared_type, _, _, _ in conn.execute(f"PRAGMA table_info({source})").fetchall():
+        if name not in target_columns:
+            # Constraints are left off: rows already in the table may not meet them
+            conn.execute(f'ALTER TABLE {target} ADD COLUMN "{name}" {declared_type}')
+            extra.append(name)
+    return extra
+
+
+def _create_cleanup_history(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS cleanup_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        cleaned_at TEXT NOT NULL,
+        folder_path TEXT NOT NULL,
+        folder_kind TEXT NOT NULL,
+        bytes_reclaimed INTEGER NOT NULL,
+        reason TEXT
+    )
+    ''')
+
+
+UPLOADS_TABLE_SQL = '''
+CREATE TABLE {name} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    upload_timestamp TEXT,
+    topic_month TEXT NOT NULL,
+    xml_files INTEGER NOT NULL,
+    images INTEGER NOT NULL,
+    database_zip TEXT NOT NULL,
+    images_zip TEXT NOT NULL,
+    status TEXT DEFAULT 'pending',
+    working_folder TEXT,
+    started_at TEXT
+)
+'''
+
+
+def upload_baseline(conn):
+    """
+    Version 1: bring any earlier uploads table to the current layout.
+    Early databases declared upload_timestamp NOT NULL and tracked the filter
+    job in filter_completed; those tables are rebuilt, converting filter_completed
+    into status. Columns the current layout does not know are carried over.
+    """
+    if not _table_exists(conn, "uploads"):
+        conn.execute(UPLOADS_TABLE_SQL.format(name="uploads"))
+    else:
+        columns = _table_columns(conn, "uploads")
+
+        if 'filter_completed' in columns:
+            status_expr = "CASE WHEN filter_completed = 1 THEN 'completed' ELSE 'pending' END"
+        else:
+            status_expr = "'pending'"
+
+        if 'status' in columns:
+            status_expr = f"COALESCE(status, {status_expr})"
+
+        working_folder_expr = "working_folder" if 'working_folder' in columns else "NULL"
+        started_at_expr = "started_at" if 'started_at' in columns else "upload_timestamp"
+
+        conn.execute(UPLOADS_TABLE_SQL.format(name="uploads_migrated"))
+        extra = "".join(f', "{name}"' for name in _add_extra_columns(conn, "uploads", "uploads_migrated"))
+        conn.execute(f'''
+        INSERT INTO uploads_migrated (
+            id, upload_timestamp, topic_month, xml_files, images,
+            database_zip, images_zip, status, working_folder, started_at{extra}
+        )
+        SELECT id, upload_timestamp, topic_month, xml_files, images,
+               database_zip, images_zip, {status_expr}, {working_folder_expr}, {started_at_expr}{extra}
+        FROM uploads
+        ''')
+        conn.execute("DROP TABLE uploads")
+        conn.execute("ALTER TABLE uploads_migrated RENAME TO uploads")
+
+    conn.execute('''
+    CREATE INDEX IF NOT EXISTS idx_topic_month
+    ON uploads(topic_month)
+    ''')
+
+    _create_cleanup_history(conn)
+
+
+EXPORTS_TABLE_SQL = '''
+CREATE TABLE {name} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    export_timestamp TEXT,
+    export_folder TEXT NOT NULL,
+    status TEXT DEFAULT 'pending',
+    export_path TEXT,
+    started_at TEXT
+)
+'''
+
+
+def export_baseline(conn):
+    """
+    Version 1: bring any earlier exports table to the current layout.
+    Early databases declared export_timestamp NOT NULL and had no status column;
+    rows without a status are assumed to have completed successfully. Columns
+    the current layout does not know are carried over.
+    """
+    if not _table_exists(conn, "exports"):
+        conn.execute(EXPORTS_TABLE_SQL.format(name="exports"))
+    else:
+        columns = _table_columns(conn, "exports")
+
+        status_expr = "COALESCE(status, 'completed')" if 'status' in columns else "'completed'"
+        export_path_expr = "export_path" if 'export_path' in columns else "NULL"
+        started_at_expr = "started_at" if 'started_at' in columns else "export_timestamp"
+
+        conn.execute(EXPORTS_TABLE_SQL.format(name="exports_migrated"))
+        extra = "".join(f', "{name}"' for name in _add_extra_columns(conn, "exports", "exports_migrated"))
+        conn.execute(f'''
+        INSERT INTO exports_migrated (
+            id, export_timestamp, export_folder, status, export_path, started_at{extra}
+        )
+        SELECT id, export_timestamp, export_folder, {status_expr}, {export_path_expr}, {started_at_expr}{extra}
+        FROM exports
+        ''')
+        conn.execute("DROP TABLE exports")
+        conn.execute("ALTER TABLE exports_migrated RENAME TO exports")
+
+    conn.execute('''
+    CREATE INDEX IF NOT EXISTS idx_export_timestamp
+    ON exports(export_timestamp)
+    ''')
+
+    _create_cleanup_history(conn)
+
+
+def upload_timestamp_index(conn):
+    """Version 2: index the timestamp so history pages are read in index order"""
+    conn.execute('''
+    CREATE INDEX IF NOT EXISTS idx_upload_timestamp
+    ON uploads(upload_timestamp)
+    ''')
+
+
+def upload_covering_indexes(conn):
+    """
+    Version 3: indexes matching how uploads are read.
+    The history index covers every column the history dialog shows, so pages are
+    served from the index alone; status and topic month lookups come back in
+    timestamp order without a sort.
+    """
+    conn.execute("DROP INDEX IF EXISTS idx_upload_timestamp")
+    conn.execute("DROP INDEX IF EXISTS idx_topic_month")
+
+    conn.execute('''
+    CREATE INDEX IF NOT EXISTS idx_uploads_history
+    ON uploads(upload_timestamp, id, topic_month, xml_files, images, database_zip, images_zip, status)
+    ''')
+    conn.execute('''
+    CREATE INDEX IF NOT EXISTS idx_uploads_status
+    ON uploads(status, upload_timestamp)
+    ''')
+    conn.execute('''
+    CREATE INDEX IF NOT EXISTS idx_uploads_topic_month
+    ON uploads(topic_month, upload_timestamp)
+    ''')
+
+
+def export_covering_indexes(conn):
+    """Version 2: covering history index and a status index in timestamp order"""
+    conn.execute("DROP INDEX IF EXISTS idx_export_timestamp")
+
+    conn.execute('''
+    CREATE INDEX IF NOT EXISTS idx_exports_history
+    ON exports(export_timestamp, id, export_folder, status)
+    ''')
+    conn.execute('''
+    CREATE INDEX IF NOT EXISTS idx_exports_status
+    ON exports(status, export_timestamp)
+    ''')
+
+
+def _create_fts_index(conn, table, fts_table, columns):
+    """
+    Create an external-content FTS5 index over some columns of a table, kept in
+    sync by triggers. SQLite builds without FTS5 are left without the index and
+    history search falls back to LIKE.
+    """
+    column_list = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+
+    try:
+        conn.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table}
+        USING fts5({column_list}, content='{table}', content_rowid='id')
+        ''')
+    except sqlite3.OperationalError as e:
+        print(f"Full-text search is not available for {table}: {str(e)}")
+        return
+
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+        INSERT INTO {fts_table}(rowid, {column_list}) VALUES (new.id, {new_values});
+    END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+        INSERT INTO {fts_table}({fts_table}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+    END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE ON {table} BEGIN
+        INSERT INTO {fts_table}({fts_table}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+        INSERT INTO {fts_table}(rowid, {column_list}) VALUES (new.id, {new_values});
+    END
+    ''')
+
+    # Index the rows that already exist
+    conn.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+
+
+def upload_full_text_search(conn):
+    """Version 4: full-text index over the upload file names, topic month and status"""
+    _create_fts_index(conn, "uploads", "uploads_fts", ["topic_month", "database_zip", "images_zip", "status"])
+
+
+def export_full_text_search(conn):
+    """Version 3: full-text index over the export folder name and status"""
+    _create_fts_index(conn, "exports", "exports_fts", ["export_folder", "status"])
+
+
+def _create_monthly_stats(conn, table, stats_table, timestamp_column, count_column, sum_columns):
+    """
+    Create a per-month, per-status summary of a history table and keep it up to
+    date with triggers, so every insert or status update adjusts its buckets in
+    the same transaction. Rows are grouped by the month the run started in.
+    """
+    month_expr = "COALESCE(substr({row}.started_at, 1, 7), substr({row}.%s, 1, 7), 'unknown')" % timestamp_column
+    status_expr = "COALESCE({row}.status, 'pending')"
+    duration_expr = (
+        "CASE WHEN {row}.finished_at IS NOT NULL AND {row}.started_at IS NOT NULL "
+        "THEN (julianday({row}.finished_at) - julianday({row}.started_at)) * 86400 END"
+    )
+
+    sum_definitions = "".join(f"\n        {column} INTEGER NOT NULL DEFAULT 0," for column in sum_columns)
+    conn.execute(f'''
+    CREATE TABLE IF NOT EXISTS {stats_table} (
+        month TEXT NOT NULL,
+        status TEXT NOT NULL,
+        {count_column} INTEGER NOT NULL DEFAULT 0,{sum_definitions}
+        timed_runs INTEGER NOT NULL DEFAULT 0,
+        duration_seconds REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (month, status)
+    ) WITHOUT ROWID
+    ''')
+
+    stat_columns = [count_column] + list(sum_columns) + ["timed_runs", "duration_seconds"]
+
+    def row_values(row):
+        duration = duration_expr.format(row=row)
+        return [1] + [f"{row}.{column}" for column in sum_columns] + [
+            f"({duration}) IS NOT NULL", f"COALESCE({duration}, 0)"
+        ]
+
+    def add_row(row):
+        values = ", ".join(str(value) for value in row_values(row))
+        updates = ", ".join(f"{column} = {column} + excluded.{column}" for column in stat_columns)
+        return f'''
+        INSERT INTO {stats_table} (month, status, {", ".join(stat_columns)})
+        VALUES ({month_expr.format(row=row)}, {status_expr.format(row=row)}, {values})
+        ON CONFLICT (month, status) DO UPDATE SET {updates};'''
+
+    def remove_row(row):
+        month = month_expr.format(row=row)
+        status = status_expr.format(row=row)
+        updates = ", ".join(
+            f"{column} = {column} - ({value})" for column, value in zip(stat_columns, row_values(row))
+        )
+        return f'''
+        UPDATE {stats_table} SET {updates}
+        WHERE month = {month} AND status = {status};
+        DELETE FROM {stats_table}
+        WHERE month = {month} AND status = {status} AND {count_column} <= 0;'''
+
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS {stats_table}_insert AFTER INSERT ON {table} BEGIN{add_row("new")}
+    END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS {stats_table}_delete AFTER DELETE ON {table} BEGIN{remove_row("old")}
+    END
+    ''')
+    # Move the row from its old bucket to its new one
+    watched = ", ".join(["status", "started_at", "finished_at", timestamp_column] + list(sum_columns))
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS {stats_table}_update AFTER UPDATE OF {watched} ON {table} BEGIN{remove_row("old")}{add_row("new")}
+    END
+    ''')
+
+    # Summarise the rows that already exist
+    sums = "".join(f", SUM({column})" for column in sum_columns)
+    duration = duration_expr.format(row=table)
+    conn.execute(f"DELETE FROM {stats_table}")
+    conn.execute(f'''
+    INSERT INTO {stats_table} (month, status, {", ".join(stat_columns)})
+    SELECT {month_expr.format(row=table)}, {status_expr.format(row=table)},
+           COUNT(*){sums}, COUNT({duration}), TOTAL({duration})
+    FROM {table}
+    GROUP BY 1, 2
+    ''')
+
+
+def upload_monthly_stats(conn):
+    """
+    Version 5: record when each upload finished and keep per-month totals of
+    uploads, XML files, images and durations for the statistics view.
+    """
+    if 'finished_at' not in _table_columns(conn, "uploads"):
+        conn.execute("ALTER TABLE uploads ADD COLUMN finished_at TEXT")
+        # Completed uploads are timestamped when they finish; rows copied from
+        # databases without started_at reuse that timestamp and stay untimed
+        conn.execute('''
+        UPDATE uploads SET finished_at = upload_timestamp
+        WHERE status = 'completed' AND upload_timestamp IS NOT NULL AND started_at <> upload_timestamp
+        ''')
+    _create_monthly_stats(conn, "uploads", "upload_monthly_stats", "upload_timestamp",
+                          "uploads", ["xml_files", "images"])
+
+
+def export_monthly_stats(conn):
+    """Version 4: record when each export finished and keep per-month export totals"""
+    if 'finished_at' not in _table_columns(conn, "exports"):
+        conn.execute("ALTER TABLE exports ADD COLUMN finished_at TEXT")
+        conn.execute('''
+        UPDATE exports SET finished_at = export_timestamp
+        WHERE status = 'completed' AND export_timestamp IS NOT NULL AND started_at <> export_timestamp
+        ''')
+    _create_monthly_stats(conn, "exports", "export_monthly_stats", "export_timestamp",
+                          "exports", [])
+
+
+def _create_maintenance_history(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS maintenance_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ran_at TEXT NOT NULL,
+        database_file TEXT NOT NULL,
+        rows_archived INTEGER NOT NULL,
+        size_before INTEGER NOT NULL,
+        size_after INTEGER NOT NULL,
+        seconds REAL NOT NULL,
+        steps TEXT
+    )
+    ''')
+
+
+def upload_maintenance_history(conn):
+    """Version 6: log of archival and compaction runs"""
+    _create_maintenance_history(conn)
+
+
+def export_maintenance_history(conn):
+    """Version 5: log of archival and compaction runs"""
+    _create_maintenance_history(conn)
+
+
+def upload_memory_profiles(conn):
+    """Version 7: per-stage memory use of uploads run with memory profiling on"""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS upload_memory_profiles (
+        upload_id INTEGER NOT NULL,
+        stage TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        peak_bytes INTEGER NOT NULL,
+        net_bytes INTEGER NOT NULL,
+        seconds REAL NOT NULL,
+        top_sites TEXT,
+        recorded_at TEXT NOT NULL,
+        PRIMARY KEY (upload_id, stage)
+    ) WITHOUT ROWID
+    ''')
+
+
+def upload_work_queue(conn):
+    """Version 8: durable queue of upload jobs for the worker processes, and the locks they share"""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS upload_queue (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        source_folder TEXT,
+        working_folder TEXT,
+        stages TEXT NOT NULL,
+        environment TEXT,
+        upload_id INTEGER,
+        profile_cpu INTEGER NOT NULL DEFAULT 0,
+        state TEXT NOT NULL DEFAULT 'queued',
+        worker TEXT,
+        stage TEXT,
+        message TEXT,
+        detail TEXT,
+        done INTEGER NOT NULL DEFAULT 0,
+        total INTEGER NOT NULL DEFAULT 0,
+        unit TEXT,
+        error_stage TEXT,
+        enqueued_at TEXT NOT NULL,
+        started_at TEXT,
+        finished_at TEXT,
+        heartbeat_at REAL
+    )
+    ''')
+    # Workers look for the oldest queued job; stale checks scan the running ones
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_upload_queue_state ON upload_queue(state, id)"
+    )
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS resource_locks (
+        resource TEXT PRIMARY KEY,
+        job_id INTEGER NOT NULL,
+        acquired_at TEXT NOT NULL
+    ) WITHOUT ROWID
+    ''')
+
+
+def upload_source_catalogue(conn):
+    """Version 9: catalogue of the source archives seen in upload folders, and the month a queued job uploads"""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS source_archives (
+        path TEXT PRIMARY KEY,
+        folder TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        topic_month TEXT NOT NULL COLLATE NOCASE,
+        topic_date TEXT,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        members INTEGER,
+        content_hash TEXT,
+        scanned_at TEXT NOT NULL
+    ) WITHOUT ROWID
+    ''')
+    # Pairs are matched within a folder; the month list is shown newest first
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_source_archives_folder ON source_archives(folder, topic_month, kind)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_source_archives_date ON source_archives(topic_date)"
+    )
+    if "topic_month" not in _table_columns(conn, "upload_queue"):
+        conn.execute("ALTER TABLE upload_queue ADD COLUMN topic_month TEXT")
+
+
+def upload_source_verification(conn):
+    """Version 10: result of the source preflight's integrity check of each catalogued archive"""
+    columns = _table_columns(conn, "source_archives")
+    if "verified_at" not in columns:
+        conn.execute("ALTER TABLE source_archives ADD COLUMN verified_at TEXT")
+    if "bad_member" not in columns:
+        conn.execute("ALTER TABLE source_archives ADD COLUMN bad_member TEXT")
+
+
+def upload_worker_metrics(conn):
+    """Version 11: metric samples recorded by worker processes, until the exporting process collects them"""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS worker_metrics (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        job_id INTEGER,
+        samples TEXT NOT NULL,
+        recorded_at TEXT NOT NULL
+    )
+    ''')
+
+
+UPLOAD_MIGRATIONS = [
+    upload_baseline,
+    upload_timestamp_index,
+    upload_covering_indexes,
+    upload_full_text_search,
+    upload_monthly_stats,
+    upload_maintenance_history,
+    upload_memory_profiles,
+    upload_work_queue,
+    upload_source_catalogue,
+    upload_source_verification,
+    upload_worker_metrics,
+]
+
+EXPORT_MIGRATIONS = [
+    export_baseline,
+    export_covering_indexes,
+    export_full_text_search,
+    export_monthly_stats,
+    export_maintenance_history,
+]
@@ -0,0 +1,97 @@
+from datetime import datetime
+
+
+class MonthlySummary:
+    """Totals for one month of uploads or exports, built from the summary table"""
+
+    def __init__(self, month):
+        self.month = month  # YYYY-MM, or 'unknown' for rows without any date
+        self.runs = 0
+        self.completed = 0
+        self.failed = 0  # Failed or interrupted
+        self.pending = 0
+        self.totals = {}  # Summed columns (XML files, images) of completed runs
+        self.completed_timed = 0
+        self.completed_seconds = 0.0
+
+    @property
+    def label(self):
+        try:
+            return datetime.strptime(self.month, "%Y-%m").strftime("%B %Y")
+        except ValueError:
+            return "Unknown"
+
+    @property
+    def success_rate(self):
+        """Share of finished runs that completed, or None if none finished"""
+        finished = self.completed + self.failed
+        return self.completed / finished if finished else None
+
+    @property
+    def average_duration(self):
+        """Average seconds taken by completed runs, or None if none were timed"""
+        return self.completed_seconds / self.completed_timed if self.completed_timed else None
+
+
+class MonthlyStatsQuery:
+    """Reads a per-month summary table kept up to date by the schema triggers"""
+
+    def __init__(self, stats_table, count_column, sum_columns):
+        self.stats_table = stats_table
+        self.sum_columns = sum_columns
+        columns = ["month", "status", count_column] + sum_columns + ["timed_runs", "duration_seconds"]
+        # Reads one row per month and status straight from the primary key
+        self.sql = f"SELECT {', '.join(columns)} FROM {stats_table} ORDER BY month DESC"
+
+
+UPLOAD_STATS_QUERY = MonthlyStatsQuery("upload_monthly_stats", "uploads", ["xml_files", "images"])
+
+EXPORT_STATS_QUERY = MonthlyStatsQuery("export_monthly_stats", "exports", [])
+
+
+def load_monthly_summaries(stores, stats_query):
+    """
+    Return a MonthlySummary per month, newest month first, combining the
+    summary tables of several stores (e.g. a history database and its archive).
+    """
+    rows = []
+    for store in stores:
+        rows.extend(store.fetchall(stats_query.sql))
+
+    summaries = {}
+    for row in rows:
+        month, status, runs = row[0], row[1], row[2]
+        sums = row[3:3 + len(stats_query.sum_columns)]
+        timed_runs, duration_seconds = row[-2], row[-1]
+
+        summary = summaries.get(month)
+        if summary is None:
+            summary = MonthlySummary(month)
+            summary.totals = {column: 0 for column in stats_query.sum_columns}
+            summaries[month] = summary
+
+        summary.runs += runs
+        if status == "completed":
+            summary.completed += runs
+            summary.completed_timed += timed_runs
+            summary.completed_seconds += duration_seconds
+            for column, value in zip(stats_query.sum_columns, sums):
+                summary.totals[column] += value
+        elif status in ("failed", "interrupted"):
+            summary.failed += runs
+        else:
+            summary.pending += runs
+
+    return sorted(summaries.values(), key=lambda summary: summary.month, reverse=True)
+
+
+def format_duration(seconds):
+    """Format a duration in seconds as e.g. '1h 05m' or '3m 20s'"""
+    if seconds is None:
+        return "-"
+    seconds = int(round(seconds))
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m"
+    return f"{minutes}m {seconds:02d}s"
@@ -0,0 +1,196 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from utils.metrics import HISTORY_DB_LATENCY
+from utils.tracing import tracer
+
+# Connections kept open per database file
+DEFAULT_POOL_SIZE = 4
+
+# Compiled statements cached per connection; all history SQL is constant text,
+# so every pooled connection reuses its prepared statements
+STATEMENT_CACHE_SIZE = 128
+
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",  # Readers never block the writer and vice versa
+    "PRAGMA synchronous=NORMAL",  # Safe with WAL, avoids an fsync per commit
+    "PRAGMA cache_size=-8192",  # 8 MB page cache per connection
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=30000",
+)
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def statement_label(sql):
+    """Short form of a statement for traces: its first 80 characters on one line"""
+    return " ".join(sql.split())[:80]
+
+
+class HistoryStore:
+    """Thread-safe pool of SQLite connections to one history database"""
+
+    def __init__(self, db_file, pool_size=DEFAULT_POOL_SIZE):
+        self.db_file = os.path.abspath(db_file)
+        self.db_name = os.path.basename(self.db_file)
+        self.pool_size = pool_size
+        self._pool = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_file,
+            timeout=30,
+            isolation_level=None,  # Transactions are managed explicitly
+            check_same_thread=False,  # Connections move between threads via the pool
+            cached_statements=STATEMENT_CACHE_SIZE
+        )
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.pool_size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        # Pool exhausted, wait for another thread to hand a connection back
+        return self._pool.get()
+
+    def _release(self, conn):
+        self._pool.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection from the pool (autocommit mode)"""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Borrow a connection and run the block in a write transaction"""
+        with self.connection() as conn:
+            # Take the write lock up front so concurrent writers queue instead of deadlocking
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def migrate(self, migrations):
+        """
+        Bring the database up to len(migrations) in a single transaction.
+        PRAGMA user_version records how many migrations have been applied.
+        """
+        with self.transaction() as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            target = len(migrations)
+
+            if version > target:
+                print(f"{self.db_file} has schema version {version}, newer than this tool ({target})")
+                return version
+
+            for migration in migrations[version:]:
+                migration(conn)
+
+            if version != target:
+                # PRAGMA does not accept bound parameters
+                conn.execute(f"PRAGMA user_version = {int(target)}")
+                print(f"Migrated {self.db_file} from schema version {version} to {target}")
+
+            return target
+
+    @contextmanager
+    def measured(self, operation, sql):
+        """Trace a call and record its latency; yields the span attributes"""
+        started = time.perf_counter()
+        try:
+            with tracer.span(f"db.{operation}", "db", sql=statement_label(sql), db=self.db_name) as span:
+                yield span
+        finally:
+            HISTORY_DB_LATENCY.observe(time.perf_counter() - started, database=self.db_name, operation=operation)
+
+    def execute(self, sql, params=()):
+        """Run a single write statement and return the cursor"""
+        with self.measured("execute", sql) as span:
+            with self.transaction() as conn:
+                cursor = conn.execute(sql, params)
+            span["rows"] = cursor.rowcount
+            return cursor
+
+    def fetchall(self, sql, params=()):
+        with self.measured("fetchall", sql) as span:
+            with self.connection() as conn:
+                rows = conn.execute(sql, params).fetchall()
+            span["rows"] = len(rows)
+            return rows
+
+    def fetchone(self, sql, params=()):
+        with self.measured("fetchone", sql):
+            with self.connection() as conn:
+                return conn.execute(sql, params).fetchone()
+
+    def table_exists(self, name):
+        """Whether a table (including virtual tables) exists in the database"""
+        row = self.fetchone(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+        )
+        return row is not None
+
+    def close(self):
+        """Close every idle pooled connection"""
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+def get_store(db_file):
+    """Return the shared store for a database file, creating it on first use"""
+    key = os.path.normcase(os.path.abspath(db_file))
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = HistoryStore(db_file)
+            _stores[key] = store
+        return store
+
+
+def close_all_stores():
+    """Close the pooled connections of every store"""
+    with _stores_lock:
+        for store in _stores.values():
+            store.close()
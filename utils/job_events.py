@@ -0,0 +1,146 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+# Finished jobs kept so the dashboard can still show how they ended
+KEEP_FINISHED_JOBS = 20
+
+FINISHED_STATES = ("completed", "failed", "interrupted", "cancelled")
+
+
+class JobState:
+    """Current state of one job as seen by the dashboard"""
+
+    def __init__(self, job_id, name, kind, parent_id=None):
+        self.job_id = job_id
+        self.name = name
+        self.kind = kind
+        self.parent_id = parent_id  # Job that started this one, if any
+        self.state = "running"
+        self.stage = None
+        self.started = time.monotonic()
+        self.finished = None
+        self.done = 0
+        self.total = 0
+        self.unit = None  # e.g. 'files' or 'bytes'
+        self.last_log = ""
+
+    def copy(self):
+        state = JobState.__new__(JobState)
+        state.__dict__.update(self.__dict__)
+        return state
+
+    @property
+    def is_finished(self):
+        return self.state in FINISHED_STATES
+
+    @property
+    def elapsed(self):
+        """Seconds since the job started (up to when it finished)"""
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def throughput(self):
+        """Units processed per second, or None before any progress"""
+        elapsed = self.elapsed
+        if not self.done or elapsed <= 0:
+            return None
+        return self.done / elapsed
+
+
+class JobHandle:
+    """Used by the code running a job to publish its events"""
+
+    def __init__(self, bus, job_id):
+        self.bus = bus
+        self.job_id = job_id
+
+    def stage(self, name):
+        """The job moved on to a new step; progress restarts for the step"""
+        self.bus.publish(self.job_id, stage=name, done=0, total=0, unit=None)
+
+    def progress(self, done, total, unit=None):
+        self.bus.publish(self.job_id, done=done, total=total, unit=unit)
+
+    def log(self, line):
+        self.bus.publish(self.job_id, last_log=line)
+
+    def set_state(self, state):
+        """An unfinished state other than running, e.g. queued or waiting"""
+        self.bus.publish(self.job_id, state=state)
+
+    def finish(self, state="completed", message=None):
+        changes = {"state": state, "finished": time.monotonic()}
+        if message is not None:
+            changes["last_log"] = message
+        self.bus.publish(self.job_id, **changes)
+
+
+class JobEventBus:
+    """
+    The single stream every job publishes to. Events update a table of job
+    states under a lock; readers take a snapshot whenever the version changes,
+    so bursts of events are coalesced into one refresh.
+    """
+
+    def __init__(self, keep_finished=KEEP_FINISHED_JOBS):
+        self.keep_finished = keep_finished
+        self._jobs = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.version = 0
+
+    def add_listener(self, callback):
+        """Call callback(job state copy) whenever a job finishes, on the publishing thread"""
+        self._listeners.append(callback)
+
+    def start_job(self, name, kind, parent=None):
+        """Register a running job and return the handle used to report on it"""
+        job_id = next(self._ids)
+        with self._lock:
+            self._jobs[job_id] = JobState(job_id, name, kind, parent.job_id if parent else None)
+            self._prune()
+            self.version += 1
+        return JobHandle(self, job_id)
+
+    def publish(self, job_id, **changes):
+        """Apply an event to a job's state"""
+        finished = None
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.is_finished:
+                return
+            for key, value in changes.items():
+                setattr(job, key, value)
+            if job.is_finished:
+                finished = job.copy()
+                self._prune()
+            self.version += 1
+
+        # Outside the lock, so listeners may read the bus themselves
+        if finished:
+            for callback in self._listeners:
+                try:
+                    callback(finished)
+                except Exception as e:
+                    print(f"Error in job event listener: {str(e)}")
+
+    def snapshot(self):
+        """Return (version, copies of every job state) in start order"""
+        with self._lock:
+            return self.version, [job.copy() for job in self._jobs.values()]
+
+    def active_jobs(self):
+        with self._lock:
+            return [job.copy() for job in self._jobs.values() if not job.is_finished]
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.is_finished]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+
+
+# Shared by every task in the application
+job_events = JobEventBus()
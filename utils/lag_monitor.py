@@ -0,0 +1,179 @@
+import heapq
+import os
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+
+# Heartbeat period on the Tk thread
+HEARTBEAT_MS = 100
+
+# A heartbeat this late means the UI visibly froze
+STALL_THRESHOLD_MS = 200
+
+# How often the watchdog thread checks for a missed heartbeat
+WATCHDOG_INTERVAL_SECONDS = 0.05
+
+# Worst stalls kept with their stacks for the report
+KEEP_WORST_STALLS = 10
+
+# Upper bounds (ms) of the lag histogram buckets
+LAG_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf"))
+
+DIAGNOSTICS_FOLDER = os.path.abspath("Diagnostics")
+
+
+def lag_monitor_enabled():
+    """The monitor is on unless EEP_LAG_MONITOR is set to 0"""
+    return os.environ.get("EEP_LAG_MONITOR", "1") != "0"
+
+
+class Stall:
+    """One period during which the Tk thread did not run its event loop"""
+
+    def __init__(self, lag_ms, started_at, stack):
+        self.lag_ms = lag_ms
+        self.started_at = started_at
+        self.stack = stack  # Main thread stack captured while it was blocked
+
+    def __lt__(self, other):
+        return self.lag_ms < other.lag_ms
+
+
+class LagMonitor:
+    """
+    Measures Tk event-loop responsiveness. A heartbeat is scheduled with
+    root.after and its lateness recorded; a watchdog thread notices a heartbeat
+    that is overdue and captures what the Tk thread is doing at that moment.
+    """
+
+    def __init__(self, root, heartbeat_ms=HEARTBEAT_MS, stall_threshold_ms=STALL_THRESHOLD_MS):
+        self.root = root
+        self.heartbeat_ms = heartbeat_ms
+        self.stall_threshold_ms = stall_threshold_ms
+        self.session_started = datetime.now()
+
+        self.main_thread_id = threading.main_thread().ident
+        self.expected = None  # perf_counter time the next heartbeat is due
+        self.running = False
+        self.lock = threading.Lock()
+        self.pending_stack = None  # Stack captured by the watchdog for the current stall
+
+        self.beats = 0
+        self.total_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.histogram = [0] * len(LAG_BUCKETS_MS)
+        self.stall_count = 0
+        self.worst_stalls = []  # Min-heap of the worst Stall objects
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.expected = time.perf_counter() + self.heartbeat_ms / 1000
+        self.root.after(self.heartbeat_ms, self.heartbeat)
+        threading.Thread(target=self.watchdog, daemon=True).start()
+
+    def stop(self):
+        self.running = False
+
+    def heartbeat(self):
+        """Runs on the Tk thread; records how late it fired and schedules the next one"""
+        if not self.running:
+            return
+
+        now = time.perf_counter()
+        lag_ms = max(0.0, (now - self.expected) * 1000)
+
+        with self.lock:
+            self.beats += 1
+            self.total_lag_ms += lag_ms
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+            for index, bound in enumerate(LAG_BUCKETS_MS):
+                if lag_ms <= bound:
+                    self.histogram[index] += 1
+                    break
+
+            if lag_ms >= self.stall_threshold_ms:
+                self.stall_count += 1
+                stall = Stall(lag_ms, datetime.now(), self.pending_stack or "(stack not captured)")
+                if len(self.worst_stalls) < KEEP_WORST_STALLS:
+                    heapq.heappush(self.worst_stalls, stall)
+                else:
+                    heapq.heappushpop(self.worst_stalls, stall)
+            self.pending_stack = None
+
+            self.expected = now + self.heartbeat_ms / 1000
+
+        self.root.after(self.heartbeat_ms, self.heartbeat)
+
+    def watchdog(self):
+        """Background thread: capture the Tk thread's stack once a heartbeat is overdue"""
+        while self.running:
+            time.sleep(WATCHDOG_INTERVAL_SECONDS)
+            with self.lock:
+                overdue_ms = (time.perf_counter() - self.expected) * 1000
+                if overdue_ms < self.stall_threshold_ms or self.pending_stack is not None:
+                    continue
+
+            frame = sys._current_frames().get(self.main_thread_id)
+            if frame is None:
+                continue
+            stack = "".join(traceback.format_stack(frame))
+
+            with self.lock:
+                # Only keep it if the heartbeat has not fired in the meantime
+                if (time.perf_counter() - self.expected) * 1000 >= self.stall_threshold_ms:
+                    self.pending_stack = stack
+
+    def percentile_ms(self, fraction):
+        """Upper bound of the histogram bucket containing the given percentile"""
+        target = self.beats * fraction
+        seen = 0
+        for bound, count in zip(LAG_BUCKETS_MS, self.histogram):
+            seen += count
+            if count and seen >= target:
+                return bound
+        return 0
+
+    def build_report(self):
+        with self.lock:
+            mean_ms = self.total_lag_ms / self.beats if self.beats else 0.0
+            lines = [
+                f"Responsiveness report for session started {self.session_started.strftime('%Y-%m-%d %H:%M:%S')}",
+                f"Session ended {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+                "",
+                f"Heartbeats: {self.beats} every {self.heartbeat_ms} ms",
+                f"Mean lag: {mean_ms:.1f} ms, max lag: {self.max_lag_ms:.1f} ms",
+                f"p50 <= {self.percentile_ms(0.5):g} ms, p95 <= {self.percentile_ms(0.95):g} ms, "
+                f"p99 <= {self.percentile_ms(0.99):g} ms",
+                f"Stalls over {self.stall_threshold_ms} ms: {self.stall_count}",
+                "",
+                "Lag histogram:",
+            ]
+            lower = 0
+            for bound, count in zip(LAG_BUCKETS_MS, self.histogram):
+                label = f"{lower:g}-{bound:g} ms" if bound != float("inf") else f">{lower:g} ms"
+                lines.append(f"  {label:<16}{count}")
+                lower = bound
+
+            for stall in sorted(self.worst_stalls, reverse=True):
+                lines += [
+                    "",
+                    f"Stall of {stall.lag_ms:.0f} ms at {stall.started_at.strftime('%H:%M:%S')}, Tk thread was in:",
+                    stall.stack.rstrip(),
+                ]
+
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, folder=DIAGNOSTICS_FOLDER):
+        """Write the session report and return its path"""
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(
+            folder, f"responsiveness_{self.session_started.strftime('%Y%m%d_%H%M%S')}.txt"
+        )
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.build_report())
+        print(f"Responsiveness report written to {path}")
+        return path
@@ -0,0 +1,157 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+# Allocation sites kept per stage
+TOP_SITES = 5
+
+# Frames recorded per allocation; more frames find the caller but cost more
+TRACEBACK_FRAMES = 5
+
+SAVE_PROFILE_SQL = '''
+INSERT OR REPLACE INTO upload_memory_profiles (
+    upload_id, stage, position, peak_bytes, net_bytes, seconds, top_sites, recorded_at
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Every profiled stage of the latest profiled uploads, next to the size of their content month
+PROFILE_REPORT_SQL = '''
+SELECT u.id, u.topic_month, u.xml_files, u.images, p.stage, p.peak_bytes, p.net_bytes, p.seconds
+FROM upload_memory_profiles p
+JOIN uploads u ON u.id = p.upload_id
+WHERE p.upload_id IN (
+    SELECT DISTINCT upload_id FROM upload_memory_profiles ORDER BY upload_id DESC LIMIT ?
+)
+ORDER BY u.id DESC, p.position
+'''
+
+
+def memory_profiling_enabled():
+    """Memory profiling is off unless EEP_MEMORY_PROFILE is set to 1"""
+    return os.environ.get("EEP_MEMORY_PROFILE", "0") == "1"
+
+
+def format_bytes(size):
+    for unit in ("B", "KB", "MB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+class StageMemory:
+    """Memory use of one pipeline stage"""
+
+    def __init__(self, stage, peak_bytes, net_bytes, seconds, top_sites):
+        self.stage = stage
+        self.peak_bytes = peak_bytes  # Highest traced memory above the stage's starting point
+        self.net_bytes = net_bytes  # Memory still allocated when the stage ended
+        self.seconds = seconds
+        self.top_sites = top_sites  # [(file:line, size_diff bytes, count_diff)]
+
+
+class MemoryProfiler:
+    """
+    Records peak and net Python allocations per pipeline stage with
+    tracemalloc, plus the sites that grew most during each stage. Tracing
+    slows allocation-heavy code down, so it only runs when asked for.
+    """
+
+    def __init__(self, top_sites=TOP_SITES):
+        self.top_sites = top_sites
+        self.stages = []
+        self.started_tracing = False
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEBACK_FRAMES)
+            self.started_tracing = True
+
+        before = tracemalloc.take_snapshot()
+        start_current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+
+            sites = []
+            for stat in after.compare_to(before, 'lineno')[:self.top_sites]:
+                frame = stat.traceback[0]
+                sites.append((f"{frame.filename}:{frame.lineno}", stat.size_diff, stat.count_diff))
+
+            self.stages.append(StageMemory(name, peak - start_current, current - start_current, seconds, sites))
+
+    def stop(self):
+        """Stop tracemalloc if this profiler started it"""
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def summary(self):
+        lines = []
+        for stage in self.stages:
+            lines.append(
+                f"{stage.stage:<10} peak {format_bytes(stage.peak_bytes):>10}  "
+                f"net {format_bytes(stage.net_bytes):>10}  {stage.seconds:.1f}s"
+            )
+            for site, size_diff, count_diff in stage.top_sites:
+                lines.append(f"    {format_bytes(size_diff):>10} in {count_diff:+} blocks  {site}")
+        return "\n".join(lines)
+
+    def save(self, store, upload_id):
+        """Store the results with an upload's history record"""
+        recorded_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with store.transaction() as conn:
+            for position, stage in enumerate(self.stages):
+                conn.execute(SAVE_PROFILE_SQL, (
+                    upload_id,
+                    stage.stage,
+                    position,
+                    stage.peak_bytes,
+                    stage.net_bytes,
+                    stage.seconds,
+                    json.dumps(stage.top_sites),
+                    recorded_at
+                ))
+
+
+def main(argv=None):
+    """Command-line entry point: python -m utils.memory_profile"""
+    from utils.history_schema import UPLOAD_MIGRATIONS
+    from utils.history_store import get_store
+
+    parser = argparse.ArgumentParser(description="Show the memory profiles stored with topic uploads")
+    parser.add_argument("--db", default=os.path.join("Topic Upload History", "topic_uploads.db"),
+                        help="upload history database file")
+    parser.add_argument("--limit", type=int, default=20, help="number of uploads to show")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"Database file does not exist: {args.db}", file=sys.stderr)
+        return 1
+
+    store = get_store(args.db)
+    store.migrate(UPLOAD_MIGRATIONS)
+
+    print(f"{'Upload':<8}{'Topic month':<20}{'XML':>7}{'Images':>8}  {'Stage':<10}{'Peak':>12}{'Net':>12}{'Seconds':>9}")
+    rows = store.fetchall(PROFILE_REPORT_SQL, (args.limit,))
+    for upload_id, topic_month, xml_files, images, stage, peak, net, seconds in rows:
+        print(
+            f"{upload_id:<8}{topic_month or '':<20}{xml_files or 0:>7}{images or 0:>8}  "
+            f"{stage:<10}{format_bytes(peak):>12}{format_bytes(net):>12}{seconds:>9.1f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.job_events import job_events
+
+# Seconds between rewrites of the metrics file while events keep arriving
+METRICS_WRITE_INTERVAL = 1.0
+
+DURATION_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 1800, 3600)
+DB_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+
+def escape_label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+def format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """A value per label combination that only goes up"""
+
+    def __init__(self, registry, name, description, label_names):
+        self.registry = registry
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+        self.registry.changed()
+
+    def take(self):
+        """Return the values as [[label values, value]] and start again from zero"""
+        with self.registry.lock:
+            values, self.values = self.values, {}
+        return [[list(key), value] for key, value in values.items()]
+
+    def add(self, values):
+        """Add values taken from the same counter in another process"""
+        with self.registry.lock:
+            for key, value in values:
+                key = tuple(key)
+                self.values[key] = self.values.get(key, 0) + value
+        self.registry.changed()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{format_labels(self.label_names, key)} {format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Observations per label combination, counted into cumulative buckets"""
+
+    def __init__(self, registry, name, description, label_names, buckets):
+        self.registry = registry
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self.values = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self.registry.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[index] += 1
+            entry[-2] += value
+            entry[-1] += 1
+        self.registry.changed()
+
+    def take(self):
+        """Return the values as [[label values, bucket counts + sum + count]] and start again from zero"""
+        with self.registry.lock:
+            values, self.values = self.values, {}
+        return [[list(key), entry] for key, entry in values.items()]
+
+    def add(self, values):
+        """Add observations taken from the same histogram in another process"""
+        with self.registry.lock:
+            for key, entry in values:
+                key = tuple(key)
+                current = self.values.get(key)
+                if current is None:
+                    current = self.values[key] = [0] * len(self.buckets) + [0.0, 0]
+                for index, value in enumerate(entry):
+                    current[index] += value
+        self.registry.changed()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for key, entry in sorted(self.values.items()):
+            for bound, count in zip(self.buckets, entry):
+                labels = format_labels(self.label_names, key, [("le", format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = format_labels(self.label_names, key, [("le", "+Inf")])
+            lines.append(f"{self.name}_bucket{labels} {entry[-1]}")
+            lines.append(f"{self.name}_sum{format_labels(self.label_names, key)} {format_value(entry[-2])}")
+            lines.append(f"{self.name}_count{format_labels(self.label_names, key)} {entry[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Every metric of the process, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = []
+        self.updated = threading.Event()  # Set whenever a value changes
+
+    def counter(self, name, description, label_names=()):
+        metric = Counter(self, name, description, tuple(label_names))
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, description, label_names=(), buckets=DURATION_BUCKETS):
+        metric = Histogram(self, name, description, tuple(label_names), buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def changed(self):
+        self.updated.set()
+
+    def take(self):
+        """
+        Values recorded since the last take, by metric name, for a process
+        that does not export its own metrics (e.g. an upload worker)
+        """
+        samples = {}
+        for metric in self.metrics:
+            values = metric.take()
+            if values:
+                samples[metric.name] = values
+        return samples
+
+    def merge(self, samples):
+        """Add samples taken in another process to this registry"""
+        by_name = {metric.name: metric for metric in self.metrics}
+        for name, values in samples.items():
+            if name in by_name:
+                by_name[name].add(values)
+
+    def render(self):
+        with self.lock:
+            lines = []
+            for metric in self.metrics:
+                lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+# Shared by every task in the application
+metrics = MetricsRegistry()
+
+JOBS_TOTAL = metrics.counter(
+    "eep_jobs_total", "Finished jobs (uploads, exports, filter and index jobs, deletions) by final state",
+    ("kind", "state")
+)
+JOB_DURATION = metrics.histogram(
+    "eep_job_duration_seconds", "Wall time of finished jobs", ("kind",)
+)
+STAGE_DURATION = metrics.histogram(
+    "eep_stage_duration_seconds", "Wall time of each pipeline stage", ("pipeline", "stage")
+)
+BYTES_PROCESSED = metrics.counter(
+    "eep_bytes_processed_total", "Bytes read or written by each pipeline stage", ("pipeline", "stage")
+)
+JOB_EXIT_CODES = metrics.counter(
+    "eep_job_exit_codes_total", "Exit codes of the external filter, index and export jobs", ("job", "code")
+)
+HISTORY_DB_LATENCY = metrics.histogram(
+    "eep_history_db_seconds", "Latency of history database calls", ("database", "operation"),
+    buckets=DB_LATENCY_BUCKETS
+)
+
+
+def on_job_finished(job):
+    """Job event bus listener counting every job that ends"""
+    JOBS_TOTAL.inc(kind=job.kind, state=job.state)
+    JOB_DURATION.observe(job.elapsed, kind=job.kind)
+
+
+job_events.add_listener(on_job_finished)
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """Serves the registry at /metrics"""
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = metrics.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes are routine; keep them out of the console
+        pass
+
+
+class MetricsExporter:
+    """
+    Publishes the registry as a Prometheus text file (rewritten atomically
+    after changes, for node_exporter's textfile collector) and/or on a
+    localhost HTTP endpoint.
+    """
+
+    def __init__(self, file_path=None, port=None):
+        self.file_path = file_path
+        self.port = port
+        self.server = None
+        self.running = False
+
+    def start(self):
+        self.running = True
+        if self.file_path:
+            threading.Thread(target=self.write_loop, daemon=True).start()
+        if self.port:
+            try:
+                # Bound to loopback only: the endpoint is for a local agent to scrape
+                self.server = ThreadingHTTPServer(("127.0.0.1", self.port), MetricsRequestHandler)
+                self.server.daemon_threads = True
+                threading.Thread(target=self.server.serve_forever, daemon=True).start()
+                print(f"Serving metrics on http://127.0.0.1:{self.port}/metrics")
+            except OSError as e:
+                print(f"Error starting metrics endpoint on port {self.port}: {str(e)}")
+
+    def stop(self):
+        self.running = False
+        metrics.changed()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def write_loop(self):
+        """Rewrite the metrics file after every batch of changes (background thread)"""
+        metrics.changed()  # Write once at startup so the file exists
+        while self.running:
+            metrics.updated.wait()
+            metrics.updated.clear()
+            self.write_file()
+            time.sleep(METRICS_WRITE_INTERVAL)
+
+    def write_file(self):
+        try:
+            folder = os.path.dirname(os.path.abspath(self.file_path))
+            os.makedirs(folder, exist_ok=True)
+            # Write then rename so a scraper never reads a half-written file
+            temp_path = f"{self.file_path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(metrics.render())
+            os.replace(temp_path, self.file_path)
+        except OSError as e:
+            print(f"Error writing metrics file {self.file_path}: {str(e)}")
+
+
+def start_metrics_exporter():
+    """
+    Start exporting if EEP_METRICS_FILE and/or EEP_METRICS_PORT is set.
+    Returns the exporter, or None when metrics are not wanted.
+    """
+    file_path = os.environ.get("EEP_METRICS_FILE") or None
+    try:
+        port = int(os.environ.get("EEP_METRICS_PORT", 0))
+    except ValueError:
+        print("EEP_METRICS_PORT must be a port number; the metrics endpoint is disabled")
+        port = 0
+
+    if not file_path and not port:
+        return None
+
+    exporter = MetricsExporter(file_path, port)
+    exporter.start()
+    return exporter
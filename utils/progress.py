@@ -0,0 +1,59 @@
+import json
+import sys
+import threading
+import time
+
+
+class JsonProgressReporter:
+    """
+    Progress of a command-line run: every report is written to a stream as
+    one JSON object per line. Per-item progress is throttled to one line per
+    min_interval seconds.
+    """
+
+    def __init__(self, stream=None, min_interval=0.5):
+        self.stream = stream or sys.stdout
+        self.min_interval = min_interval
+        self.job = None
+        self._lock = threading.Lock()
+        self._progress = 0.0
+        self._last_emit = 0.0
+
+    def emit(self, event, **fields):
+        """Write one event line"""
+        with self._lock:
+            self.stream.write(json.dumps({"event": event, "time": round(time.time(), 3), **fields}) + "\n")
+            self.stream.flush()
+
+    def set_status(self, message):
+        self.emit("status", message=message)
+
+    def set_detail(self, message):
+        self.emit("detail", message=message)
+
+    def set_progress(self, value):
+        self._progress = max(0.0, min(1.0, value))
+
+    def stage(self, start, end, unit="files"):
+        """
+        Return an on_item(done, total, name) callback for a step that covers
+        start..end of the whole job
+        """
+        def on_item(done, total, name):
+            fraction = done / total if total else 1.0
+            self.set_progress(start + (end - start) * fraction)
+
+            # Always report the end of a step; throttle everything in between
+            now = time.monotonic()
+            if done < total and now - self._last_emit < self.min_interval:
+                return
+            self._last_emit = now
+            self.emit(
+                "progress",
+                progress=round(self._progress, 4),
+                done=done,
+                total=total,
+                unit=unit,
+                item=name
+            )
+        return on_item
@@ -0,0 +1,310 @@
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+from utils.deletion import delete_tree, tombstone_directory, unregister_tombstone
+from utils.history_store import get_store
+
+# Defaults can be overridden with environment variables on the upload box
+DEFAULT_MAX_AGE_DAYS = 30
+DEFAULT_DISK_BUDGET_GB = 20
+
+# Pause between folder deletions so the background GC never hogs the disk
+DELETE_PAUSE_SECONDS = 0.5
+
+
+def get_retention_settings():
+    """Read the retention settings, falling back to the defaults"""
+    try:
+        max_age_days = float(os.environ.get("EEP_RETENTION_MAX_AGE_DAYS", DEFAULT_MAX_AGE_DAYS))
+    except ValueError:
+        max_age_days = DEFAULT_MAX_AGE_DAYS
+
+    try:
+        budget_gb = float(os.environ.get("EEP_RETENTION_BUDGET_GB", DEFAULT_DISK_BUDGET_GB))
+    except ValueError:
+        budget_gb = DEFAULT_DISK_BUDGET_GB
+
+    return max_age_days, int(budget_gb * 1024 ** 3)
+
+
+def get_directory_size(directory_path):
+    """Return the total size in bytes of all files below a directory"""
+    total = 0
+    stack = [directory_path]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            total += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return total
+
+
+def lower_current_thread_priority():
+    """Best-effort attempt to run the calling thread at low OS priority"""
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            thread_priority_lowest = -2
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), thread_priority_lowest)
+        elif hasattr(os, "setpriority") and hasattr(threading, "get_native_id"):
+            # On Linux the nice value is per thread when addressed by native id
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+    except Exception as e:
+        print(f"Could not lower retention thread priority: {str(e)}")
+
+
+class RetentionCandidate:
+    """A folder on disk that the retention manager may reclaim"""
+
+    def __init__(self, path, kind, db_file, record_time, files=None):
+        self.path = path
+        self.kind = kind  # 'working' or 'export'
+        self.db_file = db_file
+        self.record_time = record_time
+        self.files = files  # Names of the files to delete, or None for the whole folder
+        self.size = 0
+
+
+class RetentionManager:
+    """Reclaims disk space used by old export and temporary working folders"""
+
+    def __init__(self, upload_db_file, export_db_file, max_age_days=None, disk_budget_bytes=None,
+                 get_protected_folders=None, ready_events=(), export_files=()):
+        default_age, default_budget = get_retention_settings()
+        self.upload_db_file = upload_db_file
+        self.export_db_file = export_db_file
+        self.max_age_days = default_age if max_age_days is None else max_age_days
+        self.disk_budget_bytes = default_budget if disk_budget_bytes is None else disk_budget_bytes
+        # Callback returning folders that are in use and must never be deleted
+        self.get_protected_folders = get_protected_folders
+        # Set once the history databases are migrated; a pass waits for them
+        self.ready_events = ready_events
+        # Export folders are dated Desktop folders the operator may also use, so
+        # only the files the export copied there are deleted, never the folder's other contents
+        self.export_files = list(export_files)
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    def start(self):
+        """Run a retention pass on a low-priority background thread"""
+        if self.thread and self.thread.is_alive():
+            return False
+
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        """Ask a running retention pass to stop after the current folder"""
+        self.stop_event.set()
+
+    def _run(self):
+        lower_current_thread_priority()
+        for event in self.ready_events:
+            event.wait()
+        try:
+            reclaimed = self.run_once()
+            print(f"Retention pass finished, reclaimed {reclaimed} bytes")
+        except Exception as e:
+            print(f"Error during retention pass: {str(e)}")
+
+    def run_once(self):
+        """Find stale folders and delete them, returning the number of bytes reclaimed"""
+        candidates = self.find_candidates()
+        to_delete = self.select_for_deletion(candidates)
+
+        reclaimed = 0
+        for candidate, reason in to_delete:
+            if self.stop_event.is_set():
+                break
+
+            # The folder might have become active since the scan started
+            if self._is_protected(candidate.path):
+                continue
+
+            try:
+                if candidate.files is not None:
+                    self.delete_files(candidate)
+                else:
+                    # Rename first so a half-deleted folder is never mistaken for a live one
+                    tombstone_path = tombstone_directory(candidate.path)
+                    if not delete_tree(tombstone_path, self.stop_event):
+                        # Cancelled; the tombstone is removed on the next start
+                        break
+                    unregister_tombstone(tombstone_path)
+            except Exception as e:
+                print(f"Error deleting {candidate.path}: {str(e)}")
+                continue
+
+            reclaimed += candidate.size
+            self.record_cleanup(candidate, reason)
+            time.sleep(DELETE_PAUSE_SECONDS)
+
+        return reclaimed
+
+    def find_candidates(self):
+        """Collect existing export and working folders referenced by both history databases"""
+        candidates = []
+
+        for path, record_time in self._query_folders(
+                self.upload_db_file,
+                '''
+                SELECT working_folder, COALESCE(upload_timestamp, started_at)
+                FROM uploads
+                WHERE working_folder IS NOT NULL
+                '''):
+            candidates.append(RetentionCandidate(path, "working", self.upload_db_file, record_time))
+
+        # Queued uploads record their working folder up front, so the folders
+        # of uploads that failed before their log stage are reclaimed too
+        for path, record_time in self._query_folders(
+                self.upload_db_file,
+                '''
+                SELECT working_folder, COALESCE(finished_at, started_at, enqueued_at)
+                FROM upload_queue
+                WHERE working_folder IS NOT NULL AND state NOT IN ('queued', 'running', 'waiting')
+                '''):
+            candidates.append(RetentionCandidate(path, "working", self.upload_db_file, record_time))
+
+        for path, record_time in self._query_folders(
+                self.export_db_file,
+                '''
+                SELECT export_path, COALESCE(export_timestamp, started_at)
+                FROM exports
+                WHERE export_path IS NOT NULL
+                '''):
+            candidates.append(RetentionCandidate(path, "export", self.export_db_file, record_time, self.export_files))
+
+        # Several records can point at the same folder (e.g. two exports on one day)
+        unique = {}
+        for candidate in candidates:
+            key = os.path.normcase(os.path.abspath(candidate.path))
+            existing = unique.get(key)
+            if existing is None or candidate.record_time > existing.record_time:
+                unique[key] = candidate
+
+        result = []
+        for candidate in unique.values():
+            if not os.path.isdir(candidate.path) or self._is_protected(candidate.path):
+                continue
+            if candidate.files is None:
+                candidate.size = get_directory_size(candidate.path)
+            else:
+                candidate.files = [
+                    name for name in candidate.files if os.path.isfile(os.path.join(candidate.path, name))
+                ]
+                if not candidate.files:
+                    continue  # Already reclaimed, or moved by the operator
+                candidate.size = sum(os.path.getsize(os.path.join(candidate.path, name)) for name in candidate.files)
+            result.append(candidate)
+
+        return result
+
+    def select_for_deletion(self, candidates):
+        """Pick folders older than the max age, then oldest-first until under the disk budget"""
+        now = datetime.now()
+        max_age = timedelta(days=self.max_age_days)
+
+        # Oldest first
+        candidates = sorted(candidates, key=lambda c: c.record_time)
+
+        # Always keep the most recent export, it may not have been uploaded to xfer yet
+        exports = [c for c in candidates if c.kind == "export"]
+        newest_export = exports[-1] if exports else None
+
+        selected = []
+        kept = []
+        for candidate in candidates:
+            if candidate is newest_export:
+                continue
+            if now - candidate.record_time > max_age:
+                selected.append((candidate, "max_age"))
+            else:
+                kept.append(candidate)
+
+        total = sum(c.size for c in kept)
+        if newest_export is not None:
+            total += newest_export.size
+
+        for candidate in kept:
+            if total <= self.disk_budget_bytes:
+                break
+            selected.append((candidate, "disk_budget"))
+            total -= candidate.size
+
+        return selected
+
+    def delete_files(self, candidate):
+        """Delete a candidate's files, then its folder if nothing else is left in it"""
+        for name in candidate.files:
+            try:
+                os.remove(os.path.join(candidate.path, name))
+            except FileNotFoundError:
+                continue
+        try:
+            os.rmdir(candidate.path)
+        except OSError:
+            pass  # The folder holds files the export did not put there
+
+    def record_cleanup(self, candidate, reason):
+        """Store the reclaimed folder and its size in the owning history database"""
+        try:
+            get_store(candidate.db_file).execute('''
+            INSERT INTO cleanup_history (
+                cleaned_at, folder_path, folder_kind, bytes_reclaimed, reason
+            ) VALUES (?, ?, ?, ?, ?)
+            ''', (
+                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                candidate.path,
+                candidate.kind,
+                candidate.size,
+                reason
+            ))
+        except Exception as e:
+            print(f"Error recording cleanup of {candidate.path}: {str(e)}")
+
+    def _query_folders(self, db_file, query):
+        """Return (path, datetime) pairs from a history database"""
+        if not db_file or not os.path.exists(db_file):
+            return []
+
+        try:
+            rows = []
+            for path, timestamp in get_store(db_file).fetchall(query):
+                record_time = self._parse_timestamp(timestamp)
+                if path and record_time:
+                    rows.append((path, record_time))
+            return rows
+        except Exception as e:
+            print(f"Error reading folders from {db_file}: {str(e)}")
+            return []
+
+    def _parse_timestamp(self, timestamp):
+        try:
+            return datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
+        except (ValueError, TypeError):
+            return None
+
+    def _is_protected(self, path):
+        if not self.get_protected_folders:
+            return False
+
+        target = os.path.normcase(os.path.abspath(path))
+        for folder in self.get_protected_folders():
+            if folder and os.path.normcase(os.path.abspath(folder)) == target:
+                return True
+        return False
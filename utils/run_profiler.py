@@ -0,0 +1,101 @@
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from datetime import datetime
+
+# Sub-folder of a task's history folder the profiles are written to
+PROFILES_FOLDER_NAME = "profiles"
+
+# Functions listed in each table of the rendered summary
+HOT_FUNCTIONS = 30
+
+
+class ProfileRequest:
+    """
+    Whether the next run should be profiled. Armed from the Diagnostics menu,
+    or at startup by setting EEP_PROFILE_NEXT_RUN to 1; the first topic upload
+    or Teton post-processing to start takes it and disarms it.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.armed = os.environ.get("EEP_PROFILE_NEXT_RUN", "0") == "1"
+
+    def arm(self, armed=True):
+        with self.lock:
+            self.armed = armed
+
+    def take(self):
+        """True (once) if the run about to start should be profiled"""
+        with self.lock:
+            armed = self.armed
+            self.armed = False
+        return armed
+
+
+# Shared by every task in the application
+profile_request = ProfileRequest()
+
+
+class RunProfiler:
+    """
+    Runs one upload or export under cProfile and writes the raw statistics
+    (.pstats, for snakeviz or pstats) together with a plain text summary of
+    the hottest functions. cProfile only sees the thread that enabled it, so
+    enable and disable on the thread doing the work.
+    """
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.profile = cProfile.Profile()
+        self.started = datetime.now()
+        self.seconds = 0.0
+        self._enabled_at = None
+
+    def enable(self):
+        self._enabled_at = time.perf_counter()
+        self.profile.enable()
+
+    def disable(self):
+        if self._enabled_at is None:
+            return
+        self.profile.disable()
+        self.seconds += time.perf_counter() - self._enabled_at
+        self._enabled_at = None
+
+    def summary(self, run_id=None):
+        stream = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=stream)
+        stream.write(f"CPU profile of {self.kind} {run_id if run_id is not None else '(no record)'}\n")
+        stream.write(f"Started {self.started.strftime('%Y-%m-%d %H:%M:%S')}, "
+                     f"profiled for {self.seconds:.1f}s, {stats.total_calls} function calls\n\n")
+
+        stats.strip_dirs()
+        stream.write("Hottest functions by cumulative time (time in the function and everything it calls)\n")
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(HOT_FUNCTIONS)
+        stream.write("Hottest functions by own time\n")
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(HOT_FUNCTIONS)
+        return stream.getvalue()
+
+    def save(self, history_folder, run_id=None):
+        """
+        Write <kind>_<run id>_<timestamp>.pstats and .txt under the history
+        folder's profiles/ sub-folder; returns the summary path or None.
+        """
+        self.disable()
+        folder = os.path.join(history_folder, PROFILES_FOLDER_NAME)
+        label = run_id if run_id is not None else "unrecorded"
+        base_path = os.path.join(folder, f"{self.kind}_{label}_{self.started.strftime('%Y%m%d_%H%M%S')}")
+        try:
+            os.makedirs(folder, exist_ok=True)
+            self.profile.dump_stats(f"{base_path}.pstats")
+            with open(f"{base_path}.txt", 'w', encoding='utf-8') as f:
+                f.write(self.summary(run_id))
+            print(f"CPU profile written to {base_path}.txt")
+            return f"{base_path}.txt"
+        except OSError as e:
+            print(f"Error writing CPU profile for {self.kind} {label}: {str(e)}")
+            return None
@@ -0,0 +1,64 @@
+import os
+import time
+from datetime import datetime
+
+# Time from process start until the window is painted and responding
+DEFAULT_STARTUP_BUDGET_MS = 1500
+
+DEFAULT_REPORT_FILE = "startup_profile.txt"
+
+# Exit code of a --profile-startup run that exceeded the budget
+OVER_BUDGET_EXIT_CODE = 3
+
+
+def get_startup_budget_ms():
+    """Read the time-to-interactive budget, falling back to the default"""
+    try:
+        return float(os.environ.get("EEP_STARTUP_BUDGET_MS", DEFAULT_STARTUP_BUDGET_MS))
+    except ValueError:
+        return DEFAULT_STARTUP_BUDGET_MS
+
+
+class StartupProfiler:
+    """Records how long each startup phase takes, relative to process start"""
+
+    def __init__(self, started=None):
+        self.started = time.perf_counter() if started is None else started
+        self.last = self.started
+        self.phases = []  # (name, phase ms, elapsed ms)
+        self.interactive_ms = None
+
+    def mark(self, name):
+        """End the current phase and give it a name"""
+        now = time.perf_counter()
+        self.phases.append((name, (now - self.last) * 1000, (now - self.started) * 1000))
+        self.last = now
+
+    def mark_interactive(self):
+        """The window is painted and the event loop is idle"""
+        self.mark("first paint (interactive)")
+        self.interactive_ms = self.phases[-1][2]
+
+    def write_report(self, path, budget_ms):
+        """Write the per-phase breakdown and return whether startup was within budget"""
+        within_budget = self.interactive_ms is not None and self.interactive_ms <= budget_ms
+
+        lines = [
+            f"Startup profile {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+            "",
+            f"{'Phase':<40}{'ms':>10}{'elapsed':>10}",
+        ]
+        for name, phase_ms, elapsed_ms in self.phases:
+            lines.append(f"{name:<40}{phase_ms:>10.1f}{elapsed_ms:>10.1f}")
+        lines += [
+            "",
+            f"Time to interactive: {self.interactive_ms:.1f} ms" if self.interactive_ms is not None
+            else "Time to interactive: not reached",
+            f"Budget: {budget_ms:.0f} ms ({'OK' if within_budget else 'OVER BUDGET'})",
+        ]
+
+        report = "\n".join(lines)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(report + "\n")
+        print(report)
+        return within_budget
@@ -0,0 +1,199 @@
+import contextlib
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+TRACE_FOLDER = os.path.abspath(os.path.join("Diagnostics", "traces"))
+
+# Upper bound on events held in memory while runs are traced
+MAX_TRACE_EVENTS = 200000
+
+# Trace files kept in the trace folder; older ones are deleted as new ones are written
+DEFAULT_TRACE_FILES_KEPT = 50
+
+
+def tracing_enabled():
+    """Tracing is on unless EEP_TRACE is set to 0"""
+    return os.environ.get("EEP_TRACE", "1") != "0"
+
+
+def get_trace_files_kept():
+    """Read how many trace files to keep, falling back to the default"""
+    try:
+        return max(1, int(os.environ.get("EEP_TRACE_KEEP", DEFAULT_TRACE_FILES_KEPT)))
+    except ValueError:
+        return DEFAULT_TRACE_FILES_KEPT
+
+
+def prune_traces(folder, keep):
+    """Delete all but the newest keep trace files in folder; returns how many were deleted"""
+    try:
+        with os.scandir(folder) as entries:
+            traces = [(entry.stat().st_mtime, entry.path) for entry in entries
+                      if entry.is_file() and entry.name.endswith(".json")]
+    except OSError as e:
+        print(f"Error reading trace folder {folder}: {str(e)}")
+        return 0
+
+    deleted = 0
+    for _, path in sorted(traces, reverse=True)[keep:]:
+        try:
+            os.remove(path)
+            deleted += 1
+        except OSError as e:
+            print(f"Error deleting old trace {path}: {str(e)}")
+    return deleted
+
+
+class TraceRun:
+    """One traced operation (an upload, a filter job, an export) and the file it is written to"""
+
+    def __init__(self, tracer, name, kind):
+        self.tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.started = datetime.now()
+        self.start_us = tracer.now_us()
+        self.finished = False
+
+    def finish(self, status="completed", folder=TRACE_FOLDER):
+        """Write everything recorded since the run started; returns the file path (once)"""
+        if self.finished:
+            return None
+        self.finished = True
+        self.tracer.instant(f"{self.name} {status}", category="run")
+        return self.tracer.end_run(self, status, folder)
+
+
+class Tracer:
+    """
+    Records nested spans (name, start, duration, attributes, thread) while at
+    least one run is being traced, in the Chrome trace event format, so a run
+    can be opened in chrome://tracing or ui.perfetto.dev. Outside a run spans
+    cost next to nothing and record nothing.
+    """
+
+    def __init__(self, max_events=MAX_TRACE_EVENTS):
+        self.max_events = max_events
+        self.epoch = time.perf_counter()
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._events = []
+        self._threads = {}  # thread id -> name, for the viewer's track labels
+        self._runs = []
+
+    def now_us(self):
+        return (time.perf_counter() - self.epoch) * 1000000
+
+    @property
+    def active(self):
+        return bool(self._runs)
+
+    def begin_run(self, name, kind):
+        """Start recording for a run; call finish() on the result to write its trace"""
+        run = TraceRun(self, name, kind)
+        if tracing_enabled():
+            with self._lock:
+                self._runs.append(run)
+        return run
+
+    def end_run(self, run, status, folder):
+        with self._lock:
+            if run not in self._runs:
+                return None
+            self._runs.remove(run)
+            events = [event for event in self._events if event["ts"] + event.get("dur", 0) >= run.start_us]
+            threads = dict(self._threads)
+            # Nothing else needs the events once no run is being traced
+            if not self._runs:
+                self._events = []
+
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}}
+            for tid, name in threads.items()
+        ]
+        trace = {
+            "traceEvents": metadata + events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "run": run.name,
+                "kind": run.kind,
+                "status": status,
+                "started": run.started.strftime("%Y-%m-%d %H:%M:%S"),
+            },
+        }
+
+        try:
+            os.makedirs(folder, exist_ok=True)
+            safe_name = re.sub(r'[^\w.-]+', '_', run.name).strip('_')
+            path = os.path.join(folder, f"{run.kind}_{run.started.strftime('%Y%m%d_%H%M%S')}_{safe_name}.json")
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(trace, f)
+            print(f"Trace written to {path}")
+        except OSError as e:
+            print(f"Error writing trace for {run.name}: {str(e)}")
+            return None
+
+        # Every run writes a file, so keep the folder from growing without bound
+        prune_traces(folder, get_trace_files_kept())
+        return path
+
+    def _record(self, event):
+        thread = threading.current_thread()
+        event["pid"] = self.pid
+        event["tid"] = thread.ident
+        with self._lock:
+            if len(self._events) < self.max_events:
+                self._events.append(event)
+            self._threads.setdefault(thread.ident, thread.name)
+
+    @contextlib.contextmanager
+    def span(self, name, category="app", **attributes):
+        """
+        Time the enclosed block. The yielded dict holds the span's attributes,
+        so the block can add results (e.g. row counts) to it.
+        """
+        if not self._runs:
+            yield attributes
+            return
+
+        start = self.now_us()
+        try:
+            yield attributes
+        except BaseException as e:
+            attributes["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._record({
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": start,
+                "dur": self.now_us() - start,
+                "args": {key: str(value) for key, value in attributes.items()},
+            })
+
+    def instant(self, name, category="app", **attributes):
+        """Record a point in time, e.g. a log message"""
+        if not self._runs:
+            return
+        self._record({
+            "name": name,
+            "cat": category,
+            "ph": "i",
+            "s": "t",
+            "ts": self.now_us(),
+            "args": {key: str(value) for key, value in attributes.items()},
+        })
+
+    def log(self, message):
+        """print() that also lands in the trace, so it survives the windowed build"""
+        print(message)
+        self.instant(message, category="log")
+
+
+# Shared by every task in the application
+tracer = Tracer()